@@ -3,6 +3,7 @@ sys.path.insert(0,'../src')
 from hobj import Hobj
 from densearith import dup_add
 from compatibility import itervalues
+from graphs_gen import ring_perms
 
 def get_sum(p, K):
     """
@@ -13,11 +14,14 @@ def get_sum(p, K):
         nv = dup_add(nv, v, K)
     return nv
 
-def nv_r_nx_ny_py_rec(ny, K):
+def nv_r_nx_ny_py_rec(ny, K, sym=False):
     """
     generator of ``(nx, ny, nv)``, where `ny` is the input argument;
     ``nv`` is the matching generating polynomial of the grid ``(nx, ny)``
     with periodic boundary conditions in the `y` direction.
+
+    If ``sym`` is True, after each layer the states are reduced to
+    one for each orbit of the dihedral group of the last ring.
     """
     # initial graph
     N = 10000
@@ -39,6 +43,8 @@ def nv_r_nx_ny_py_rec(ny, K):
 
         for i, j in [(k, k+1) for k in range(n, n + ny - 1)] + [(n, n+ny-1)]:
             p = hb.iadd_object(p, 1, [i, j], [], K)
+        if sym:
+            p = hb.canonicalize(p, ring_perms([list(range(n, n + ny))]), K)
 
         n += ny
 
@@ -55,10 +61,11 @@ def test1():
     try:
         ny = int(sys.argv[1])
     except:
-        print('prog ny')
+        print('prog ny [sym]')
         sys.exit()
+    sym = len(sys.argv) > 2 and sys.argv[2] == 'sym'
 
-    it = nv_r_nx_ny_py_rec(ny, K)
+    it = nv_r_nx_ny_py_rec(ny, K, sym)
     for n1, n2, nv in it:
         #sys.stderr.write('n1=%d n2=%d %.2f\n' %(n1, n2, t1 - t0))
         print('n1=%d n2=%d nv=%s' %(n1, n2, nv))
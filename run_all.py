@@ -5,6 +5,8 @@ pyt = 'python'
 #pyt = 'python3'
 os.system('cd tests; %s test_hobj.py' % pyt)
 os.system('cd tests; %s test_active_nodes.py' % pyt)
+os.system('cd tests; %s test_zdd.py' % pyt)
+os.system('cd tests; %s test_bitsets.py' % pyt)
 os.system('cd bench; %s bench.py' % pyt)
 os.system('cd examples; %s d40nano.py 4' % pyt)
 os.system('cd examples; %s ms_sqnp.py 12 12' % pyt)
@@ -1,2 +1,3 @@
 from hobj import (dup_permanental_minor_poly, Hobj,
-    dup_matching_generating_poly, dup_gen_count_hobj, dup_independence_poly)
+    dup_matching_generating_poly, dup_gen_count_hobj, dup_independence_poly,
+    dup_hafnian_minor_poly)
@@ -1,42 +1,170 @@
-from collections import defaultdict, deque
+from collections import defaultdict
+from heapq import heapify, heappush, heappop
 
-def _add_links1(links0, d1, d2):
+
+class _Pruned(Exception):
+    """
+    raised when the number of active nodes exceeds the bound
+    """
+    pass
+
+class _Bound(object):
+    """
+    bound on the width used in a single process, with the interface
+    of ``multiprocessing.Value``
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def get_lock(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+class _Frontier(object):
+    """
+    edges added to a graph, with the residual adjacency lists
+    and the active nodes, those with some but not all of their edges added
+
+    ``keys`` gives the position of the nodes in the order in which they
+    are first met; ``c1`` is the set of nodes with one missing edge,
+    ``c2`` the set of touched nodes with missing edges to larger nodes;
+    adding an edge raises ``_Pruned`` if the number of active nodes
+    exceeds ``bound``.
+    """
+    def __init__(self, d):
+        self.d = d
+        self.rem = dict([(k, list(v)) for k, v in d.items()])
+        self.cnt = dict.fromkeys(d, 0)
+        self.larger = dict([(k, len([k1 for k1 in v if k1 > k]))
+                            for k, v in d.items()])
+        self.active = set()
+        self.keys = {}
+        self.korder = []
+        self.c1 = set([k for k, v in d.items() if len(v) == 1])
+        self.c2 = set()
+        self.rorder = list(d)
+        self.rank = dict([(k, i) for i, k in enumerate(self.rorder)])
+        self.bound = None
+
+    def insert_key(self, k):
+        keys = self.keys
+        if k not in keys:
+            keys[k] = len(keys)
+            self.korder.append(k)
+
+    def add(self, k1, k2):
+        """
+        add the edge ``(k1, k2)``
+        """
+        self.insert_key(k1)
+        self.insert_key(k2)
+        rem = self.rem
+        rem[k1].remove(k2)
+        rem[k2].remove(k1)
+        if k1 < k2:
+            self.larger[k1] -= 1
+        else:
+            self.larger[k2] -= 1
+        for k in (k1, k2):
+            self.cnt[k] += 1
+            if rem[k]:
+                self.active.add(k)
+            else:
+                self.active.discard(k)
+            if len(rem[k]) == 1:
+                self.c1.add(k)
+            else:
+                self.c1.discard(k)
+            if self.larger[k]:
+                self.c2.add(k)
+            else:
+                self.c2.discard(k)
+        if self.bound is not None and len(self.active) > self.bound:
+            raise _Pruned
+
+def _add_links1(links, fr):
     """
     add links without increasing the number of active nodes
-    d1 adjacency dict of the graph
-    d2 adjacency dict of the part of the graph covered
+
+    Repeat until nothing changes: in the order of the nodes met so far,
+    add the missing edge of the nodes with only one missing edge;
+    in the order of ``d``, add the missing edges of the touched nodes
+    to larger nodes; in the first pass on ``d`` an edge to a node not met
+    yet is added only if it is the last one missing.
+
+    Only the nodes which can satisfy these conditions are visited,
+    using heaps indexed by their position in the two orders.
     """
-    links = []
+    d1 = fr.d
+    keys = fr.keys
+    rem = fr.rem
+    cnt = fr.cnt
+    rank = fr.rank
+    rorder = fr.rorder
+    added = []
     hit = True
     while hit:
         hit = False
-        for k, a in list(d2.items()):
-            # if there is only one edge missing to complete a node, add it
-            if len(a) == len(d1[k]) - 1:
-                a1 = d1[k]
-                k1 = [x for x in a1 if x not in a][0]
-                if k > k1:
-                    k, k1 = k1, k
-                d2[k].append(k1)
-                d2[k1].append(k)
-                hit = True
-                links.append((k, k1))
-        # it two nodes adjacent in d1 are present in d2, and there
-        # is no edge between them in d2, add it
-        for k1, a in d1.items():
-            if not d2[k1]:
+        end = len(keys)
+        heap = [keys[k] for k in fr.c1 if k in keys]
+        heapify(heap)
+        korder = fr.korder
+        ptr = -1
+        while heap:
+            i = heappop(heap)
+            if i <= ptr:
+                continue
+            ptr = i
+            k = korder[i]
+            if len(rem[k]) != 1:
+                continue
+            k1 = rem[k][0]
+            if k > k1:
+                k, k1 = k1, k
+            fr.add(k, k1)
+            hit = True
+            added.append((k, k1))
+            for kx in (k, k1):
+                i1 = keys[kx]
+                if kx in fr.c1 and ptr < i1 < end:
+                    heappush(heap, i1)
+        if len(keys) < len(d1):
+            for k1, a in d1.items():
+                fr.insert_key(k1)
+                if not cnt[k1]:
+                    continue
+                for k2 in a:
+                    if k1 < k2 and ((k2 not in keys and
+                        len(rem[k1]) == 1) or (k2 in keys and k2 in rem[k1])):
+                        fr.add(k1, k2)
+                        hit = True
+                        added.append((k1, k2))
+            continue
+        heap = [rank[k] for k in fr.c2]
+        heapify(heap)
+        ptr = -1
+        while heap:
+            i = heappop(heap)
+            if i <= ptr:
+                continue
+            ptr = i
+            k1 = rorder[i]
+            if not cnt[k1]:
                 continue
-            for k2 in a:
-                if k1 < k2 and k1 in d2 and \
-                    ((k2 not in d2 and len(d2[k1]) == len(d1[k1]) - 1) or \
-                    (k2 in d2 and k2 not in d2[k1])):
-                    d2[k1].append(k2)
-                    d2[k2].append(k1)
+            for k2 in d1[k1]:
+                if k1 < k2 and k2 in rem[k1]:
+                    fr.add(k1, k2)
                     hit = True
-                    links.append((k1, k2))
-
-    links0.extend(links)
-    return links
+                    added.append((k1, k2))
+                    if k2 in fr.c2 and rank[k2] > ptr:
+                        heappush(heap, rank[k2])
+    links.extend(added)
+    return added
 
 def m_from_d(d):
     n = len(d)
@@ -68,61 +196,60 @@ def d_from_links(links):
     return d
 
 
-def _append_link(dx, links, k1, k2):
-    assert not (k1,k2) in links
-    assert not (k2,k1) in links
-    dx[k1].append(k2)
-    dx[k2].append(k1)
-    links.append((k1, k2))
-
-def _short_path_active_nodes(G, s, a):
+def _short_path_active_nodes(rem, active):
     """
-    Return a short path starting in `s` and ending in a node in `a`
-    Return None if there is not such a path
+    shortest path in the residual graph between two active nodes
+
+    Parameters
+    ==========
+
+    rem : residual adjacency lists
+    active : list of the active nodes
+
+    Notes
+    =====
+
+    Returns the path, as a list of nodes ending in a node ``s`` of
+    ``active``, found by a breadth-first search from the first ``s``
+    at minimal distance from another active node, or None.
+
+    The searches from all the active nodes are advanced one layer
+    at a time, so that only the balls of radius equal to the minimal
+    distance are explored.
     """
-    P, Q = {s: None}, deque([s])
-    while Q:
-        u = Q.popleft()
-        for v in G[u]:
-            if v in P:
-                continue
-            P[v] = u
-            if v in a:
-                a1 = [v]
-                while 1:
-                    v = P[v]
-                    a1.append(v)
+    a = set(active)
+    searches = [(s, {s: None}, [s]) for s in active]
+    while searches:
+        alive = []
+        for s, P, layer in searches:
+            layer1 = []
+            for u in layer:
+                for v in rem[u]:
+                    if v in P:
+                        continue
+                    P[v] = u
                     if v in a:
+                        a1 = [v]
+                        while v != s:
+                            v = P[v]
+                            a1.append(v)
                         return a1
-                assert 0
-            Q.append(v)
+                    layer1.append(v)
+            if layer1:
+                alive.append((s, P, layer1))
+        searches = alive
     return None
 
-def _short_path_active_nodes_all(d, dx, active):
-    ax = [0]*len(d)
-    # adjacency list of complement of G and Gx
-    for k, v in d.items():
-        v1 = dx[k]
-        ak = [y for y in v if y not in v1]
-        ax[k] = ak
-    min_length = 10000
-    min_path = None
-    for i in active:
-        a1 = _short_path_active_nodes(ax, i, active)
-        if a1 is not None and len(a1) < min_length:
-            min_length = len(a1)
-            min_path = a1
-    return min_path
-
-def _add_paths(d, dx, links, a1):
+def _add_paths(fr, links, a1):
     added = []
     for i in range(len(a1) - 1):
         k1, k2 = a1[i], a1[i+1]
         if k2 < k1:
             k2, k1 = k1, k2
-        _append_link(dx, links, k1, k2)
+        fr.add(k1, k2)
+        links.append((k1, k2))
         added.append((k1, k2))
-    r = _add_links1(links, d, dx)
+    r = _add_links1(links, fr)
     added.extend(r)
     return added
 
@@ -146,23 +273,117 @@ def ordered_links(d, k0, k1):
     """
     assert k0 in d
     assert k1 in d[k0]
-    dx = defaultdict(list)
-    links = []
-    _append_link(dx, links, k0, k1)
-    r = _add_links1(links, d, dx)
-    while 1:
-        active = [k for k in dx if 0 < len(dx[k]) < len(d[k])]
-        if not active:
-            break
-        a1 = _short_path_active_nodes_all(d, dx, active)
-        if a1 is None:
-            break
-        a2 = _add_paths(d, dx, links, a1)
+    return _ordered_links(d, k0, k1)
+
+def _ordered_links(d, k0, k1, bound=None):
+    """
+    ``ordered_links``, or None if the number of active nodes exceeds
+    ``bound.value``, which is read after each path
+    """
+    fr = _Frontier(d)
+    if bound is not None:
+        fr.bound = bound.value
+    links = [(k0, k1)]
+    try:
+        fr.add(k0, k1)
+        _add_links1(links, fr)
+        keys = fr.keys
+        while fr.active:
+            active = sorted(fr.active, key=keys.get)
+            a1 = _short_path_active_nodes(fr.rem, active)
+            if a1 is None:
+                break
+            if bound is not None:
+                fr.bound = bound.value
+            _add_paths(fr, links, a1)
+    except _Pruned:
+        return None
     return links
 
-def ordered_links_all(d):
+def _ordered_start(typ, d, k1, k2, bound):
+    """
+    ``(width, order)`` for the ordering starting from ``(k1, k2)``,
+    or None if its width exceeds ``bound.value``; if it does not, the
+    bound is lowered to the width
     """
-    find ordered links
+    if typ == 'links':
+        a = _ordered_links(d, k1, k2, bound)
+        if a is None:
+            return None
+        w = num_active_nodes(d, a)
+    else:
+        a = _ip_ordered_vertices(d, [k1, k2], bound)
+        if a is None:
+            return None
+        w = ip_num_active_elements(ip_list_objects_from_vlist(d, a))
+    with bound.get_lock():
+        if w < bound.value:
+            bound.value = w
+    return w, a
+
+_pool_args = None
+
+def _pool_init(d, bound):
+    global _pool_args
+    _pool_args = d, bound
+
+def _ordered_start_worker(task):
+    typ, k1, k2 = task
+    d, bound = _pool_args
+    return _ordered_start(typ, d, k1, k2, bound)
+
+def _ordered_all(typ, d, nprocs):
+    """
+    helper for ``ordered_links_all``, ``ip_ordered_vertices_all``
+    """
+    tasks = []
+    for k1, v in d.items():
+        for k2 in v:
+            if k1 < k2:
+                tasks.append((typ, k1, k2))
+    big = 1 << 30
+    if nprocs and nprocs > 1 and len(tasks) > 1:
+        from multiprocessing import Pool, Value
+        bound = Value('i', big)
+        pool = Pool(min(nprocs, len(tasks)), _pool_init, (d, bound))
+        try:
+            res = pool.map(_ordered_start_worker, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        bound = _Bound(big)
+        res = [_ordered_start(typ, d, k1, k2, bound) for typ, k1, k2 in tasks]
+    best = None
+    for task, r in zip(tasks, res):
+        if r is not None and (best is None or r[0] < best[0]):
+            best = r[0], task[1], task[2], r[1]
+    w, k1, k2, a = best
+    return k1, k2, a, w
+
+def ordered_links_all(d, nprocs=None):
+    """
+    find ordered links, trying all the starting links
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    nprocs : number of processes
+
+    Notes
+    =====
+
+    Returns ``(k1, k2, links, max_active)``, where ``links`` is the
+    ordering given by ``ordered_links(d, k1, k2)`` with the least number
+    of active nodes ``max_active``; among those with the least number
+    of active nodes, the first starting link in the order of ``d`` is
+    chosen.
+
+    The ordering from a starting link is abandoned as soon as its number
+    of active nodes exceeds the least one found so far; with ``nprocs``
+    processes the starting links are distributed among the processes,
+    which share the least number of active nodes found.
 
     Examples
     ========
@@ -172,18 +393,58 @@ def ordered_links_all(d):
     >>> ordered_links_all(d)
     (0, 1, [(0, 1), (0, 4), (1, 2), (2, 3), (3, 4)], 2)
     """
-    max_active = 10000
-    for k1x, v in d.items():
-        for k2x in v:
-            if k1x > k2x:
-                continue
-            linksx = ordered_links(d, k1x, k2x)
-            ma = num_active_nodes(d, linksx)
-            if ma < max_active:
-                max_active = ma
-                k1, k2 = k1x, k2x
-                links = linksx
-    return k1, k2, links, max_active
+    return _ordered_all('links', d, nprocs)
+
+def active_profile(d, links):
+    """
+    number of the active nodes after adding each link
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    links : list of edges of the graph
+
+    Notes
+    =====
+
+    A node is active if some, but not all, of its edges have been added.
+    The profile is computed in a single pass over ``links``.
+
+    Examples
+    ========
+
+    >>> from active_nodes import active_profile, profile_states
+    >>> d = {0:[1,4], 1:[0,2], 2:[1,3], 3:[2,4], 4:[0,3]}
+    >>> links = [(0, 1), (2, 3), (0, 4), (1, 2), (3, 4)]
+    >>> active_profile(d, links)
+    [2, 4, 4, 2, 0]
+    >>> profile_states(active_profile(d, links))
+    [4, 16, 16, 4, 1]
+    """
+    seen = {}
+    nu = 0
+    profile = []
+    for edge in links:
+        for k in edge:
+            c = seen.get(k, 0) + 1
+            seen[k] = c
+            deg = len(d[k])
+            if c == 1 and deg > 1:
+                nu += 1
+            elif c == deg and c > 1:
+                nu -= 1
+        profile.append(nu)
+    return profile
+
+def profile_states(profile):
+    """
+    bound ``2**nu`` on the number of states of the sweep for each
+    value ``nu`` of a profile of active nodes or elements
+
+    The sum of the list bounds the total work of the sweep.
+    """
+    return [1 << nu for nu in profile]
 
 def num_active_nodes(d, links):
     """
@@ -195,6 +456,11 @@ def num_active_nodes(d, links):
     d : dict for the graph
     links : list of edges of the graph
 
+    Notes
+    =====
+
+    It is the maximum of ``active_profile(d, links)``.
+
     Examples
     ========
 
@@ -205,16 +471,7 @@ def num_active_nodes(d, links):
     >>> num_active_nodes(d, links)
     2
     """
-    dx = defaultdict(list)
-    max_active = 0
-    for edge in links:
-        k1, k2 = edge
-        dx[k1].append(k2)
-        dx[k2].append(k1)
-        nactivex = len([k for k in dx if 0 < len(dx[k]) < len(d[k])])
-        if max_active < nactivex:
-            max_active = nactivex
-    return max_active
+    return max([0] + active_profile(d, links))
 
 def ip_ordered_vertices(d, *links0):
     """
@@ -224,33 +481,103 @@ def ip_ordered_vertices(d, *links0):
         assert k in d
     if not links0:
         links0 = [0, d[0][0]]
-    res = list(links0)
-    dx = defaultdict(list)
+    return _ip_ordered_vertices(d, links0)
+
+def _ip_ordered_vertices(d, links0, bound=None):
+    """
+    ``ip_ordered_vertices``, or None if the number of active elements
+    exceeds ``bound.value``, which is read after each path
+    """
+    res = []
+    done = set()
+    nu = [0]
+    maxnu = bound.value if bound is not None else None
+
+    def push(a):
+        for v in a:
+            res.append(v)
+            done.add(v)
+            for u in d[v]:
+                if u in done:
+                    nu[0] -= 1
+                else:
+                    nu[0] += 1
+            if maxnu is not None and nu[0] > maxnu:
+                raise _Pruned
+
+    fr = _Frontier(d)
     for i in range(len(links0) - 1):
-        k0 = links0[i]
-        k1 = links0[i + 1]
-        dx[k0].append(k1)
-        dx[k1].append(k0)
-    while 1:
-        active = [k for k in d if 0 < len(dx[k]) < len(d[k])]
-        if not active:
-            break
-        a1 = _short_path_active_nodes_all(d, dx, active)
-        if a1 is None:
-            break
-        res.extend(a1[1:-1])
-        for i in range(len(a1) - 1):
-            k1, k2 = a1[i], a1[i+1]
-            if k2 < k1:
-                k1, k2 = k2, k1
-            dx[k1].append(k2)
-            dx[k2].append(k1)
-    if len(res) < len(d):
-        for k in d:
-            if k not in res:
-                res.append(k)
+        fr.add(links0[i], links0[i + 1])
+    rank = fr.rank
+    try:
+        push(links0)
+        while fr.active:
+            active = sorted(fr.active, key=rank.get)
+            a1 = _short_path_active_nodes(fr.rem, active)
+            if a1 is None:
+                break
+            if bound is not None:
+                maxnu = bound.value
+            push(a1[1:-1])
+            for i in range(len(a1) - 1):
+                fr.add(a1[i], a1[i + 1])
+        if len(res) < len(d):
+            push([k for k in d if k not in done])
+    except _Pruned:
+        return None
     return res
 
+def ip_ordered_vertices_all(d, nprocs=None):
+    """
+    find ordered vertices, trying all the starting edges
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    nprocs : number of processes
+
+    Notes
+    =====
+
+    Returns ``(k1, k2, vlist, nu)``, where ``vlist`` is the ordering
+    given by ``ip_ordered_vertices(d, k1, k2)`` with the least number of
+    active elements ``nu``; see ``ordered_links_all``.
+
+    Examples
+    ========
+
+    >>> from active_nodes import ip_ordered_vertices_all
+    >>> d = {0:[1,2,3], 1:[0,2], 2:[0,1], 3:[0,4], 4:[3]}
+    >>> ip_ordered_vertices_all(d)
+    (1, 2, [1, 2, 0, 3, 4], 2)
+    """
+    return _ordered_all('vertices', d, nprocs)
+
+def links_from_vlist(d, vlist):
+    """
+    links of the graph ``d`` in the order of the vertices ``vlist``
+
+    Each link is added at its endpoint which comes later in ``vlist``;
+    the links added at a vertex are ordered by the position of the
+    other endpoint.
+
+    Examples
+    ========
+
+    >>> from active_nodes import links_from_vlist
+    >>> d = {0:[1,4], 1:[0,2], 2:[1,3], 3:[2,4], 4:[0,3]}
+    >>> links_from_vlist(d, [0, 1, 4, 2, 3])
+    [(0, 1), (0, 4), (1, 2), (4, 3), (2, 3)]
+    """
+    pos = dict([(k, i) for i, k in enumerate(vlist)])
+    links = []
+    for k in vlist:
+        a = [k1 for k1 in d[k] if pos[k1] < pos[k]]
+        a.sort(key=pos.get)
+        links.extend([(k1, k) for k1 in a])
+    return links
+
 def ip_get_dn(d):
     """
     return the dictionary with items ``((v1,v2), i)``,
@@ -332,19 +659,526 @@ def ip_num_active_elements(objects):
     which is the maximum number ``nu`` of ``eta`` elements appearing in the
     computation of the independence polynomial; its complexity depends
     from ``2**nu``.
- 
+
+    It is the maximum of ``ip_active_profile(objects)``.
     """
-    ac = set()
-    nu = 0
-    for obj in objects:
+    return max([0] + ip_active_profile(objects))
+
+def ip_active_profile(objects):
+    """
+    number of active elements after adding each object
+
+    Parameters
+    ==========
+
+    objects : list of tuple of indices of edges
+
+    Notes
+    =====
+
+    An element is active from the first object containing it to the
+    last one, excluded; the elements can occur in any number of
+    objects, so that the profile can be used also for a list of links.
+
+    Examples
+    ========
+
+    >>> from active_nodes import ip_list_objects_from_vlist, ip_active_profile
+    >>> d = {0:[1,4], 1:[0,2], 2:[1,3], 3:[2,4], 4:[0,3]}
+    >>> objects = ip_list_objects_from_vlist(d, [0, 1, 2, 3, 4])
+    >>> ip_active_profile(objects)
+    [2, 2, 2, 2, 0]
+    """
+    first = {}
+    last = {}
+    for s, obj in enumerate(objects):
         for i in obj:
-            if i in ac:
-                ac.remove(i)
+            if i not in first:
+                first[i] = s
+            last[i] = s
+    diff = [0]*(len(objects) + 1)
+    for i, s in first.items():
+        s1 = last[i]
+        if s < s1:
+            diff[s] += 1
+            diff[s1] -= 1
+    profile = []
+    nu = 0
+    for x in diff[:-1]:
+        nu += x
+        profile.append(nu)
+    return profile
+
+def _order_cost(objects):
+    """
+    ``(nu, nstates)``, where ``nu`` is the maximum number of active
+    elements and ``nstates`` is the sum over the objects of
+    ``2**nactive``, the bound on the number of states of the sweep
+    """
+    profile = ip_active_profile(objects)
+    return max(profile + [0]), sum(profile_states(profile))
+
+def optimize_order(objects, niter=2000, seed=0, time_budget=None, window=8):
+    """
+    improve the order of ``objects`` by simulated annealing
+
+    Parameters
+    ==========
+
+    objects : list of tuples of elements
+    niter : number of moves tried
+    seed : seed of the random number generator
+    time_budget : if not None, maximum time in seconds
+    window : maximum distance of the moves
+
+    Notes
+    =====
+
+    The moves are the exchange of two objects and the displacement
+    of a block of consecutive objects; the cost of an order is the
+    bound ``sum_s 2**nu_s`` on the number of states of the sweep,
+    where ``nu_s`` is the number of active elements after adding the
+    ``s``-th object; the order with the least maximum number of active
+    elements, and then the least cost, is returned.
+
+    The result depends only on ``seed`` and ``niter``, unless the
+    time budget is exceeded.
+
+    Examples
+    ========
+
+    >>> from active_nodes import optimize_order, num_active_nodes
+    >>> d = {0:[1], 1:[0,2], 2:[1,3], 3:[2,4], 4:[3,5], 5:[4,6], 6:[5]}
+    >>> links = [(0, 1), (4, 5), (2, 3), (1, 2), (3, 4), (5, 6)]
+    >>> num_active_nodes(d, links)
+    5
+    >>> links = optimize_order(links, niter=200); links
+    [(5, 6), (4, 5), (3, 4), (2, 3), (1, 2), (0, 1)]
+    >>> num_active_nodes(d, links)
+    1
+    """
+    return [objects[i] for i in _optimize_perm(objects, niter, seed,
+                                               time_budget, window)]
+
+def _optimize_perm(objects, niter=2000, seed=0, time_budget=None, window=8):
+    """
+    permutation of the indices of ``objects`` found by ``optimize_order``
+
+    The moves act on the indices, so that equal objects are not confused.
+    """
+    import random
+    from math import exp, log
+    from time import time
+    rnd = random.Random(seed)
+    n = len(objects)
+    a = list(range(n))
+    if n < 3:
+        return a
+    cur = _order_cost([objects[i] for i in a])
+    best = cur
+    best_a = a
+    energy = log(cur[1])
+    t0, t1 = 2.0, 0.05
+    start = time()
+    for it in range(niter):
+        frac = float(it) / niter
+        if time_budget is not None:
+            elapsed = time() - start
+            if elapsed > time_budget:
+                break
+            frac = max(frac, elapsed / time_budget)
+        temp = t0*(t1/t0)**frac
+        i = rnd.randrange(n - 1)
+        if rnd.random() < 0.5:
+            j = min(n - 1, i + rnd.randint(1, window))
+            a1 = list(a)
+            a1[i], a1[j] = a1[j], a1[i]
+        else:
+            length = rnd.randint(1, window)
+            block = a[i:i + length]
+            a1 = a[:i] + a[i + length:]
+            k = min(len(a1), max(0, i + rnd.randint(-window, window)))
+            a1[k:k] = block
+            if a1 == a:
+                continue
+        c = _order_cost([objects[i] for i in a1])
+        e = log(c[1])
+        if e <= energy or rnd.random() < exp((energy - e)/temp):
+            a = a1
+            cur = c
+            energy = e
+            if cur < best:
+                best = cur
+                best_a = a
+    return best_a
+
+def optimize_links(d, links=None, **kwargs):
+    """
+    improve an ordering of the links of the graph ``d``
+
+    ``links`` is by default ``ordered_links(d, 0, d[0][0])``; the other
+    parameters are those of ``optimize_order``.
+
+    Examples
+    ========
+
+    >>> from active_nodes import ordered_links, num_active_nodes, optimize_links
+    >>> from graphs_gen import dict_fuller
+    >>> d = dict_fuller(36)
+    >>> num_active_nodes(d, ordered_links(d, 0, d[0][0]))
+    10
+    >>> num_active_nodes(d, optimize_links(d, niter=20000))
+    8
+    """
+    if links is None:
+        k0 = min(d)
+        links = ordered_links(d, k0, d[k0][0])
+    return optimize_order(links, **kwargs)
+
+def ip_optimize_vertices(d, vlist=None, **kwargs):
+    """
+    improve an ordering of the vertices of the graph ``d`` for the
+    computation of the independence polynomial
+
+    ``vlist`` is by default ``ip_ordered_vertices(d)``; the other
+    parameters are those of ``optimize_order``.
+    """
+    if vlist is None:
+        vlist = ip_ordered_vertices(d)
+    objects = ip_list_objects_from_vlist(d, vlist)
+    return [vlist[i] for i in _optimize_perm(objects, **kwargs)]
+
+def _scalar(x):
+    """
+    Python number from a NumPy scalar; other numbers are returned as they are
+    """
+    item = getattr(x, 'item', None)
+    return item() if item is not None else x
+
+def sparse_rows(m):
+    """
+    rows of a matrix as lists of pairs ``(column, entry)`` of the
+    non-zero entries
+
+    Parameters
+    ==========
+
+    m : matrix given as
+        a list of lists, or a 2-dimensional NumPy array;
+        a dict of rows ``{i: {j: entry}}``, the missing rows being zero;
+        a CSR triple ``(indptr, indices, data)``, or an object with
+        these attributes, like ``scipy.sparse.csr_matrix``
+
+    Notes
+    =====
+
+    The time is proportional to the number of entries of a dense matrix,
+    to the number of non-zero entries of a sparse one; arrays are read
+    row by row, without copying them.
+
+    Examples
+    ========
+
+    >>> from active_nodes import sparse_rows
+    >>> sparse_rows([[0, 2, 0], [1, 0, 3]])
+    [[(1, 2)], [(0, 1), (2, 3)]]
+    >>> sparse_rows({1: {0: 1, 2: 3}})
+    [[], [(0, 1), (2, 3)]]
+    >>> sparse_rows(([0, 1, 3], [1, 0, 2], [2, 1, 3]))
+    [[(1, 2)], [(0, 1), (2, 3)]]
+    """
+    if isinstance(m, dict):
+        n = max(m) + 1 if m else 0
+        a = [[] for i in range(n)]
+        for i, r in m.items():
+            a[i] = sorted([(j, _scalar(x)) for j, x in r.items() if x])
+        return a
+    if isinstance(m, tuple):
+        indptr, indices, data = m
+    elif hasattr(m, 'indptr'):
+        indptr, indices, data = m.indptr, m.indices, m.data
+    else:
+        a = []
+        for r in m:
+            if hasattr(r, 'nonzero'):
+                a.append([(int(j), _scalar(r[j])) for j in r.nonzero()[0]])
             else:
-                ac.add(i)
-        if nu < len(ac):
-            nu = len(ac)
-    return nu
+                a.append([(j, x) for j, x in enumerate(r) if x])
+        return a
+    a = []
+    for i in range(len(indptr) - 1):
+        a.append([(int(indices[k]), _scalar(data[k]))
+                  for k in range(indptr[i], indptr[i + 1]) if data[k]])
+    return a
+
+def _sparse_transpose(a):
+    """
+    transpose of a matrix given by ``sparse_rows``
+    """
+    ny = max([j for r in a for j, x in r] + [-1]) + 1
+    b = [[] for j in range(ny)]
+    for i, r in enumerate(a):
+        for j, x in r:
+            b[j].append((i, x))
+    return b
+
+def _sparse_last_rows(a):
+    """
+    for each row of the matrix given by ``sparse_rows``, the list of
+    the columns having in it their last non-zero entry
+    """
+    last = {}
+    for i, r in enumerate(a):
+        for j, x in r:
+            last[j] = i
+    retire = [[] for r in a]
+    for j, i in last.items():
+        retire[i].append(j)
+    return retire
+
+def perm_active_profile(m, rows=None):
+    """
+    number of active columns of ``dup_permanental_minor_poly`` at each row
+
+    Parameters
+    ==========
+
+    m : matrix, in one of the forms accepted by ``sparse_rows``
+    rows : order of the rows, by default ``range(len(m))``
+
+    Notes
+    =====
+
+    A column is active from the first to the last row in which it is
+    non-zero, both included.
+
+    Examples
+    ========
+
+    >>> from active_nodes import perm_active_profile
+    >>> m = [[1,1,0,0],[0,0,1,1],[1,0,1,0],[0,1,0,1]]
+    >>> perm_active_profile(m)
+    [2, 4, 4, 2]
+    >>> perm_active_profile(m, [0, 2, 3, 1])
+    [2, 3, 3, 2]
+    """
+    return _perm_profile(sparse_rows(m), rows)
+
+def _perm_profile(a, rows=None):
+    if rows is None:
+        rows = range(len(a))
+    first = {}
+    last = {}
+    for i, r in enumerate(rows):
+        for j, x in a[r]:
+            if j not in first:
+                first[j] = i
+            last[j] = i
+    diff = [0]*(len(rows) + 1)
+    for j, i in first.items():
+        diff[i] += 1
+        diff[last[j] + 1] -= 1
+    profile = []
+    nu = 0
+    for x in diff[:-1]:
+        nu += x
+        profile.append(nu)
+    return profile
+
+def _perm_row_graph(a):
+    """
+    columns of the non-zero entries of each row of the matrix given by
+    ``sparse_rows``, and the dict of the graph of the rows, in which
+    two rows are adjacent if they have a non-zero entry in the same column
+    """
+    cols = [[j for j, x in r] for r in a]
+    col_rows = defaultdict(list)
+    for i, a in enumerate(cols):
+        for j in a:
+            col_rows[j].append(i)
+    d = {}
+    for i, a in enumerate(cols):
+        s = set()
+        for j in a:
+            s.update(col_rows[j])
+        s.discard(i)
+        d[i] = sorted(s)
+    return cols, col_rows, d
+
+def _bfs_levels(d, k0):
+    """
+    levels of the breadth first search from ``k0``
+    """
+    seen = set([k0])
+    levels = [[k0]]
+    while True:
+        a = []
+        for k in levels[-1]:
+            for k1 in d[k]:
+                if k1 not in seen:
+                    seen.add(k1)
+                    a.append(k1)
+        if not a:
+            return levels
+        levels.append(a)
+
+def _peripheral_row(d, k0):
+    """
+    pseudo-peripheral vertex of the component of ``k0``
+    """
+    levels = _bfs_levels(d, k0)
+    while True:
+        k1 = min(levels[-1], key=lambda k: (len(d[k]), k))
+        levels1 = _bfs_levels(d, k1)
+        if len(levels1) <= len(levels):
+            return k0
+        k0, levels = k1, levels1
+
+def _cuthill_mckee(d):
+    """
+    Cuthill-McKee order of the vertices of ``d``, labelled ``0..n-1``
+
+    Each connected component starts from a pseudo-peripheral vertex;
+    the neighbours of a vertex are visited by increasing degree.
+    """
+    n = len(d)
+    seen = [False]*n
+    order = []
+    for k0 in sorted(range(n), key=lambda k: (len(d[k]), k)):
+        if seen[k0]:
+            continue
+        k0 = _peripheral_row(d, k0)
+        seen[k0] = True
+        i = len(order)
+        order.append(k0)
+        while i < len(order):
+            a = [k for k in d[order[i]] if not seen[k]]
+            a.sort(key=lambda k: (len(d[k]), k))
+            for k in a:
+                seen[k] = True
+            order.extend(a)
+            i += 1
+    return order
+
+def _perm_greedy_rows(cols, col_rows, d, start):
+    """
+    greedy order of the rows, starting from the rows in ``start``
+
+    At each step the row adding the least number of active columns,
+    net of the columns it closes, is chosen among the rows sharing
+    a column with the active ones.
+    """
+    n = len(cols)
+    rem = dict([(j, len(a)) for j, a in col_rows.items()])
+    done = [False]*n
+    active = set()
+    cand = set()
+    order = []
+    it = iter(start)
+    while len(order) < n:
+        if cand:
+            best = None
+            for i in cand:
+                nopen = nclose = 0
+                for j in cols[i]:
+                    if j not in active:
+                        nopen += 1
+                    if rem[j] == 1:
+                        nclose += 1
+                key = (nopen - nclose, nopen, i)
+                if best is None or key < best:
+                    best = key
+            i = best[2]
+        else:
+            i = next(it)
+            if done[i]:
+                continue
+        done[i] = True
+        cand.discard(i)
+        order.append(i)
+        for j in cols[i]:
+            active.add(j)
+            rem[j] -= 1
+            if not rem[j]:
+                active.discard(j)
+        for j in cols[i]:
+            if j in active:
+                for i1 in col_rows[j]:
+                    if not done[i1]:
+                        cand.add(i1)
+    return order
+
+def perm_ordered_rows(m):
+    """
+    order of the rows of ``m`` reducing the number of active columns
+    of ``dup_permanental_minor_poly``
+
+    Parameters
+    ==========
+
+    m : matrix, in one of the forms accepted by ``sparse_rows``
+
+    Notes
+    =====
+
+    Returns ``(rows, width)``, where ``width`` is the maximum of
+    ``perm_active_profile(m, rows)``.
+    The candidates are the given order, the Cuthill-McKee order of the
+    graph of the rows, in which two rows are adjacent if they share
+    a column, and a greedy order starting from its first row;
+    the one with the smallest ``(width, states)`` is returned, with
+    ``states`` the sum of ``profile_states`` of the profile.
+
+    Examples
+    ========
+
+    >>> from active_nodes import perm_ordered_rows
+    >>> m = [[1,1,0,0],[0,0,1,1],[1,0,1,0],[0,1,0,1]]
+    >>> perm_ordered_rows(m)
+    ([0, 2, 3, 1], 3)
+    """
+    return _perm_ordered_rows(sparse_rows(m))
+
+def _perm_ordered_rows(a):
+    cols, col_rows, d = _perm_row_graph(a)
+    cm = _cuthill_mckee(d)
+    start = cm + sorted(range(len(a)), key=lambda k: (len(d[k]), k))
+    best = None
+    for rows in (list(range(len(a))), cm,
+                 _perm_greedy_rows(cols, col_rows, d, start)):
+        profile = _perm_profile(a, rows)
+        key = (max(profile + [0]), sum(profile_states(profile)))
+        if best is None or key < best[0]:
+            best = key, rows
+    return best[1], best[0][0]
+
+def perm_order(m):
+    """
+    order of the rows of ``m`` or of its transpose for
+    ``dup_permanental_minor_poly``
+
+    The sum of the permanental minors of a matrix and of its transpose
+    are equal; the dimension giving the smaller width is chosen.
+
+    Returns ``(transpose, rows, width)``, where ``transpose`` is True
+    if the rows are those of the transpose of ``m``.
+
+    Examples
+    ========
+
+    >>> from active_nodes import perm_order
+    >>> m = [[1,1,1,1,1,1],[1,1,1,1,1,1]]
+    >>> perm_order(m)
+    (True, [0, 1, 2, 3, 4, 5], 2)
+    """
+    return _perm_order(sparse_rows(m))
+
+def _perm_order(a):
+    rows, width = _perm_ordered_rows(a)
+    rows1, width1 = _perm_ordered_rows(_sparse_transpose(a))
+    if width1 < width:
+        return True, rows1, width1
+    return False, rows, width
 
 if __name__ == "__main__":
     import doctest
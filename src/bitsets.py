@@ -0,0 +1,263 @@
+""" Bulk binary export of hard object configurations
+
+  Configurations are encoded as integers, with the bit ``i`` set if
+  the object ``i`` is present (as the keys of the polynomial returned
+  by ``gen_hobj``); they are written as fixed-width little-endian bitsets
+  of ``(nbits + 7)//8`` bytes, one record after the other, either in a
+  ``bytearray`` or in a file which is then memory-mapped.
+
+  If NumPy is available the result is returned as an array of shape
+  ``(number of configurations, record size)`` and type ``uint8``,
+  without copying the data.
+
+"""
+import os
+import mmap
+try:
+    import numpy
+except ImportError:
+    numpy = None
+from compatibility import iteritems, int_from_bytes, int_to_bytes
+from hobj import _hobj_walk, _ip_vlist_objects
+
+CHUNK_SIZE = 1 << 16
+
+def _popcount(n):
+    return bin(n).count('1')
+
+def _as_array(buf, nrec, size, path=None):
+    """
+    view of ``buf`` as a NumPy array, if NumPy is available
+    """
+    if numpy is None:
+        return buf
+    if path is not None:
+        if not nrec:
+            return numpy.zeros((0, size), dtype=numpy.uint8)
+        return numpy.memmap(path, dtype=numpy.uint8, mode='r',
+                            shape=(nrec, size))
+    a = numpy.frombuffer(buf, dtype=numpy.uint8)
+    return a.reshape((nrec, size))
+
+def _mmap_file(path):
+    f = open(path, 'rb')
+    try:
+        if not os.fstat(f.fileno()).st_size:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        f.close()
+
+def _size_order(src, nrec, size, counts, out):
+    """
+    stable counting sort of the records of ``src`` by number of set bits
+
+    ``counts[k]`` is the number of records with ``k`` bits set;
+    the records are written in ``out``, which supports slice assignment
+    """
+    offsets = []
+    c = 0
+    for k in range(len(counts)):
+        offsets.append(c)
+        c += counts[k]
+    for i in range(nrec):
+        rec = src[i*size:(i + 1)*size]
+        k = _popcount(int_from_bytes(rec))
+        j = offsets[k]
+        out[j*size:(j + 1)*size] = rec
+        offsets[k] = j + 1
+
+def write_bitsets(configs, nbits, path=None, by_size=False,
+                  chunk_size=CHUNK_SIZE):
+    """
+    write configurations as fixed-width bitsets
+
+    Parameters
+    ==========
+
+    configs : iterable of integers encoding configurations
+    nbits : number of bits of each record
+    path : file in which the records are written; if it is None they
+           are written in memory
+    by_size : if True the records are grouped by number of set bits,
+              in increasing order; the order of the records with the same
+              number of bits set is the order in ``configs``
+    chunk_size : number of records written at a time
+
+    Notes
+    =====
+
+    The records are written in chunks, so that ``configs`` can be a
+    generator. With ``by_size`` the records are first written unsorted;
+    then a single counting-sort pass on the number of set bits places them
+    in their final position.
+
+    Returns ``(nrec, buf)``, where ``nrec`` is the number of records;
+    ``buf`` is a NumPy array of shape ``(nrec, (nbits + 7)//8)``
+    (a ``numpy.memmap`` if ``path`` is given), or, if NumPy is not
+    available, a ``bytearray`` or a read-only ``mmap``.
+
+    Examples
+    ========
+
+    >>> from bitsets import write_bitsets, iter_bitsets
+    >>> nrec, buf = write_bitsets([5, 0, 1, 3, 12], 9, by_size=True)
+    >>> nrec
+    5
+    >>> list(iter_bitsets(buf, 9))
+    [0, 1, 5, 3, 12]
+    """
+    size = (nbits + 7) // 8
+    counts = [0]*(nbits + 1)
+    nrec = 0
+    chunk = bytearray()
+    tmp = None
+    if path is None:
+        out = bytearray()
+    else:
+        tmp = path + '.tmp' if by_size else path
+        out = open(tmp, 'wb')
+    try:
+        try:
+            c = 0
+            for n in configs:
+                if n >> nbits:
+                    raise ValueError('configuration with more than %d bits'
+                                     % nbits)
+                chunk += int_to_bytes(n, size)
+                if by_size:
+                    counts[_popcount(n)] += 1
+                nrec += 1
+                c += 1
+                if c == chunk_size:
+                    if path is None:
+                        out += chunk
+                    else:
+                        out.write(chunk)
+                    chunk = bytearray()
+                    c = 0
+            if path is None:
+                out += chunk
+            else:
+                out.write(chunk)
+        finally:
+            if path is not None:
+                out.close()
+
+        if path is None:
+            if by_size:
+                buf = bytearray(len(out))
+                _size_order(out, nrec, size, counts, buf)
+                out = buf
+            return nrec, _as_array(out, nrec, size)
+
+        if by_size:
+            f = open(path, 'wb+')
+            try:
+                f.truncate(nrec*size)
+                if nrec:
+                    src = _mmap_file(tmp)
+                    dst = mmap.mmap(f.fileno(), 0)
+                    _size_order(src, nrec, size, counts, dst)
+                    dst.flush()
+                    dst.close()
+                    src.close()
+            finally:
+                f.close()
+    finally:
+        # the temporary file is removed also if ``configs`` raises
+        if tmp is not None and tmp != path and os.path.exists(tmp):
+            os.remove(tmp)
+    if numpy is not None:
+        return nrec, _as_array(None, nrec, size, path)
+    return nrec, _mmap_file(path)
+
+def iter_bitsets(buf, nbits):
+    """
+    generator of the integers encoded in the records of ``buf``
+
+    Parameters
+    ==========
+
+    buf : buffer returned by ``write_bitsets``
+    nbits : number of bits of each record
+    """
+    size = (nbits + 7) // 8
+    if numpy is not None and isinstance(buf, numpy.ndarray):
+        buf = buf.reshape(-1)
+    b = memoryview(buf)
+    for i in range(len(b) // size):
+        yield int_from_bytes(b[i*size:(i + 1)*size])
+
+def hobj_export(p, nbits, path=None, by_size=False):
+    """
+    write the configurations of a polynomial returned by ``gen_hobj``
+
+    Parameters
+    ==========
+
+    p : polynomial returned by ``gen_hobj``
+    nbits : number of objects
+    path, by_size : see ``write_bitsets``
+
+    Examples
+    ========
+
+    >>> from hobj import gen_hobj
+    >>> from bitsets import hobj_export, iter_bitsets
+    >>> p = gen_hobj([(0,1),(1,2),(2,3),(3,4),(0,4)])
+    >>> nrec, buf = hobj_export(p, 5, by_size=True)
+    >>> list(iter_bitsets(buf, 5))
+    [0, 16, 8, 4, 2, 1, 20, 18, 10, 9, 5]
+    """
+    return write_bitsets((expv for expv, _ in iteritems(p)), nbits, path,
+                         by_size)
+
+def independence_sets_export(d, path=None, by_size=False, vlist=None):
+    """
+    write the independent sets of the graph with dict ``d`` as bitsets
+
+    Parameters
+    ==========
+
+    d : dict for the graph, with vertices labelled ``0,..,len(d)-1``
+    path, by_size : see ``write_bitsets``
+    vlist : list of vertices of the graph
+
+    Notes
+    =====
+
+    The bit ``i`` of a record is set if the vertex ``i`` is in the
+    independent set; the independent sets are generated by the
+    backtracking walk of ``independent_sets_gen``, so they are never
+    all stored as Python objects.
+
+    Examples
+    ========
+
+    >>> from bitsets import independence_sets_export, iter_bitsets
+    >>> d = {0:[1,3], 1:[0,2], 2:[1,3], 3:[0,2]}
+    >>> nrec, buf = independence_sets_export(d, by_size=True)
+    >>> list(iter_bitsets(buf, 4))
+    [0, 1, 2, 4, 8, 5, 10]
+    """
+    if list(sorted(d.keys())) != list(range(len(d))):
+        raise ValueError('vertices should be labelled in 0,...,len(d)-1')
+    vlist, objects = _ip_vlist_objects(d, vlist)
+    bits = [1 << k for k in vlist]
+    def gen():
+        for a in _hobj_walk(objects):
+            n = 0
+            for i in a:
+                n |= bits[i]
+            yield n
+    return write_bitsets(gen(), len(d), path, by_size)
+
+
+if __name__ == "__main__":
+    import doctest
+    import sys
+    if sys.version_info < (2, 6):
+        print('doctests require Fraction, available from Python2.6')
+        sys.exit()
+    doctest.testmod()
@@ -11,3 +11,38 @@ def itervalues(p):
     except AttributeError:
         it = p.values()
     return it
+
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd
+
+if hasattr(int, 'from_bytes'):
+    def int_from_bytes(b):
+        """
+        integer encoded in little-endian order in the bytes ``b``
+        """
+        return int.from_bytes(b, 'little')
+
+    def int_to_bytes(n, size):
+        """
+        little-endian encoding of the integer ``n >= 0`` in ``size`` bytes
+        """
+        return n.to_bytes(size, 'little')
+else:
+    import binascii
+
+    def int_from_bytes(b):
+        """
+        integer encoded in little-endian order in the bytes ``b``
+        """
+        return int(binascii.hexlify(bytes(bytearray(b)[::-1])) or '0', 16)
+
+    def int_to_bytes(n, size):
+        """
+        little-endian encoding of the integer ``n >= 0`` in ``size`` bytes
+        """
+        if not size:
+            return b''
+        s = '%0*x' % (2*size, n)
+        return bytes(bytearray(binascii.unhexlify(s))[::-1])
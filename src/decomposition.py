@@ -0,0 +1,824 @@
+""" Decomposition of graphs
+
+  Functions splitting a graph, given as a dict associating to each
+  vertex the list of its neighbours, in parts on which the matching
+  and independence polynomials can be computed separately.
+
+"""
+from collections import deque
+from compatibility import iteritems
+
+
+def connected_components(d):
+    """
+    list of the connected components of the graph with dict ``d``
+
+    Each component is a list of vertices, in breadth-first order.
+
+    Examples
+    ========
+
+    >>> from decomposition import connected_components
+    >>> d = {0:[1], 1:[0], 2:[], 3:[4], 4:[3]}
+    >>> connected_components(d)
+    [[0, 1], [2], [3, 4]]
+    """
+    seen = set()
+    comps = []
+    for k in d:
+        if k in seen:
+            continue
+        seen.add(k)
+        comp = [k]
+        Q = deque([k])
+        while Q:
+            u = Q.popleft()
+            for v in d[u]:
+                if v not in seen:
+                    seen.add(v)
+                    comp.append(v)
+                    Q.append(v)
+        comps.append(comp)
+    return comps
+
+def subgraph(d, vertices):
+    """
+    dict of the subgraph induced by ``vertices``, with labels ``0,1,..``
+
+    The vertex ``vertices[i]`` is labelled ``i``.
+    """
+    dt = dict(zip(vertices, range(len(vertices))))
+    d1 = {}
+    for i, k in enumerate(vertices):
+        d1[i] = [dt[k1] for k1 in d[k] if k1 in dt]
+    return d1
+
+def biconnected_components(d):
+    """
+    list of the blocks (biconnected components) of the graph ``d``
+
+    Each block is a list of vertices; a bridge is a block with two
+    vertices, an isolated vertex is a block with one vertex.
+    Two blocks have at most a vertex in common, which is an articulation
+    point of the graph.
+
+    Examples
+    ========
+
+    >>> from decomposition import biconnected_components
+    >>> d = {0:[1,2], 1:[0,2], 2:[0,1,3], 3:[2,4], 4:[3]}
+    >>> biconnected_components(d)
+    [[3, 4], [2, 3], [0, 1, 2]]
+    """
+    index = {}
+    low = {}
+    blocks = []
+    c = 0
+    for root in d:
+        if root in index:
+            continue
+        index[root] = low[root] = c
+        c += 1
+        if not d[root]:
+            blocks.append([root])
+            continue
+        # depth first search with the stack of the edges
+        stack = [(root, None, iter(d[root]))]
+        estack = []
+        while stack:
+            u, parent, it = stack[-1]
+            for w in it:
+                if w == parent:
+                    continue
+                if w not in index:
+                    index[w] = low[w] = c
+                    c += 1
+                    estack.append((u, w))
+                    stack.append((w, u, iter(d[w])))
+                    break
+                if index[w] < index[u]:
+                    if index[w] < low[u]:
+                        low[u] = index[w]
+                    estack.append((u, w))
+            else:
+                stack.pop()
+                if not stack:
+                    continue
+                v = stack[-1][0]
+                if low[u] < low[v]:
+                    low[v] = low[u]
+                if low[u] >= index[v]:
+                    block = set()
+                    while 1:
+                        e = estack.pop()
+                        block.update(e)
+                        if e == (v, u):
+                            break
+                    blocks.append(sorted(block, key=index.get))
+    return blocks
+
+def articulation_points(d):
+    """
+    list of the articulation points of the graph ``d``
+
+    Examples
+    ========
+
+    >>> from decomposition import articulation_points
+    >>> d = {0:[1,2], 1:[0,2], 2:[0,1,3], 3:[2,4], 4:[3]}
+    >>> articulation_points(d)
+    [2, 3]
+    """
+    c = {}
+    for block in biconnected_components(d):
+        for k in block:
+            c[k] = c.get(k, 0) + 1
+    return [k for k in d if c[k] > 1]
+
+def perfect_elimination_ordering(d):
+    """
+    perfect elimination ordering of the graph ``d``, or None if ``d``
+    is not chordal
+
+    Notes
+    =====
+
+    In a perfect elimination ordering the neighbours of each vertex
+    which follow it form a clique.
+    The ordering is the reverse of a maximum cardinality search,
+    which gives a perfect elimination ordering if and only if
+    the graph is chordal; it is checked by testing that the neighbours
+    following a vertex ``v``, apart from the first one ``u``,
+    are neighbours of ``u``.
+
+    Interval graphs and forests are chordal.
+
+    Examples
+    ========
+
+    >>> from decomposition import perfect_elimination_ordering
+    >>> perfect_elimination_ordering({0:[1,2], 1:[0,2,3], 2:[0,1,3], 3:[1,2]})
+    [3, 2, 1, 0]
+    >>> perfect_elimination_ordering({0:[1,3], 1:[0,2], 2:[1,3], 3:[0,2]})
+    """
+    # maximum cardinality search, with buckets of vertices by weight
+    weight = dict([(k, 0) for k in d])
+    buckets = [set(d)]
+    numbered = set()
+    order = []
+    wmax = 0
+    for i in range(len(d)):
+        while not buckets[wmax]:
+            wmax -= 1
+        v = buckets[wmax].pop()
+        order.append(v)
+        numbered.add(v)
+        for u in d[v]:
+            if u in numbered:
+                continue
+            w = weight[u]
+            buckets[w].remove(u)
+            w += 1
+            weight[u] = w
+            if w == len(buckets):
+                buckets.append(set())
+            buckets[w].add(u)
+            if w > wmax:
+                wmax = w
+    order.reverse()
+    pos = dict([(k, i) for i, k in enumerate(order)])
+    s = dict([(k, set(v)) for k, v in iteritems(d)])
+    for v in order:
+        hn = [u for u in d[v] if pos[u] > pos[v]]
+        if len(hn) < 2:
+            continue
+        u = min(hn, key=pos.get)
+        su = s[u]
+        for w in hn:
+            if w != u and w not in su:
+                return None
+    return order
+
+def is_chordal(d):
+    """
+    True if the graph ``d`` has no induced cycle longer than 3
+    """
+    return perfect_elimination_ordering(d) is not None
+
+def is_claw_free(d):
+    """
+    True if the graph ``d`` has no induced claw ``K_{1,3}``
+
+    Line graphs are claw-free.
+
+    Examples
+    ========
+
+    >>> from decomposition import is_claw_free
+    >>> is_claw_free({0:[1,2,3], 1:[0], 2:[0], 3:[0]})
+    False
+    >>> is_claw_free({0:[1,2,3], 1:[0,2], 2:[0,1], 3:[0]})
+    True
+    """
+    s = dict([(k, set(v)) for k, v in iteritems(d)])
+    for k, v in iteritems(d):
+        n = len(v)
+        if n < 3:
+            continue
+        for i in range(n):
+            a = v[i]
+            sa = s[a]
+            for j in range(i + 1, n):
+                b = v[j]
+                if b in sa:
+                    continue
+                sb = s[b]
+                for c in v[j + 1:]:
+                    if c not in sa and c not in sb:
+                        return False
+    return True
+
+def _root_candidates(d, e, ends):
+    """
+    helper for ``line_graph_root``
+
+    list of pairs ``(x, z)`` of root vertices which are candidates for
+    the ends of ``e``; ``z`` is None for a new root vertex
+    """
+    placed = [f for f in d[e] if f in ends]
+    if not placed:
+        return placed, [(None, None)]
+    a = []
+    for x in ends[placed[0]]:
+        rest = [g for g in placed if x not in ends[g]]
+        if not rest:
+            a.append((x, None))
+            continue
+        zs = set(ends[rest[0]])
+        for g in rest[1:]:
+            zs.intersection_update(ends[g])
+        zs.discard(x)
+        a.extend([(x, z) for z in zs])
+    return placed, a
+
+def line_graph_root(d, max_steps=100000):
+    """
+    root graph of the line graph ``d``
+
+    Parameters
+    ==========
+
+    d : dict of a connected graph
+    max_steps : maximum number of steps of the backtracking search
+
+    Notes
+    =====
+
+    Returns ``(d1, ends)``, where ``d1`` is the dict of a graph whose line
+    graph is ``d``, with vertices ``0,1,..``, and ``ends`` is a dict
+    associating to each vertex of ``d`` the corresponding edge of ``d1``;
+    returns None if ``d`` is not a line graph or if the search takes more
+    than ``max_steps`` steps.
+
+    The vertices of ``d`` are placed in breadth-first order; a vertex
+    ``e`` shares a root vertex with the first of its placed neighbours;
+    its other end is the common root vertex of the placed neighbours
+    not sharing the first one, or a new root vertex.
+    The choice is accepted if the placed edges at the two ends are
+    exactly the placed neighbours of ``e``; otherwise the search
+    backtracks.
+    By Whitney's theorem the root of a connected line graph is unique up
+    to isomorphism, apart from the triangle, which is the line graph
+    of ``K_3`` and of ``K_{1,3}``; the placement is ambiguous only for the
+    first vertices, so that the backtracking is short.
+
+    Examples
+    ========
+
+    >>> from decomposition import line_graph_root
+    >>> d = {0:[1,2,3], 1:[0,2,4], 2:[0,1,3,4], 3:[0,2,4], 4:[1,2,3]}
+    >>> d1, ends = line_graph_root(d)
+    >>> sorted(len(v) for v in d1.values())
+    [2, 2, 3, 3]
+    """
+    if not d:
+        return {}, {}
+    k = next(iter(d))
+    order = [k]
+    seen = set(order)
+    Q = deque(order)
+    while Q:
+        u = Q.popleft()
+        for v in d[u]:
+            if v not in seen:
+                seen.add(v)
+                order.append(v)
+                Q.append(v)
+    if len(order) != len(d):
+        return None
+    n = len(order)
+    ends = {}
+    inc = {}
+    cands = [None]*n
+    nroots = [0]*(n + 1)
+    i = 0
+    steps = 0
+    while 1:
+        if i == n:
+            break
+        if i < 0:
+            return None
+        e = order[i]
+        if cands[i] is None:
+            placed, a = _root_candidates(d, e, ends)
+            cands[i] = (len(placed), iter(a))
+        else:
+            for x in ends.pop(e):
+                inc[x].remove(e)
+                if not inc[x]:
+                    del inc[x]
+        nplaced, it = cands[i]
+        nroot = nroots[i]
+        for x, z in it:
+            steps += 1
+            if steps > max_steps:
+                return None
+            if x is None:
+                x = nroot
+                nroot += 1
+            if z is None:
+                z = nroot
+                nroot += 1
+            if len(inc.get(x, ())) + len(inc.get(z, ())) == nplaced:
+                break
+            nroot = nroots[i]
+        else:
+            cands[i] = None
+            i -= 1
+            continue
+        ends[e] = (x, z)
+        inc.setdefault(x, set()).add(e)
+        inc.setdefault(z, set()).add(e)
+        nroots[i + 1] = nroot
+        i += 1
+    d1 = dict([(k, []) for k in range(nroots[n])])
+    for x, z in ends.values():
+        d1[x].append(z)
+        d1[z].append(x)
+    return d1, ends
+
+def _co_components(s, vertices):
+    """
+    connected components of the complement of the subgraph induced
+    by ``vertices``; ``s`` is the dict of the sets of neighbours
+    """
+    unvisited = set(vertices)
+    comps = []
+    for k in vertices:
+        if k not in unvisited:
+            continue
+        unvisited.remove(k)
+        comp = [k]
+        Q = deque([k])
+        while Q:
+            u = Q.popleft()
+            # each vertex of unvisited which is not taken is a
+            # neighbour of u, so the total work is O(n + m)
+            a = unvisited - s[u]
+            unvisited -= a
+            comp.extend(a)
+            Q.extend(a)
+        comps.append(comp)
+    return comps
+
+def _components_in(s, vertices):
+    """
+    connected components of the subgraph induced by ``vertices``
+    """
+    unvisited = set(vertices)
+    comps = []
+    for k in vertices:
+        if k not in unvisited:
+            continue
+        unvisited.remove(k)
+        comp = [k]
+        Q = deque([k])
+        while Q:
+            u = Q.popleft()
+            # the intersection runs over the smaller set, so that
+            # dense subgraphs are visited quickly
+            a = s[u] & unvisited
+            unvisited -= a
+            comp.extend(a)
+            Q.extend(a)
+        comps.append(comp)
+    return comps
+
+def _strongly_connected(out):
+    """
+    strongly connected components of the digraph with successor
+    lists ``out``, vertices ``0,..,len(out)-1``; each vertex is
+    mapped to the index of its component
+    """
+    n = len(out)
+    index = [-1]*n
+    low = [0]*n
+    comp = [-1]*n
+    onstack = [False]*n
+    stack = []
+    c = 0
+    nc = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = c
+        c += 1
+        stack.append(root)
+        onstack[root] = True
+        work = [(root, iter(out[root]))]
+        while work:
+            u, it = work[-1]
+            for w in it:
+                if index[w] < 0:
+                    index[w] = low[w] = c
+                    c += 1
+                    stack.append(w)
+                    onstack[w] = True
+                    work.append((w, iter(out[w])))
+                    break
+                if onstack[w] and index[w] < low[u]:
+                    low[u] = index[w]
+            else:
+                work.pop()
+                if work:
+                    p = work[-1][0]
+                    if low[u] < low[p]:
+                        low[p] = low[u]
+                if low[u] == index[u]:
+                    while 1:
+                        w = stack.pop()
+                        onstack[w] = False
+                        comp[w] = nc
+                        if w == u:
+                            break
+                    nc += 1
+    return comp, nc
+
+def _prime_children(s, vertices):
+    """
+    maximal strong modules of a connected and co-connected subgraph
+
+    Notes
+    =====
+
+    Let ``v`` be the first vertex; the maximal modules not containing
+    ``v`` are obtained by refining the partition ``{v}, V - {v}``
+    till each part is a module; they are the other maximal strong
+    modules and the maximal modules inside the maximal strong
+    module ``M_v`` containing ``v``.
+    A part ``Y`` is forced by a part ``X`` if its vertices distinguish
+    ``v`` from the vertices of ``X``: a module containing ``v`` and ``X``
+    contains ``Y``. The parts which force all the other parts are
+    the maximal strong modules not containing ``v``; they form the
+    source in the graph of the strongly connected components of the
+    forcing graph.
+    """
+    v = vertices[0]
+    vs = set(vertices)
+    parts = [set(vertices[1:])]
+    part_of = dict([(k, 0) for k in vertices[1:]])
+    pivots = deque(vertices)
+    inq = set(vertices)
+    while pivots:
+        y = pivots.popleft()
+        inq.discard(y)
+        py = part_of.get(y)
+        touched = {}
+        for w in s[y]:
+            i = part_of.get(w)
+            if i is not None and i != py:
+                touched.setdefault(i, []).append(w)
+        for i, a in iteritems(touched):
+            X = parts[i]
+            if len(a) == len(X):
+                continue
+            X1 = set(a)
+            X.difference_update(X1)
+            j = len(parts)
+            parts.append(X1)
+            for w in X1:
+                part_of[w] = j
+            for w in X1 | X:
+                if w not in inq:
+                    inq.add(w)
+                    pivots.append(w)
+    sv = s[v]
+    out = []
+    for i, X in enumerate(parts):
+        x = next(iter(X))
+        a = set()
+        for y in sv.symmetric_difference(s[x]):
+            if y in vs and y != v and y != x:
+                j = part_of[y]
+                if j != i:
+                    a.add(j)
+        out.append(list(a))
+    comp, nc = _strongly_connected(out)
+    has_in = [False]*nc
+    for i in range(len(parts)):
+        for j in out[i]:
+            if comp[i] != comp[j]:
+                has_in[comp[j]] = True
+    sources = [c for c in range(nc) if not has_in[c]]
+    if len(sources) != 1:
+        raise ValueError('the graph is not connected and co-connected')
+    mv = [v]
+    children = []
+    for i, X in enumerate(parts):
+        if comp[i] == sources[0]:
+            children.append([k for k in vertices if k in X])
+        else:
+            mv.extend(X)
+    mv = set(mv)
+    children.insert(0, [k for k in vertices if k in mv])
+    return children
+
+def modular_decomposition(d):
+    """
+    modular decomposition tree of the graph ``d``
+
+    Notes
+    =====
+
+    A module is a set of vertices ``M`` such that each vertex outside
+    ``M`` is adjacent to all the vertices of ``M`` or to none of them.
+    Each node of the tree is a tuple ``(kind, vertices, children)``,
+    where ``vertices`` is a strong module and ``kind`` is:
+
+    ``'leaf'``: a single vertex, without children;
+    ``'parallel'``: the subgraph is disconnected, the children are the
+    connected components;
+    ``'series'``: the complement of the subgraph is disconnected,
+    the children are the connected components of the complement;
+    ``'prime'``: the children are the maximal strong modules, and
+    the quotient graph, obtained taking a vertex for each child,
+    has only trivial modules.
+
+    Cographs are the graphs without prime nodes.
+
+    Examples
+    ========
+
+    >>> from decomposition import modular_decomposition
+    >>> d = {0:[1,2,3], 1:[0,2,3], 2:[0,1], 3:[0,1]}
+    >>> modular_decomposition(d)
+    ('series', [0, 1, 2, 3], [('leaf', [0], []), ('leaf', [1], []), ('parallel', [2, 3], [('leaf', [2], []), ('leaf', [3], [])])])
+    """
+    s = dict([(k, set(v)) for k, v in iteritems(d)])
+    top = []
+    stack = [(list(d), top)]
+    while stack:
+        vertices, out = stack.pop()
+        if len(vertices) == 1:
+            out.append(('leaf', vertices, []))
+            continue
+        parts = _components_in(s, vertices)
+        if len(parts) > 1:
+            kind = 'parallel'
+        else:
+            parts = _co_components(s, vertices)
+            if len(parts) > 1:
+                kind = 'series'
+            else:
+                kind = 'prime'
+                parts = _prime_children(s, vertices)
+        children = []
+        out.append((kind, vertices, children))
+        for part in reversed(parts):
+            stack.append((part, children))
+    return top[0]
+
+def has_twins(d):
+    """
+    True if two vertices of ``d`` have the same open or the same closed
+    neighbourhood
+
+    Notes
+    =====
+
+    Twins form a non-trivial module, so this is a linear time test
+    which is sufficient, but not necessary, for the modular decomposition
+    to be non-trivial.
+
+    Examples
+    ========
+
+    >>> from decomposition import has_twins
+    >>> has_twins({0:[1,2,3], 1:[0,2,3], 2:[0,1], 3:[0,1]})
+    True
+    >>> has_twins({0:[1,4], 1:[0,2], 2:[1,3], 3:[2,4], 4:[0,3]})
+    False
+    """
+    seen = set()
+    for k, v in iteritems(d):
+        a = frozenset(v)
+        b = a.union([k])
+        if (0, a) in seen or (1, b) in seen:
+            return True
+        seen.add((0, a))
+        seen.add((1, b))
+    return False
+
+def _md_nodes(node):
+    """
+    list of the nodes of a modular decomposition tree, parents first
+    """
+    a = [node]
+    i = 0
+    while i < len(a):
+        a.extend(a[i][2])
+        i += 1
+    return a
+
+def _color_refinement(d):
+    """
+    color refinement of the vertices of the graph ``d``
+
+    Returns ``(colors, inv)``, where ``colors`` is a dict from the vertices
+    to the colors and ``inv`` is an isomorphism invariant of the graph;
+    two graphs with the same invariant have colors which correspond
+    under any isomorphism.
+    """
+    colors = dict([(k, len(v)) for k, v in iteritems(d)])
+    inv = [tuple(sorted(colors.values()))]
+    ncolors = len(set(colors.values()))
+    while 1:
+        sig = {}
+        for k, v in iteritems(d):
+            sig[k] = (colors[k], tuple(sorted([colors[k1] for k1 in v])))
+        a = sorted(set(sig.values()))
+        dt = dict(zip(a, range(len(a))))
+        colors = dict([(k, dt[s]) for k, s in iteritems(sig)])
+        inv.append(tuple(sorted(sig.values())))
+        if len(a) == ncolors:
+            break
+        ncolors = len(a)
+    return colors, tuple(inv)
+
+def graph_invariant(d):
+    """
+    isomorphism invariant of the graph with dict ``d``
+
+    Isomorphic graphs have the same invariant; graphs with the same
+    invariant are not necessarily isomorphic.
+    """
+    return _color_refinement(d)[1]
+
+def is_isomorphic(d1, d2, max_steps=100000):
+    """
+    True if the graphs with dicts ``d1`` and ``d2`` are isomorphic
+
+    Parameters
+    ==========
+
+    d1, d2 : dicts for the graphs
+    max_steps : maximum number of steps of the backtracking search
+
+    Notes
+    =====
+
+    The vertices are matched by a backtracking search among the
+    vertices with the same color after color refinement.
+    If the search takes more than ``max_steps`` steps it is
+    stopped and None is returned.
+
+    Examples
+    ========
+
+    >>> from decomposition import is_isomorphic
+    >>> d1 = {0:[1,2], 1:[0,2], 2:[0,1], 3:[]}
+    >>> d2 = {'a':[], 'b':['c','d'], 'c':['b','d'], 'd':['b','c']}
+    >>> is_isomorphic(d1, d2)
+    True
+    """
+    if len(d1) != len(d2):
+        return False
+    c1, inv1 = _color_refinement(d1)
+    c2, inv2 = _color_refinement(d2)
+    if inv1 != inv2:
+        return False
+    # order the vertices of d1 so that each one, if possible,
+    # is adjacent to a previous one
+    order = []
+    seen = set()
+    for k in sorted(d1, key=lambda k: -len(d1[k])):
+        if k in seen:
+            continue
+        seen.add(k)
+        Q = deque([k])
+        while Q:
+            u = Q.popleft()
+            order.append(u)
+            for v in d1[u]:
+                if v not in seen:
+                    seen.add(v)
+                    Q.append(v)
+    by_color = {}
+    for k in d2:
+        by_color.setdefault(c2[k], []).append(k)
+    s2 = dict([(k, set(v)) for k, v in iteritems(d2)])
+
+    n = len(order)
+    f = {}
+    used = set()
+    # candidates for each position, as an iterator
+    cands = [None]*n
+    i = 0
+    steps = 0
+    while 1:
+        if i == n:
+            return True
+        if i < 0:
+            return False
+        u = order[i]
+        if cands[i] is None:
+            # if u is adjacent to a mapped vertex, the candidates
+            # are the neighbours of its image
+            a = [k for k in d1[u] if k in f]
+            if a:
+                a = [k for k in d2[f[a[0]]] if c2[k] == c1[u]]
+            else:
+                a = by_color[c1[u]]
+            cands[i] = iter(a)
+        elif u in f:
+            used.remove(f.pop(u))
+        found = False
+        for w in cands[i]:
+            steps += 1
+            if steps > max_steps:
+                return None
+            if w in used:
+                continue
+            ok = True
+            for k in d1[u]:
+                if k in f and f[k] not in s2[w]:
+                    ok = False
+                    break
+            if ok:
+                nf = len([k for k in d1[u] if k in f])
+                if nf != len([k for k in d2[w] if k in used]):
+                    ok = False
+            if ok:
+                found = True
+                break
+        if found:
+            f[u] = w
+            used.add(w)
+            i += 1
+        else:
+            cands[i] = None
+            i -= 1
+
+def isomorphism_classes(graphs):
+    """
+    partition the graphs in classes of isomorphic graphs
+
+    Returns a list of lists of indices of ``graphs``.
+
+    Notes
+    =====
+
+    Graphs whose isomorphism is not decided by ``is_isomorphic``
+    are put in different classes.
+
+    Examples
+    ========
+
+    >>> from decomposition import isomorphism_classes
+    >>> a = [{0:[1], 1:[0]}, {0:[1,2], 1:[0], 2:[0]}, {5:[6], 6:[5]}]
+    >>> isomorphism_classes(a)
+    [[0, 2], [1]]
+    """
+    buckets = {}
+    classes = []
+    for i, d in enumerate(graphs):
+        inv = graph_invariant(d)
+        b = buckets.setdefault(inv, [])
+        for c in b:
+            if is_isomorphic(graphs[c[0]], d):
+                c.append(i)
+                break
+        else:
+            c = [i]
+            b.append(c)
+            classes.append(c)
+    return classes
+
+
+if __name__ == "__main__":
+    import doctest
+    import sys
+    if sys.version_info < (2, 6):
+        print('doctests require Fraction, available from Python2.6')
+        sys.exit()
+    doctest.testmod()
@@ -81,6 +81,65 @@ def dup_lshift(f, n, K):
     else:
         return f + [K.zero]*n
 
+def dup_rshift(f, n, K):
+    """
+    Efficiently divide ``f`` by ``x**n`` in ``K[x]``.
+
+    Examples
+    ========
+
+    >>> from sympy.polys import ring, ZZ
+    >>> R, x = ring("x", ZZ)
+
+    >>> R.dup_rshift(x**4 + x**2, 2)
+    x**2 + 1
+    >>> R.dup_rshift(x**4 + x**2 + 2, 2)
+    x**2 + 1
+
+    """
+    return f[:-n]
+
+def dup_slice(f, m, n, K):
+    """
+    Take a continuous subsequence of terms of ``f`` in ``K[x]``.
+    """
+    k = len(f)
+
+    if k >= m:
+        M = k - m
+    else:
+        M = 0
+    if k >= n:
+        N = k - n
+    else:
+        N = 0
+
+    f = f[N:M]
+
+    while f and f[0] == K.zero:
+        f.pop(0)
+
+    if not f:
+        return []
+    else:
+        return f + [K.zero]*m
+
+def dup_neg(f, K):
+    """
+    Negate a polynomial in ``K[x]``.
+
+    Examples
+    ========
+
+    >>> from sympy.polys import ring, ZZ
+    >>> R, x = ring("x", ZZ)
+
+    >>> R.dup_neg(x**2 - 1)
+    -x**2 + 1
+
+    """
+    return [ -coeff for coeff in f ]
+
 def dup_add(f, g, K):
     """
     Add dense polynomials in ``K[x]``.
@@ -115,6 +174,40 @@ def dup_add(f, g, K):
 
         return h + [ a + b for a, b in zip(f, g) ]
 
+def dup_sub(f, g, K):
+    """
+    Subtract dense polynomials in ``K[x]``.
+
+    Examples
+    ========
+
+    >>> from sympy.polys import ring, ZZ
+    >>> R, x = ring("x", ZZ)
+
+    >>> R.dup_sub(x**2 - 1, x - 2)
+    x**2 - x + 1
+
+    """
+    if not f:
+        return dup_neg(g, K)
+    if not g:
+        return f
+
+    df = dup_degree(f)
+    dg = dup_degree(g)
+
+    if df == dg:
+        return dup_strip([ a - b for a, b in zip(f, g) ])
+    else:
+        k = abs(df - dg)
+
+        if df > dg:
+            h, f = f[:k], f[k:]
+        else:
+            h, g = dup_neg(g[:k], K), g[k:]
+
+        return h + [ a - b for a, b in zip(f, g) ]
+
 
 def dup_mul(f, g, K):
     """
@@ -144,10 +237,10 @@ def dup_mul(f, g, K):
     if n < 100 or min(df, dg) < 100:
         h = []
 
-        for i in xrange(0, df + dg + 1):
+        for i in range(0, df + dg + 1):
             coeff = K.zero
 
-            for j in xrange(max(0, i - dg), min(df, i) + 1):
+            for j in range(max(0, i - dg), min(df, i) + 1):
                 coeff += f[j]*g[i - j]
 
             h.append(coeff)
@@ -188,7 +281,7 @@ def dup_sqr(f, K):
     """
     df, h = dup_degree(f), []
 
-    for i in xrange(0, 2*df + 1):
+    for i in range(0, 2*df + 1):
         c = K.zero
 
         jmin = max(0, i - df)
@@ -198,7 +291,7 @@ def dup_sqr(f, K):
 
         jmax = jmin + n // 2 - 1
 
-        for j in xrange(jmin, jmax + 1):
+        for j in range(jmin, jmax + 1):
             c += f[j]*f[i - j]
 
         c += c
@@ -51,7 +51,32 @@ def complete_d(d):
         v.sort()
 
 
-def sq_mat(n1, n2, typ):
+def _sweep_key(shape):
+    """
+    key sorting the points of a box with sides ``shape`` in a sweep
+    along its longest side, by slices orthogonal to it
+    """
+    axes = sorted(range(len(shape)), key=lambda i: -shape[i])
+    return lambda c: tuple([c[i] for i in axes])
+
+def _sweep_rows(d1, shape):
+    """
+    values of ``d1``, sorted by the sweep order of their keys
+    """
+    key = _sweep_key(shape)
+    return [r for c, r in sorted(d1.items(), key=lambda x: key(x[0]))]
+
+def _sweep_objects(objects, d, shape):
+    """
+    ``objects`` sorted by the sweep order of their last point
+
+    ``d`` is the dict ``(point, index)``
+    """
+    key = _sweep_key(shape)
+    coords = dict([(i, c) for c, i in d.items()])
+    return sorted(objects, key=lambda obj: max([key(coords[i]) for i in obj]))
+
+def sq_mat(n1, n2, typ, geometry=False):
     """
     reduced adjacency matrix of a rectangle (n1, n2)
 
@@ -60,6 +85,12 @@ def sq_mat(n1, n2, typ):
     typ : type of boundary condition: ``pp`` periodic in both
     directions; ``np`` open boundary conditions,
     ``px`` periodic in x-direction
+    geometry : if True, return also the list of the rows in the
+    order of a sweep along the longest side, to be used as ``rows``
+    argument of ``dup_permanental_minor_poly``
+
+    Returns ``m, d1, d2``, where ``d1`` (``d2``) is the dict
+    ``(point, index)`` of the rows (columns).
     """
     d1 = {}
     d2 = {}
@@ -87,6 +118,8 @@ def sq_mat(n1, n2, typ):
                     m[r1][d2[(i, (j - 1) % n2)]] = 1
                     m[r1][d2[((i + 1) % n1, j)]] = 1
                     m[r1][d2[((i - 1) % n1, j)]] = 1
+        if geometry:
+            return m, d1, d2, _sweep_rows(d1, (n1, n2))
         return m, d1, d2
     elif typ == 'px':
         for i in range(n1):
@@ -111,6 +144,8 @@ def sq_mat(n1, n2, typ):
                         m[r1][d2[(i, j - 1)]] = 1
                     m[r1][d2[((i + 1)%n1, j)]] = 1
                     m[r1][d2[((i - 1)%n1, j)]] = 1
+        if geometry:
+            return m, d1, d2, _sweep_rows(d1, (n1, n2))
         return m, d1, d2
 
     elif typ == 'np':
@@ -137,11 +172,21 @@ def sq_mat(n1, n2, typ):
                         m[r1][d2[(i + 1, j)]] = 1
                     if i >= 1:
                         m[r1][d2[(i - 1, j)]] = 1
+        if geometry:
+            return m, d1, d2, _sweep_rows(d1, (n1, n2))
         return m, d1, d2
     else:
         raise NotImplementedError
 
-def sq_d_np(n1, n2):
+def sq_d_np(n1, n2, geometry=False):
+    """
+    dict of the square grid ``n1 x n2`` with open boundary conditions
+
+    If ``geometry`` is True, return also the dict ``(vertex, point)``
+    and the list of the vertices in the order of a sweep along the
+    longest side, to be used as ``vlist`` argument in
+    ``dup_independence_poly`` or ``dup_matching_generating_poly``.
+    """
     def _append(d, r1, r2):
         if r2 not in d[r1]:
             d[r1].append(r2)
@@ -176,11 +221,16 @@ def sq_d_np(n1, n2):
     for k, v in d.items():
         v.sort()
         d1[k] = v
+    if geometry:
+        coords = dict([(i, c) for c, i in dc.items()])
+        return d1, coords, _sweep_rows(dc, (n1, n2))
     return d1
 
-def hexagon_p(n1, n2):
+def hexagon_p(n1, n2, geometry=False):
     """
     hexagon lattice in brick wall representation, with periodic b.c.
+
+    ``geometry`` : see ``sq_mat``
     """
     assert n1 % 2 == 0
     assert n2 %2 == 0
@@ -191,15 +241,19 @@ def hexagon_p(n1, n2):
                 r2 = d2[(i, j % n2)]
                 r1 = d1[(i, (j + 1) % n2)]
                 m[r1][r2] = 0
+    if geometry:
+        return m, d1, d2, _sweep_rows(d1, (n1, n2))
     return m, d1, d2
 
-def triangle_lattice_pp(nx, ny):
+def triangle_lattice_pp(nx, ny, geometry=False):
     """
-    triangle lattice with open boundary conditions
+    triangle lattice with periodic boundary conditions
     return m, d, a
     m adjacency matrix
     d dict ((i, j), node_index)
     a  list of links
+    if ``geometry`` is True, return also the links in the order of a sweep
+    along the longest side
     """
     c = 0
     d = {}
@@ -225,15 +279,19 @@ def triangle_lattice_pp(nx, ny):
             m[r1][r2] = 1
             m[r2][r1] = 1
             a.append((r1, r2))
+    if geometry:
+        return m, d, a, _sweep_objects(a, d, (nx, ny))
     return m, d, a
 
-def kings_sq_mat_np(nx, ny):
+def kings_sq_mat_np(nx, ny, geometry=False):
     """
     kings on a rectangle with open b.c.
     return m, d, a
     m adjacency matrix
     d dict ((i, j), node_index)
     a  list of links
+    if ``geometry`` is True, return also the objects ``a`` in the order
+    of a sweep along the longest side
     """
     c = 0
     d = {}
@@ -259,15 +317,19 @@ def kings_sq_mat_np(nx, ny):
                 r2 = d[(i+1, j)]
                 m[r1][r2] = 1
                 m[r2][r1] = 1
+    if geometry:
+        return m, d, a, _sweep_objects(a, d, (nx, ny))
     return m, d, a
 
-def hard_sq_np(nx, ny):
+def hard_sq_np(nx, ny, geometry=False):
     """
     hard squares on a rectangle with open b.c.
     return m, d, a
     m adjacency matrix
     d dict ((i, j), node_index)
     a  list of links
+    if ``geometry`` is True, return also the objects ``a`` in the order
+    of a sweep along the longest side
     """
     d = {}
     c = 0
@@ -297,6 +359,8 @@ def hard_sq_np(nx, ny):
             m[r4][r2] = 1
             m[r3][r4] = 1
             m[r4][r3] = 1
+    if geometry:
+        return m, d, a, _sweep_objects(a, d, (2*nx + 1, 2*ny + 1))
     return m, d, a
 
 def wanless_example1(k, f):
@@ -339,9 +403,12 @@ def wanless_example1(k, f):
         m[r1][r2] = 1
     return m
 
-def sc_mat_np(n1, n2, n3):
+def sc_mat_np(n1, n2, n3, geometry=False):
     """
     return reduced adjacency matrix and vertices for slab
+
+    If ``geometry`` is True, return also the list of the rows in the
+    order of a sweep along the longest side, by slices orthogonal to it.
     """
     d1 = {}
     d2 = {}
@@ -380,6 +447,8 @@ def sc_mat_np(n1, n2, n3):
                         m[r1][d2[(i1, i2, i3 + 1)]] = 1
                     if i3 >= 1:
                         m[r1][d2[(i1, i2, i3 - 1)]] = 1
+    if geometry:
+        return m, v1, v2, d1, d2, _sweep_rows(d1, (n1, n2, n3))
     return m, v1, v2, d1, d2
 
 
@@ -604,3 +673,29 @@ def line_graph(d):
                 w.append(j)
         d1[i] = w
     return d1
+
+def ring_perms(rings, reflections=True):
+    """
+    dihedral (or cyclic) group acting simultaneously on rings
+
+    rings : list of lists of the same length ``ny``, the vertices of
+    each ring in cyclic order
+    reflections : if False only the rotations are returned
+
+    Returns the list of the ``2*ny - 1`` (``ny - 1``) non-identity
+    elements of the group, each a dict from the vertices to their images;
+    used as ``perms`` argument in ``dup_gen_count_hobj`` for strips
+    periodic in the transverse direction.
+    """
+    ny = len(rings[0])
+    perms = []
+    for s in ([1, -1] if reflections else [1]):
+        for r in range(ny):
+            if s == 1 and r == 0:
+                continue
+            g = {}
+            for a in rings:
+                for i in range(ny):
+                    g[a[i]] = a[(s*i + r) % ny]
+            perms.append(g)
+    return perms
@@ -11,11 +11,13 @@
   ``Z(t) = <Prod (1 + t*Prod eta_i)>``
 
 """
+from itertools import combinations
 from densearith import (dup_lshift, dup_add, dup_mul, dup_mul_ground)
-from densearith import dup_degree, dup_strip, dup_lshift
-from active_nodes import ip_ordered_vertices, ip_list_objects_from_vlist
-from compatibility import iteritems
-from domains import ZZ
+from densearith import dup_degree, dup_strip, dup_lshift, dup_valuate
+from active_nodes import (ip_ordered_vertices, ip_list_objects_from_vlist,
+    sparse_rows, _sparse_transpose, _sparse_last_rows, _perm_order)
+from compatibility import iteritems, gcd
+from domains import ZZ, QQ
 
 #                  0  1  10 11, 100 101, 110, 111
 _bits_set_table = [0, 1, 1, 2,  1,  2,   2,   3  ]
@@ -30,18 +32,6 @@ def count_bits_set(n):
         n >>= 3
     return c
 
-def _is_free_var(i, k, m):
-    """
-    i  current row
-    k  index of the variable
-    m  matrix as a list of lists
-    returns true if the variable `k` does not occur from row `i` on
-    """
-    for j in range(i, len(m)):
-        if m[j][k] != 0:
-            return False
-    return True
-
 def _monom(n):
     """
     monomial in `eta` variables from the number `n` encoding it
@@ -55,115 +45,303 @@ def _monom(n):
         i += 1
     return v
 
-def _prm_mul(p1, p2, free_vars_indices, K):
+def _prm_iadd_term(p, exp, v1, x, n, K):
+    """
+    add ``x*t**n*v1`` to ``p[exp]``, in place if its degree is not smaller
+    """
+    v = p.get(exp)
+    if v is None or len(v) < len(v1) + n:
+        v1 = dup_mul_ground(v1, x, K)
+        if n:
+            v1 = dup_lshift(v1, n, K)
+        p[exp] = dup_add(v, v1, K) if v else v1
+        return
+    k = len(v) - len(v1) - n
+    if x == 1:
+        for i in range(len(v1)):
+            v[k + i] += v1[i]
+    else:
+        for i in range(len(v1)):
+            v[k + i] += x*v1[i]
+
+def _prm_row_terms(r, mask_free, mult):
+    """
+    terms of ``(1 + sum x_j)**mult`` for the pairs ``(j, x)`` of the row
+    ``r``, where ``x_j = x*t*eta_j``
+
+    Since the ``eta_j`` are nilpotent, the term of a set ``S`` of
+    ``k <= mult`` columns is ``mult!/(mult - k)! * prod_{j in S} x_j``.
+    Returns the list of ``(exp_a, exp_b, nb, x)``, where ``exp_a``
+    (``exp_b``) has the bits of the columns in ``S`` not in
+    ``mask_free`` (in ``mask_free``), ``nb`` is the number of the latter
+    and ``x`` the coefficient.
+    """
+    terms = []
+    f = 1
+    for k in range(min(mult, len(r)) + 1):
+        for a in combinations(r, k):
+            exp_a = exp_b = 0
+            x = f
+            for j, y in a:
+                if mask_free & (1 << j):
+                    exp_b |= 1 << j
+                else:
+                    exp_a |= 1 << j
+                x *= y
+            terms.append((exp_a, exp_b, count_bits_set(exp_b), x))
+        f *= mult - k
+    return terms
+
+def _prm_iadd_row(p, r, free_vars_indices, K, val=None, mult=1):
     """
     helper function for dup_permanental_minor_poly
-    Return the product of ``p1`` and ``p2``
+    multiply in place ``p`` by ``(1 + sum x_j)**mult`` for the pairs
+    ``(j, x)`` of the row ``r``, where ``x_j = x*t*eta_j``, and integrate
+    the elements in ``free_vars_indices``
 
     Parameters
     ==========
 
-    p1 : polynomial
-    p2 : linear polynomial
+    p : polynomial in the ``eta_j`` elements, with polynomials in ``t``
+        as coefficients (numbers, if ``val`` is not None)
+    r : list of the pairs ``(j, x)`` of the non-zero entries of the row
     free_vars_indices : list of variables not used anymore
+    val : value of ``t``
+    mult : number of copies of the row
 
     Notes
     =====
 
-    ``p1`` is a polynomial in the ``x_i=t*eta_i`` elements, with polynomials
-    in ``t`` as coefficients;
-    ``p2`` is a linear polynomial in the ``x_i`` elements, with numbers
-    as coefficients.
-    If after the product an ``eta-object``
-    is not anymore used, it is replaced by the variable ``t``
+    The free elements are non-zero in ``r``, being the ones in their
+    last row.
+    The keys of ``p`` are grouped by their base, the key without free
+    elements, and the groups are visited by decreasing base; the
+    products of a group by the terms with only free elements go to its
+    base, the other products go to larger bases, which have already
+    been visited.
+    So the coefficients are updated in place, only the keys containing
+    free elements are rewritten, and ``p`` never holds more than one
+    table of states.
 
     Examples
     ========
 
     ``p1 = (1 + 2*t) + (1+t)*x_0; p2 = 1 + x_0 + x_1``
-    ``<p1*p2> = _prm_mul(p1, p2, [0, 1], ZZ)``
+    ``<p1*p2>``
 
-    >>> from hobj import _prm_mul
+    >>> from hobj import _prm_iadd_row
     >>> from domains import ZZ
-    >>> p1 = {0:[2, 1], 1:[1, 1]}
-    >>> p2 = {0:1, 1:1, 2:1}
-    >>> _prm_mul(p1, p2, [0, 1], ZZ)
+    >>> p = {0:[2, 1], 1:[1, 1]}
+    >>> _prm_iadd_row(p, [(0, 1), (1, 1)], [0, 1], ZZ)
     {0: [1, 6, 5, 1]}
+
+    ``<p2**2> = 1 + 4*t + 2*t**2``
+
+    >>> _prm_iadd_row({0: [1]}, [(0, 1), (1, 1)], [0, 1], ZZ, mult=2)
+    {0: [2, 4, 1]}
     """
-    p = {}
     mask_free = 0
     for i in free_vars_indices:
         mask_free += 1 << i
-    if not p2:
-        return p
+    a = []
+    b = []
+    for term in _prm_row_terms(r, mask_free, mult):
+        if term[0]:
+            a.append(term)
+        else:
+            b.append(term)
+    nmask = ~mask_free
+    bases = [exp for exp in p if not exp & mask_free]
+    bases.sort(reverse=True)
+    masked = [exp for exp in p if exp & mask_free]
+    masked.sort(key=lambda exp: exp & nmask, reverse=True)
+    if val is not None:
+        pw = [1]
+        for i in range(len(free_vars_indices) + 1):
+            pw.append(pw[-1]*val)
     get = p.get
-    for exp1, v1 in iteritems(p1):
-        for exp2, v2 in p2.items():
-            if exp1 & exp2:
+    nb = len(bases)
+    nm = len(masked)
+    i = k = 0
+    while i < nb or k < nm:
+        if k < nm and (i == nb or masked[k] & nmask >= bases[i]):
+            base = masked[k] & nmask
+        else:
+            base = bases[i]
+        a1 = []
+        if i < nb and bases[i] == base:
+            a1.append((base, 0, p[base]))
+            i += 1
+        grouped = False
+        while k < nm and masked[k] & nmask == base:
+            exp1 = masked[k]
+            a1.append((exp1, count_bits_set(exp1 & mask_free), p.pop(exp1)))
+            k += 1
+            grouped = True
+        if len(b) > 1 or grouped:
+            v = K.zero if val is not None else []
+            for exp1, c, v1 in a1:
+                for exp_a, exp_b, nf, x in b:
+                    if exp1 & exp_b:
+                        continue
+                    if val is not None:
+                        v += v1*x*pw[c + nf]
+                        continue
+                    v2 = v1 if x == 1 else dup_mul_ground(v1, x, K)
+                    if c + nf:
+                        v2 = dup_lshift(v2, c + nf, K)
+                    v = dup_add(v, v2, K)
+            p[base] = v
+        for exp_a, exp_b, nf, x in a:
+            if base & exp_a:
                 continue
-            exp = exp1 | exp2
-            v =  dup_mul_ground(v1, v2, K)
-            if exp & mask_free:
-                for i in free_vars_indices:
-                    if exp & (1 << i):
-                        exp = exp ^ (1 << i)
-                        v = dup_lshift(v, 1, K)
-            p[exp] = dup_add(get(exp, []), v, K)
+            exp = base | exp_a
+            for exp1, c, v1 in a1:
+                if exp1 & exp_b:
+                    continue
+                if val is not None:
+                    p[exp] = get(exp, 0) + v1*x*pw[c + nf]
+                else:
+                    _prm_iadd_term(p, exp, v1, x, c + nf, K)
     return p
 
-def _prm_mul_val(p1, p2, free_vars_indices, val):
-    p = {}
-    mask_free = 0
-    for i in free_vars_indices:
-        mask_free += 1 << i
-    if not p2:
-        return p
-    get = p.get
-    for exp1, v1 in iteritems(p1):
-        for exp2, v2 in p2.items():
-            if exp1 & exp2:
-                continue
-            exp = exp1 | exp2
-            v =  v1*v2
-            if exp & mask_free:
-                for i in free_vars_indices:
-                    if exp & (1 << i):
-                        exp = exp ^ (1 << i)
-                        v = v*val
-            p[exp] = get(exp, 0) + v
-    return p
+def _perm_row_groups(a, key=lambda x: x):
+    """
+    rows of the matrix given by ``sparse_rows``, with the copies of a row
+    moved to its first occurrence; returns the list of the distinct rows
+    and the list of their multiplicities
 
-def _get_poly_from_list(a, K):
+    Moving the copies earlier does not make any column active longer.
+    The entries of the rows are compared by ``key``.
     """
-    polynomial ``1 + sum eta_i a[i]``
+    pos = {}
+    rows = []
+    mults = []
+    for r in a:
+        t = tuple([(j, key(x)) for j, x in r])
+        if t in pos:
+            mults[pos[t]] += 1
+        else:
+            pos[t] = len(rows)
+            rows.append(r)
+            mults.append(1)
+    return rows, mults
+
+class _TShift(object):
     """
-    p = {0: K.one}
-    for i in range(len(a)):
-        if a[i]:
-            p[1<<i] = a[i]
-    return p
+    ``t**n`` acting on the coefficient arrays of a batch of polynomials,
+    in which the row ``k`` holds the coefficients of ``t**k``
 
-def _dup_permanental_minor_poly_val(m, K, val):
-    n = len(m)
-    ny = len(m[0])
-    p = _get_poly_from_list(m[0], K)
-    done_vars = set()
-    for i in range(1, n):
-        p1 = _get_poly_from_list(m[i], K)
-        free_vars_indices = []
-        for j in range(ny):
-            if j in done_vars:
-                continue
-            r = _is_free_var(i+1, j, m)
-            if r:
-                free_vars_indices.append(j)
-                done_vars.add(j)
-        p = _prm_mul_val(p, p1, free_vars_indices, val)
+    NumPy defers to ``__rmul__`` the product of an array by it.
+    """
+    __array_ufunc__ = None
+
+    def __init__(self, n):
+        self.n = n
+
+    def __mul__(self, other):
+        if isinstance(other, _TShift):
+            return _TShift(self.n + other.n)
+        return NotImplemented
+
+    def __rmul__(self, v):
+        if not hasattr(v, 'shape'):
+            return self
+        w = v*0
+        if self.n < len(v):
+            w[self.n:] = v[:len(v) - self.n]
+        return w
+
+def _batch_rows(m):
+    """
+    rows of the union of the sparsity patterns of a stack of matrices,
+    with entries the vectors of the values over the stack
+
+    Integer entries are converted to Python integers, to avoid overflows.
+    """
+    exact = m.dtype.kind in 'biu'
+    nz = (m != 0).any(axis=0)
+    a = []
+    for i in range(m.shape[1]):
+        r = []
+        for j in nz[i].nonzero()[0]:
+            x = m[:, i, j]
+            r.append((int(j), x.astype(object) if exact else x))
+        a.append(r)
+    return a
+
+def _dup_permanental_minor_poly_batch(m, val, rows):
+    """
+    sums of the permanental minors of a stack of matrices
+
+    The states are those of the union of the sparsity patterns; each
+    state carries an array of values over the stack, so that the
+    traversal of the keys and the bit operations are shared.
+    For the polynomials the value of a state is an array with the
+    coefficient of ``t**k`` in the row ``k``, and the multiplication by
+    ``t`` is done by ``_TShift``.
+    """
+    nb = m.shape[0]
+    a = _batch_rows(m)
+    if isinstance(rows, str) and rows == 'auto':
+        transpose, rows, width = _perm_order(a)
+        if transpose:
+            a = _sparse_transpose(a)
+    if rows is not None:
+        a = [a[i] for i in rows]
+    a, mults = _perm_row_groups(a, key=lambda x: tuple(x.tolist()))
+    retire = _sparse_last_rows(a)
+    import numpy
+    dtype = object if m.dtype.kind in 'biu' else m.dtype
+    poly = val is None
+    if poly:
+        n = min(m.shape[1], m.shape[2])
+        one = numpy.zeros((n + 1, nb), dtype=dtype)
+        one[0] = 1
+        val = _TShift(1)
+    else:
+        one = numpy.ones(nb, dtype=dtype)
+    p = {0: one}
+    for i, r in enumerate(a):
+        _prm_iadd_row(p, r, retire[i], ZZ, val, mults[i])
+    v = p[0]
+    if not poly:
+        return v
+    return [dup_strip(v[::-1, b].tolist()) for b in range(nb)]
+
+def _dup_permanental_minor_poly_val(a, mults, K, val, retire):
+    p = {0: K.one}
+    for i, r in enumerate(a):
+        _prm_iadd_row(p, r, retire[i], K, val, mults[i])
 
     assert len(p) == 1
     return p[0]
 
-def dup_permanental_minor_poly(m, K, val=None):
+def _dup_permanental_minor_poly_qq(a, mults, val, retire):
+    """
+    sum of the permanental minors of a rational matrix, computed in ``ZZ``
+
+    The entries are multiplied by the lcm ``den`` of their denominators;
+    the coefficient of ``t**k`` of the resulting integer polynomial,
+    a sum of products of ``k`` entries, is divided by ``den**k``.
+    """
+    den = 1
+    for r in a:
+        for j, x in r:
+            q = getattr(x, 'denominator', 1)
+            den = den*q // gcd(den, q)
+    a = [[(j, int(x*den)) for j, x in r] for r in a]
+    p = {0: [ZZ.one]}
+    for i, r in enumerate(a):
+        _prm_iadd_row(p, r, retire[i], ZZ, mult=mults[i])
+    c = dup_strip(p[0])
+    n = len(c) - 1
+    nv = [QQ(x, den**(n - i)) for i, x in enumerate(c)]
+    if val is not None:
+        return dup_valuate(nv, val)
+    return nv
+
+def dup_permanental_minor_poly(m, K, val=None, rows=None):
     """
     return the polynomial of the sum of permanental minors of a matrix ``m``
 
@@ -177,8 +355,35 @@ def dup_permanental_minor_poly(m, K, val=None):
     Parameters
     ==========
 
-    m : matrix in list form
+    m : matrix, as a list of lists or in one of the sparse forms
+        accepted by ``active_nodes.sparse_rows``; or a 3-dimensional
+        NumPy array, a stack of matrices with the same shape
     val : value at which the polynomial is evaluated
+    rows : order in which the rows are processed, e.g. the sweep order
+           returned by the lattice generators in ``graphs_gen``;
+           if ``rows='auto'`` the order of the rows, or of the columns
+           of ``m``, is chosen by ``perm_order``
+
+    Notes
+    =====
+
+    A column is active from the first to the last row in which it
+    is non-zero; the cost is exponential in the maximum number of
+    active columns, so that the rows should be ordered to keep it small.
+    The row in which each column is non-zero for the last time is
+    found in a single pass over the non-zero entries.
+    The sum of the permanental minors of ``m`` and of its transpose are
+    equal, so that with ``rows='auto'`` the transpose is used if
+    its width is smaller.
+    Repeated rows are processed in one step, at their first occurrence,
+    see ``_prm_row_terms``.
+    For a stack of matrices the list of the polynomials (the array of
+    their values, if ``val`` is not None) is returned; the states are
+    visited once for the whole stack, each carrying an array of values,
+    so that it is convenient for matrices with the same sparsity
+    pattern. Integer arrays are computed with Python integers.
+    With ``K=QQ`` the matrix is scaled to an integer matrix, and the
+    coefficients are divided by the powers of the scale at the end.
 
     Examples
     ========
@@ -190,32 +395,34 @@ def dup_permanental_minor_poly(m, K, val=None):
     [15, 36, 13, 1]
     >>> dup_permanental_minor_poly(m, ZZ, 1)
     65
+    >>> dup_permanental_minor_poly(m, ZZ, rows=[2, 0, 1])
+    [15, 36, 13, 1]
+    >>> dup_permanental_minor_poly(m, ZZ, rows='auto')
+    [15, 36, 13, 1]
+    >>> dup_permanental_minor_poly({0: {0: 2, 2: 1}, 2: {1: 3}}, ZZ)
+    [9, 6, 1]
     """
+    if getattr(m, 'ndim', 2) == 3:
+        return _dup_permanental_minor_poly_batch(m, val, rows)
+    a = sparse_rows(m)
+    if isinstance(rows, str) and rows == 'auto':
+        transpose, rows, width = _perm_order(a)
+        if transpose:
+            a = _sparse_transpose(a)
+    if rows is not None:
+        a = [a[i] for i in rows]
+    a, mults = _perm_row_groups(a)
+    retire = _sparse_last_rows(a)
+    if K is QQ:
+        return _dup_permanental_minor_poly_qq(a, mults, val, retire)
     if val is not None:
-        return _dup_permanental_minor_poly_val(m, K, val)
-    n = len(m)
-    ny = len(m[0])
+        return _dup_permanental_minor_poly_val(a, mults, K, val, retire)
     p = {0:[K.one]}
-    done_vars = set()
-    for i in range(n):
-        p1 = {0: K.one}
-        a = m[i]
-        for j in range(len(a)):
-            if a[j]:
-                p1[1<<j] = a[j]
-
-        free_vars_indices = []
-        for j in range(ny):
-            if j in done_vars:
-                continue
-            r = _is_free_var(i+1, j, m)
-            if r:
-                free_vars_indices.append(j)
-                done_vars.add(j)
-        p = _prm_mul(p, p1, free_vars_indices, K)
+    for i, r in enumerate(a):
+        _prm_iadd_row(p, r, retire[i], K, mult=mults[i])
 
     assert len(p) == 1
-    nv = [y for y in p[0]]
+    nv = dup_strip([y for y in p[0]])
     return nv
 
 
@@ -223,16 +430,34 @@ def _get_num_elements(objects):
     """"
     number of elements in `objects`
     """
-    s = set()
-    for t in objects:
-        for i in t:
-            s.add(i)
-    nvars = len(s)
-    b = list(sorted(s))
-    b.sort()
-    if b != list(range(nvars)):
+    return _obj_last(objects)[0]
+
+def _obj_last(objects):
+    """
+    number of elements in ``objects`` and, for each object, the list
+    of the elements occurring in it for the last time, in increasing order
+
+    The elements should be labelled in ``0,...,nvars-1``; the time is
+    linear in the total size of the objects.
+
+    Examples
+    ========
+
+    >>> from hobj import _obj_last
+    >>> _obj_last([(0, 1), (1, 2), (2, 3), (3, 4), (4, 0)])
+    (5, [[], [1], [2], [3], [0, 4]])
+    """
+    last = {}
+    for i, obj in enumerate(objects):
+        for j in obj:
+            last[j] = i
+    nvars = len(last)
+    if last and (min(last) != 0 or max(last) != nvars - 1):
          raise ValueError('elements should be labelled in 0,...,nvars-1')
-    return nvars
+    free = [[] for obj in objects]
+    for j in range(nvars):
+        free[last[j]].append(j)
+    return nvars, free
 
 
 def _poly_str(a):
@@ -362,9 +587,8 @@ def gen_hobj(objects, vlist=None):
     '1 + x0 + x1 + x2 + x3 + x4 + x0*x2 + x0*x3 + x1*x3 + x1*x4 + x2*x4'
     """
     from domains import ZZ
-    nvars = _get_num_elements(objects)
+    nvars, free = _obj_last(objects)
     masks = []
-    done_vars = set()
     one = 1
     p = {0:one}
     n = len(objects)
@@ -383,19 +607,7 @@ def gen_hobj(objects, vlist=None):
         p1 = {0: one}
         expv = masks[i] + (1 << vlist[i])
         p1[expv] = one
-        free_vars = set()
-        for j in range(n, n + nvars):
-            if j in done_vars:
-                continue
-            hit = False
-            jmask = 1 << j
-            for mask in masks[i + 1:]:
-                if mask & jmask:
-                    hit = True
-                    break
-            if not hit:
-                done_vars.add(j)
-                free_vars.add(j)
+        free_vars = set([j + n for j in free[i]])
         p = _gen_hobj_mul(p, p1, free_vars, ZZ)
 
     return p
@@ -405,39 +617,193 @@ def gen_hobj(objects, vlist=None):
 def obj_free(objects):
     """
     return a list of tuples ``(obj, free)``
+
+    ``free`` is the list of the elements of ``obj`` not occurring
+    in the following objects.
     """
-    nvars = _get_num_elements(objects)
-    v = []
-    done = set()
-    n = len(objects)
-    for i in range(n):
-        free = []
-        obj = objects[i]
-        for j in range(nvars):
-            if j in done:
+    nvars, free = _obj_last(objects)
+    return list(zip(objects, free))
+
+
+def _iadd_exp(p, val, exp2, mask_free, K):
+    """
+    multiply ``p`` by ``(1 + t*val*eta_S)``, where ``exp2`` is the
+    bitmask of ``S``, and put to ``1`` the ``eta`` in ``mask_free``
+
+    ``p`` is changed only if ``mask_free`` is zero.
+    """
+    if mask_free:
+        p1 = p
+        p = {}
+        mask = ~mask_free
+        get = p.get
+        for exp1, v1 in iteritems(p1):
+            exp = exp1 & mask
+            p[exp] = dup_add(get(exp, []), v1, K)
+            if exp1 & exp2:
                 continue
-            hit = 0
-            for k in range(i + 1, n):
-                if j in objects[k]:
-                    hit = 1
-                    break
-            if not hit:
-                free.append(j)
-                done.add(j)
-        v.append((obj, free))
-    return v
+            if val != 1:
+                v1 = dup_mul_ground(v1, val, K)
+            exp = (exp1 | exp2) & mask
+            p[exp] = dup_add(get(exp, []), dup_lshift(v1, 1, K), K)
+        return p
+
+    a = []
+    for exp1, v1 in iteritems(p):
+        if exp1 & exp2:
+            continue
+        exp = exp1 | exp2
+        v1 = dup_mul_ground(v1, val, K)
+        v = dup_lshift(v1, 1, K)
+        try:
+            p[exp] = dup_add(p[exp], v, K)
+        except KeyError:
+            a.append((exp, v))
+    for exp, v in a:
+        p[exp] = v
+    return p
+
+
+def _iadd_exp_val(p, val, exp2, mask_free, K, pr=None):
+    """
+    as ``_iadd_exp``, for the polynomial evaluated in ``val``,
+    modulo ``pr`` if ``pr`` is given
+
+    ``p`` is in general changed.
+    """
+    if mask_free:
+        p1 = p
+        p = {}
+        mask = ~mask_free
+        get = p.get
+        for exp1, v1 in iteritems(p1):
+            exp = exp1 & mask
+            c = get(exp, 0) + v1
+            if pr:
+                c = c % pr
+            p[exp] = c
+            if exp1 & exp2:
+                continue
+            exp = (exp1 | exp2) & mask
+            c = get(exp, 0) + (v1*val if val != 1 else v1)
+            if pr:
+                c = c % pr
+            p[exp] = c
+        return p
+
+    a = []
+    for exp1, v1 in iteritems(p):
+        if exp1 & exp2:
+            continue
+        exp = exp1 | exp2
+        v = v1 * val
+        if pr:
+            v = v % pr
+        try:
+            p[exp] += v
+        except KeyError:
+            a.append((exp, v))
+    for exp, v in a:
+        p[exp] = v
+    return p
+
+
+class CompiledPlan(object):
+    """
+    sweep of ``dup_gen_count_hobj`` with the slots of the elements
+    already assigned, see ``compile_plan``
+
+    ``exps[n]``, ``masks[n]`` are the bitmasks of the ``eta`` of the
+    ``n``-th object of ``links`` and of its elements which are
+    integrated after it; ``width`` is the maximum number of slots in use.
+    """
+    def __init__(self, links, exps, masks, width):
+        self.links = links
+        self.exps = exps
+        self.masks = masks
+        self.width = width
+
+    def __len__(self):
+        return len(self.exps)
+
+    def __repr__(self):
+        return 'CompiledPlan(<%d objects, width %d>)' % (len(self),
+                                                          self.width)
+
+
+def compile_plan(d, links=None, vlist=None):
+    """
+    compile the sweep of ``dup_matching_generating_poly(d)`` in a
+    ``CompiledPlan``, to be executed by ``dup_gen_count_hobj``
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    links : list of edges of the graph, in the order of the sweep
+    vlist : list of the vertices; if ``links`` is not given, the links
+            are ordered by ``links_from_vlist(d, vlist)``
+
+    Notes
+    =====
+
+    The relabelling of the vertices, the ordering of the links,
+    the free elements and the slot assignment of ``Hobj.object_exp``
+    are computed once; the plan contains only lists of integers,
+    so it is cheap to pickle and send to other processes, to compute
+    the polynomial for several values of ``val`` and ``pr``.
+
+    If neither ``links`` nor ``vlist`` is given, the links are ordered
+    by ``_sweep_links``; unlike ``dup_matching_generating_poly``
+    the graph is not reduced nor decomposed in blocks.
+
+    Examples
+    ========
+
+    >>> from domains import ZZ
+    >>> from hobj import compile_plan, dup_gen_count_hobj
+    >>> d = {0:[1,4], 1:[0,2], 2:[1,3], 3:[2,4], 4:[0,3]}
+    >>> plan = compile_plan(d); plan
+    CompiledPlan(<5 objects, width 3>)
+    >>> dup_gen_count_hobj(plan, ZZ)
+    [5, 5, 1]
+    >>> dup_gen_count_hobj(plan, ZZ, val=3), dup_gen_count_hobj(plan, ZZ, 3, 7)
+    (61, 5)
+    """
+    links, labels = _sweep_links(d, links, vlist)
+    hb = Hobj()
+    exps = []
+    masks = []
+    width = 0
+    # number of slots in use; the new elements are added to ``hb.dt``
+    nused = 0
+    for obj, free in obj_free(links):
+        n0 = len(hb.dt)
+        exp2, mask_free = hb.object_exp(obj, free)
+        exps.append(exp2)
+        masks.append(mask_free)
+        nused += len(hb.dt) - n0
+        width = max(width, nused)
+        nused -= count_bits_set(mask_free)
+    return CompiledPlan(hb.links, exps, masks, width)
 
 
 class Hobj(object):
     """
     class used with iadd_object, iadd_object_val
     TODO: use if also with _monom, hobj_str; then put these functions as methods
+
+    If ``distinct`` is True, a ``ValueError`` is raised when an object
+    is added twice.
     """
-    def __init__(self, pr=None):
+    def __init__(self, pr=None, distinct=True):
         self.links = []
+        self._links_set = set()
+        self.distinct = distinct
         self.dt = {}
         self.freedt = list(range(1000, -1, -1))
         self.pr = pr
+        self._sym_tables = {}
 
 
     def hobj_str(hob, p, noval=True):
@@ -495,6 +861,52 @@ class Hobj(object):
         a = [[dtinv[i] for i in _monom(expv)] for expv, y in items]
         return a
 
+    def object_exp(hb, obj, free):
+        """
+        return ``(exp2, mask_free)``, the bitmasks of the ``eta``
+        of ``obj`` and of its elements in ``free``
+
+        Notes
+        =====
+
+        The elements of ``obj`` are assigned a slot on first
+        occurrence; the slots of the elements in ``free`` are released,
+        to be reused by the following objects.
+
+        Examples
+        ========
+
+        >>> from hobj import Hobj
+        >>> hb = Hobj()
+        >>> hb.object_exp((0, 1), []), hb.object_exp((1, 2), [1])
+        ((3, 0), (6, 2))
+        >>> hb.object_exp((2, 3), [2])
+        (6, 4)
+        """
+        links = hb.links
+        dt = hb.dt
+        freedt = hb.freedt
+        exp2 = 0
+        for i in obj:
+            if i in dt:
+                j = dt[i]
+            else:
+                j = freedt.pop()
+                dt[i] = j
+            exp2 += 1 << j
+        t = tuple(sorted(obj))
+        if hb.distinct:
+            if t in hb._links_set:
+                raise ValueError('%s in %s' %(t, links))
+            hb._links_set.add(t)
+        links.append(t)
+        mask_free = 0
+        for i in free:
+            j = dt[i]
+            mask_free += 1 << j
+            freedt.append(j)
+        return exp2, mask_free
+
     def iadd_object(hb, p, val, obj, free, K):
         """
         multiply ``p`` by ``(1 + t*val*eta_i*eta_j)``
@@ -524,68 +936,8 @@ class Hobj(object):
         [5, 5, 1]
 
         """
-        links = hb.links
-        dt = hb.dt
-        freedt = hb.freedt
-        exp2 = 0
-        for i in obj:
-            if i in dt:
-                j = dt[i]
-            else:
-                j = freedt.pop()
-                dt[i] = j
-            exp2 += 1 << j
-        free0 = free
-        free = [dt[i] for i in free]
-        t = tuple(sorted(obj))
-        if t in links:
-            raise ValueError('%s in %s' %(t, links))
-        links.append(t)
-        if free:
-            p1 = p
-            p = {}
-            mask_free = 0
-            for i in free:
-                mask_free += 1 << i
-            get = p.get
-            a = [1, (val, exp2)]
-            for exp1, v1 in iteritems(p1):
-                for ii in range(2):
-                    if not ii:
-                        exp = exp1
-                        v = v1
-                    else:
-                        if exp1 & exp2:
-                            continue
-                        exp = exp1 | exp2
-                        if val != 1:
-                            v1 = dup_mul_ground(v1, val, K)
-                        v = dup_lshift(v1, 1, K)
-                    if exp & mask_free:
-                        for i in free:
-                            if exp & (1 << i):
-                                exp = exp ^ (1 << i)
-                    p[exp] = dup_add(get(exp, []), v, K)
-            for exp in free:
-                freedt.append(exp)
-            return p
-
-        else:
-            a = []
-            for exp1, v1 in iteritems(p):
-                if exp1 & exp2:
-                    continue
-                exp = exp1 | exp2
-                v1 = dup_mul_ground(v1, val, K)
-                v = dup_lshift(v1, 1, K)
-                try:
-                    p[exp] = dup_add(p[exp], v, K)
-                except KeyError:
-                    a.append((exp, v))
-            for exp, v in a:
-                p[exp] = v
-
-        return p
+        exp2, mask_free = hb.object_exp(obj, free)
+        return _iadd_exp(p, val, exp2, mask_free, K)
 
     def iadd_object_val(hb, p, val, obj, free, K, pr=None):
         """
@@ -603,92 +955,332 @@ class Hobj(object):
         ========
 
         """
-        links = hb.links
+        exp2, mask_free = hb.object_exp(obj, free)
+        return _iadd_exp_val(p, val, exp2, mask_free, K, pr)
+
+    def _terms_exps(hb, terms, free):
+        """
+        helper for ``imul_terms``, ``imul_terms_val``
+        """
         dt = hb.dt
         freedt = hb.freedt
-        exp2 = 0
-        for i in obj:
-            if i in dt:
-                j = dt[i]
-            else:
-                j = freedt.pop()
-                dt[i] = j
-            exp2 += 1 << j
-        free0 = free
+        a = []
+        for obj, c in terms:
+            exp2 = 0
+            for i in obj:
+                if i in dt:
+                    j = dt[i]
+                else:
+                    j = freedt.pop()
+                    dt[i] = j
+                exp2 += 1 << j
+            a.append((exp2, c))
         free = [dt[i] for i in free]
-        t = tuple(sorted(obj))
-        if t in links:
-            raise ValueError('%s in %s' %(t, links))
-        links.append(t)
-        if free:
-            p1 = p
-            p = {}
-            mask_free = 0
-            for i in free:
-                mask_free += 1 << i
-            get = p.get
-            a = [1, (val, exp2)]
-            for exp1, v1 in iteritems(p1):
-                for ii in range(2):
-                    if not ii:
-                        exp = exp1
-                        v = v1
-                    else:
-                        if exp1 & exp2:
-                            continue
-                        exp = exp1 | exp2
-                        if val != 1:
-                            v = v1*val
-                    if exp & mask_free:
-                        for i in free:
-                            if exp & (1 << i):
-                                exp = exp ^ (1 << i)
-                    c = get(exp, 0) + v
-                    if pr:
-                        c = c % pr
-                    p[exp] = c
-
-            for exp in free:
-                freedt.append(exp)
-            return p
+        mask_free = 0
+        for i in free:
+            mask_free += 1 << i
+        return a, free, mask_free
 
-        else:
-            a = []
-            for exp1, v1 in iteritems(p):
+    def imul_terms(hb, p, terms, free, K):
+        """
+        multiply ``p`` by ``sum_S c_S*eta_S``
+
+        Parameters
+        ==========
+
+        p : polynomial for hard objects
+        terms : list of pairs ``(obj, c_S)``, where ``obj`` is the tuple
+                of the elements of ``S``, possibly empty, and ``c_S`` a
+                polynomial
+        free : list of elements which are integrated after the product
+        K : domain of the coefficients
+
+        Notes
+        =====
+
+        ``iadd_object`` multiplies by ``1 + t*val*eta_S``, that is it
+        is the case ``terms = [((), [1]), (obj, [val, 0])]``.
+
+        Examples
+        ========
+
+        >>> from domains import ZZ
+        >>> from hobj import Hobj
+        >>> hb = Hobj()
+        >>> p = {0: [ZZ.one]}
+        >>> p = hb.imul_terms(p, [((), [1]), ((0,), [2, 1])], [], ZZ)
+        >>> p = hb.imul_terms(p, [((), [1]), ((0, 1), [1, 0])], [0, 1], ZZ)
+        >>> p[0]
+        [3, 2]
+        """
+        a, free, mask_free = hb._terms_exps(terms, free)
+        one = [K.one]
+        t = [K.one, K.zero]
+        p1 = p
+        p = {}
+        get = p.get
+        for exp1, v1 in iteritems(p1):
+            for exp2, c in a:
                 if exp1 & exp2:
                     continue
                 exp = exp1 | exp2
-                v = v1 * val
+                if c == one:
+                    v = v1
+                elif c == t:
+                    v = dup_lshift(v1, 1, K)
+                else:
+                    v = dup_mul(v1, c, K)
+                if exp & mask_free:
+                    exp = exp & ~mask_free
+                p[exp] = dup_add(get(exp, []), v, K)
+        for exp in free:
+            hb.freedt.append(exp)
+        return p
+
+    def imul_terms_val(hb, p, terms, free, K, pr=None):
+        """
+        multiply ``p`` by ``sum_S c_S*eta_S``, with ``c_S`` numbers
+
+        See ``imul_terms``; the values are reduced modulo ``pr``,
+        if it is given.
+        """
+        a, free, mask_free = hb._terms_exps(terms, free)
+        p1 = p
+        p = {}
+        get = p.get
+        for exp1, v1 in iteritems(p1):
+            for exp2, c in a:
+                if exp1 & exp2:
+                    continue
+                exp = exp1 | exp2
+                v = v1*c
+                if exp & mask_free:
+                    exp = exp & ~mask_free
+                v = get(exp, 0) + v
                 if pr:
                     v = v % pr
-                try:
-                    p[exp] += v
-                except KeyError:
-                    a.append((exp, v))
-            for exp, v in a:
                 p[exp] = v
-
+        for exp in free:
+            hb.freedt.append(exp)
         return p
 
-def d_relabel(d):
-    dt = {}
-    keys = list(d.keys())
-    dt = dict(zip(keys, range(len(d))))
-    d1 = {}
-    for k, v in d.items():
+    def canonicalize(hb, p, perms, K, pr=None):
+        """
+        keep one state for each orbit of a symmetry group of the frontier
+
+        Parameters
+        ==========
+
+        p : polynomial for hard objects
+        perms : list of the elements of the group, each a dict mapping
+                the active elements to active elements; the identity
+                can be omitted
+        K : domain of the coefficients
+        pr : modulus, used if the coefficients are numbers
+
+        Notes
+        =====
+
+        The states of an orbit are replaced by its minimal state, with
+        the sum of their values. This is correct only if the product
+        of the objects added so far is invariant under the group, and the
+        following objects are added in an order which makes it invariant
+        again at the next call of ``canonicalize``; the sum of the values
+        of the states of the orbits is not changed by adding objects
+        in between, so that the final polynomial is unchanged.
+
+        Examples
+        ========
+
+        >>> from domains import ZZ
+        >>> from hobj import Hobj
+        >>> hb = Hobj()
+        >>> p = {0: [ZZ.one]}
+        >>> for obj in [(0, 1), (1, 2), (0, 2)]:
+        ...     p = hb.iadd_object(p, 1, obj, [], ZZ)
+        ...
+        >>> sorted(p.items())
+        [(0, [1]), (3, [1, 0]), (5, [1, 0]), (6, [1, 0])]
+        >>> rot = [{0: 1, 1: 2, 2: 0}, {0: 2, 1: 0, 2: 1}]
+        >>> sorted(hb.canonicalize(p, rot, ZZ).items())
+        [(0, [1]), (3, [3, 0])]
+        """
+        dt = hb.dt
+        tables = []
+        for g in perms:
+            key = tuple(sorted([(dt[i], dt[j]) for i, j in iteritems(g)]))
+            tabs = hb._sym_tables.get(key)
+            if tabs is None:
+                # image of each byte of a state, for the bytes
+                # containing active elements
+                chunks = {}
+                for i, j in key:
+                    chunks.setdefault(i >> 3, [0]*8)[i & 7] = 1 << j
+                tabs = []
+                for c, img in sorted(chunks.items()):
+                    tab = [0]*256
+                    for b in range(1, 256):
+                        low = b & -b
+                        tab[b] = tab[b ^ low] | img[low.bit_length() - 1]
+                    tabs.append((c << 3, tab))
+                hb._sym_tables[key] = tabs
+            tables.append(tabs)
+        p1 = {}
+        get = p1.get
+        for exp, v in iteritems(p):
+            m = exp
+            for tabs in tables:
+                e = 0
+                for c, tab in tabs:
+                    e |= tab[(exp >> c) & 255]
+                if e < m:
+                    m = e
+            if isinstance(v, list):
+                p1[m] = dup_add(get(m, []), v, K)
+            else:
+                v = get(m, 0) + v
+                if pr:
+                    v = v % pr
+                p1[m] = v
+        return p1
+
+def d_relabel(d):
+    dt = {}
+    keys = list(d.keys())
+    dt = dict(zip(keys, range(len(d))))
+    d1 = {}
+    for k, v in d.items():
         d1[dt[k]] = [dt[i] for i in v]
     return d1, dt
 
+def _sweep_links(d, links=None, vlist=None):
+    """
+    ``(links, labels)``, the links of the graph ``d`` in the order of
+    the sweep, with the vertices labelled ``0,...,nvars-1``, and the
+    same links with the labels of ``d``
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    links : list of edges of the graph, in the order of the sweep
+    vlist : list of the vertices; if ``links`` is not given, the links
+            are ordered by ``links_from_vlist(d, vlist)``
+
+    Notes
+    =====
 
-def dup_gen_count_hobj(objects, K, val=None, pr=None):
+    The isolated vertices are removed and the other vertices are
+    relabelled if necessary, see ``d_relabel``.
+    By default the links are ordered by ``ordered_links`` in each
+    connected component; the edges of the component missed by
+    ``ordered_links``, e.g. those of a star, are put after them.
+
+    Examples
+    ========
+
+    >>> from hobj import _sweep_links
+    >>> _sweep_links({0:[], 1:[2,3,4], 2:[1], 3:[1], 4:[1], 5:[6], 6:[5]})
+    ([(0, 1), (0, 2), (0, 3), (4, 5)], [(1, 2), (1, 3), (1, 4), (5, 6)])
+    """
+    from active_nodes import ordered_links
+    if vlist is not None and not links:
+        from active_nodes import links_from_vlist
+        links = links_from_vlist(d, vlist)
+    d = dict([(k, v) for k, v in iteritems(d) if v])
+    dt = None
+    if list(sorted(d.keys())) != list(range(len(d))):
+        d, dt = d_relabel(d)
+        if links:
+            links = [[dt[k] for k in obj] for obj in links]
+    if links:
+        links = [tuple(obj) for obj in links]
+    else:
+        from decomposition import connected_components
+        links = []
+        done = set()
+        for comp in connected_components(d):
+            k0 = comp[0]
+            a = ordered_links(d, k0, d[k0][0])
+            a += [(i, j) for i in sorted(comp) for j in d[i] if i < j]
+            for t in a:
+                t1 = tuple(sorted(t))
+                if t1 not in done:
+                    done.add(t1)
+                    links.append(tuple(t))
+    num_edges = sum([len(v) for v in d.values()]) // 2
+    if num_edges != len(links):
+        raise ValueError('wrong number of links')
+    if dt is None:
+        return links, links
+    dtinv = dict([(j, i) for i, j in iteritems(dt)])
+    labels = [tuple([dtinv[k] for k in obj]) for obj in links]
+    return links, labels
+
+
+def _symmetry_checkpoints(a, perms):
+    """
+    dict ``{n: perms1}``, where ``n`` is such that the set of the
+    first ``n + 1`` objects of ``a`` is invariant under ``perms``,
+    and ``perms1`` are the restrictions of ``perms`` to the active
+    elements
+    """
+    def image(g, obj):
+        return tuple(sorted([g.get(i, i) for i in obj]))
+
+    objs = set([tuple(sorted(obj)) for obj, free in a])
+    for g in perms:
+        for o in objs:
+            if image(g, o) not in objs:
+                raise ValueError('the objects are not invariant under %s' % g)
+    inv = [dict([(j, i) for i, j in iteritems(g)]) for g in perms]
+    done = set()
+    active = set()
+    # number of pairs (g, o), o added, g(o) not added
+    mismatch = 0
+    checkpoints = {}
+    for n, (obj, free) in enumerate(a):
+        o = tuple(sorted(obj))
+        done.add(o)
+        for g, gi in zip(perms, inv):
+            if image(g, o) not in done:
+                mismatch += 1
+            o1 = image(gi, o)
+            if o1 != o and o1 in done:
+                mismatch -= 1
+        active.update(obj)
+        active.difference_update(free)
+        if mismatch or not active:
+            continue
+        perms1 = []
+        seen = set()
+        for g in perms:
+            h = dict([(k, g.get(k, k)) for k in active])
+            key = tuple(sorted(h.items()))
+            if key in seen or all([i == j for i, j in key]):
+                continue
+            seen.add(key)
+            perms1.append(h)
+        if perms1:
+            checkpoints[n] = perms1
+    return checkpoints
+
+def dup_gen_count_hobj(objects, K, val=None, pr=None, perms=None,
+                       distinct=True):
     """
     Counting polynomial for hard object from a list of edges
 
     Parameters
     ==========
 
-    objects : list of tuples of element indices
-    TODO add docs
+    objects : list of tuples of element indices, or a ``CompiledPlan``
+    K : domain of the coefficients
+    val, pr : see ``dup_matching_generating_poly``
+    perms : list of the elements of a group of permutations of the
+            elements leaving the set of objects invariant, each a dict
+            (the fixed elements can be omitted)
+    distinct : if True, a ``ValueError`` is raised if two objects are
+               equal, e.g. for repeated edges
 
     Notes
     =====
@@ -705,6 +1297,17 @@ def dup_gen_count_hobj(objects, K, val=None, pr=None):
     For efficiency reasons the list of edges should be appropriately
     ordered to reduce the number of active nodes.
 
+    If ``perms`` is given, after each object such that the objects
+    added so far are invariant under the group, the states are reduced
+    to one for each orbit of the group acting on the active elements,
+    see ``Hobj.canonicalize``; the objects should be ordered so that
+    this happens often, e.g. by layers of a strip with periodic
+    boundary conditions in the transverse direction.
+
+    If ``objects`` is a ``CompiledPlan``, see ``compile_plan``, the
+    sweep is executed without recomputing the free elements and the
+    slots of the elements.
+
     Examples
     ========
 
@@ -714,25 +1317,382 @@ def dup_gen_count_hobj(objects, K, val=None, pr=None):
     [5, 5, 1]
     >>> dup_gen_count_hobj([(1, 0), (2, 1), (3, 2), (4, 0), (4, 3)], ZZ, val=1)
     11
+
+    Prism graph ``C_4 x P_3``, with the rotations of the square:
+
+    >>> objects = [(0, 1), (1, 2), (2, 3), (0, 3)]
+    >>> for i in range(0, 8, 4):
+    ...     objects += [(i + k, i + k + 4) for k in range(4)]
+    ...     objects += [(i + 4, i + 5), (i + 5, i + 6), (i + 6, i + 7),
+    ...                 (i + 4, i + 7)]
+    ...
+    >>> rot = [dict([(i, i - i % 4 + (i + r) % 4) for i in range(12)])
+    ...        for r in range(1, 4)]
+    >>> dup_gen_count_hobj(objects, ZZ, perms=rot)
+    [32, 288, 588, 440, 142, 20, 1]
     """
+    if isinstance(objects, CompiledPlan):
+        if perms:
+            raise ValueError('perms cannot be used with a compiled plan')
+        plan = objects
+        if val is None:
+            if pr:
+                raise NotImplementedError
+            p = {0: [K.one]}
+            for exp2, mask_free in zip(plan.exps, plan.masks):
+                p = _iadd_exp(p, 1, exp2, mask_free, K)
+        else:
+            p = {0: K.one}
+            for exp2, mask_free in zip(plan.exps, plan.masks):
+                p = _iadd_exp_val(p, val, exp2, mask_free, K, pr)
+        assert len(p) == 1
+        return p[0]
     a = obj_free(objects)
-    hb = Hobj(pr=pr)
+    hb = Hobj(pr=pr, distinct=distinct)
+    checkpoints = _symmetry_checkpoints(a, perms) if perms else {}
     if val is None:
         if pr:
             raise NotImplementedError
         p = {0: [K.one]}
-        for obj, free in a:
+        for n, (obj, free) in enumerate(a):
             p = hb.iadd_object(p, 1, obj, free, K)
+            if n in checkpoints and len(p) > 1:
+                p = hb.canonicalize(p, checkpoints[n], K)
     else:
         p = {0: K.one}
-        for obj, free in a:
+        for n, (obj, free) in enumerate(a):
             p = hb.iadd_object_val(p, val, obj, free, K, pr)
+            if n in checkpoints and len(p) > 1:
+                p = hb.canonicalize(p, checkpoints[n], K, pr)
 
     assert len(p) == 1
     return p[0]
 
+def dup_gen_count_terms(factors, K, val=None, pr=None, keep=()):
+    """
+    product of factors ``sum_S c_S*eta_S``
+
+    Parameters
+    ==========
+
+    factors : list of lists of terms ``(obj, c_S)``, see ``Hobj.imul_terms``
+    K : domain of the coefficients
+    val : if not None, the ``c_S`` are numbers
+    pr : if not None, the numbers are reduced modulo ``pr``
+    keep : elements which are not integrated
+
+    Notes
+    =====
+
+    The elements must be labelled ``0,..,nvars-1``.
+    Returns ``(p, hb)``, where ``p`` is the polynomial for hard objects;
+    if ``keep`` is empty ``p`` has only the key ``0``, otherwise
+    its keys are the ``eta`` monomials in the kept elements, whose bits
+    are given by ``hb.dt``.
+
+    Examples
+    ========
 
-def dup_matching_generating_poly(d, val=None, pr=None, links=None, K=ZZ):
+    >>> from domains import ZZ
+    >>> from hobj import dup_gen_count_terms
+    >>> edge = lambda i, j: [((), [1]), ((i, j), [1, 0])]
+    >>> factors = [edge(0, 1), edge(1, 2), edge(0, 2)]
+    >>> p, hb = dup_gen_count_terms(factors, ZZ)
+    >>> p[0]
+    [3, 1]
+    >>> p, hb = dup_gen_count_terms(factors, ZZ, keep=[0])
+    >>> p[0], p[1 << hb.dt[0]]
+    ([1, 1], [2, 0])
+    """
+    objects = []
+    for terms in factors:
+        obj = set()
+        for obj1, c in terms:
+            obj.update(obj1)
+        objects.append(tuple(sorted(obj)))
+    a = obj_free(objects)
+    hb = Hobj(pr=pr)
+    if val is None:
+        if pr:
+            raise NotImplementedError
+        p = {0: [K.one]}
+    else:
+        p = {0: K.one}
+    for (obj, free), terms in zip(a, factors):
+        if keep:
+            free = [i for i in free if i not in keep]
+        if val is None:
+            p = hb.imul_terms(p, terms, free, K)
+        else:
+            p = hb.imul_terms_val(p, terms, free, K, pr)
+    return p, hb
+
+def _dup_prod(a, K, val=None, pr=None):
+    """
+    product of the polynomials in ``a``, or of the values if ``val``
+    is not None
+
+    The product is done pairwise, so that the factors multiplied
+    by ``dup_mul`` have similar degrees.
+    """
+    if val is not None:
+        r = 1
+        for x in a:
+            r = r*x
+            if pr:
+                r = r % pr
+        return r
+    if not a:
+        return [K.one]
+    a = list(a)
+    while len(a) > 1:
+        b = [dup_mul(a[i], a[i + 1], K) for i in range(0, len(a) - 1, 2)]
+        if len(a) % 2:
+            b.append(a[-1])
+        a = b
+    return a[0]
+
+def _dup_pow(f, n, K, val=None, pr=None):
+    """
+    ``f**n`` for a polynomial or, if ``val`` is not None, for a value
+    """
+    if val is not None:
+        if pr:
+            return pow(f, n, pr)
+        return f**n
+    r = [K.one]
+    while n:
+        if n & 1:
+            r = dup_mul(r, f, K)
+        n >>= 1
+        if n:
+            f = dup_mul(f, f, K)
+    return r
+
+def _component_poly(args):
+    """
+    helper for ``_dup_components_poly``, used also in the worker processes
+    """
+    typ, d, val, pr, K = args
+    if typ == 'matching':
+        return dup_matching_generating_poly(d, val=val, pr=pr, K=K)
+    else:
+        return dup_independence_poly(d, val=val, pr=pr, K=K)
+
+def _dup_components_poly(typ, d, comps, val, pr, K, nprocs):
+    """
+    product of the polynomials of the connected components ``comps`` of ``d``
+
+    Parameters
+    ==========
+
+    typ : ``'matching'`` or ``'independence'``
+    d : dict for the graph
+    comps : list of connected components
+    val, pr, K : see ``dup_matching_generating_poly``
+    nprocs : number of processes used to compute the polynomials of
+             the components
+
+    Notes
+    =====
+
+    Isomorphic components are computed only once.
+    """
+    from decomposition import subgraph, isomorphism_classes
+    graphs = [subgraph(d, comp) for comp in comps]
+    classes = isomorphism_classes(graphs)
+    args = [(typ, graphs[c[0]], val, pr, K) for c in classes]
+    if nprocs and nprocs > 1 and len(args) > 1:
+        from multiprocessing import Pool
+        pool = Pool(min(nprocs, len(args)))
+        try:
+            a = pool.map(_component_poly, args)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        a = [_component_poly(x) for x in args]
+    a = [_dup_pow(x, len(c), K, val, pr) for x, c in zip(a, classes)]
+    return _dup_prod(a, K, val, pr)
+
+def _ring_ops(K, val, pr):
+    """
+    ``(zero, one, t, add, mul)`` for polynomials in ``t`` if ``val``
+    is None, for numbers (modulo ``pr`` if it is given) otherwise
+    """
+    if val is None:
+        def add(f, g):
+            return dup_add(f, g, K)
+        def mul(f, g):
+            return dup_mul(f, g, K)
+        return [], [K.one], [K.one, K.zero], add, mul
+    if pr:
+        def add(a, b):
+            return (a + b) % pr
+        def mul(a, b):
+            return a*b % pr
+    else:
+        def add(a, b):
+            return a + b
+        def mul(a, b):
+            return a*b
+    return K.zero, K.one, val, add, mul
+
+def _block_factors(d, block, r, vw, ops, ew=None):
+    """
+    factors for ``dup_gen_count_terms`` for a block of a graph
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    block : list of vertices of the block
+    r : vertex of the block which is kept, or None
+    vw : dict associating to some vertices of the block the pair
+         ``(U, W)`` of polynomials of the part of the graph attached to it
+    ops : see ``_ring_ops``
+    ew : dict of the edge factors, see ``reductions.matching_reduce``
+
+    Notes
+    =====
+
+    The vertices are relabelled according to their position in ``block``;
+    the edges are ordered with ``ordered_links`` starting from ``r``;
+    the factor ``U + W*eta_c`` of a vertex ``c`` in ``vw`` is put before
+    the first edge containing ``c``.
+    Returns the factors and the label of ``r``.
+    """
+    from active_nodes import ordered_links
+    from decomposition import subgraph
+    from reductions import _get_edge
+    zero, one, t = ops[:3]
+    d1 = subgraph(d, block)
+    k0 = block.index(r) if r is not None else 0
+    links = ordered_links(d1, k0, d1[k0][0])
+    num_edges = sum([len(v) for v in d1.values()]) // 2
+    if num_edges != len(links):
+        raise ValueError('wrong number of links')
+    vw1 = dict([(block.index(k), x) for k, x in iteritems(vw)])
+    factors = []
+    for i, j in links:
+        for k in (i, j):
+            if k in vw1:
+                U, W = vw1.pop(k)
+                factors.append([((), U), ((k,), W)])
+        if ew:
+            c0, ci, cj, cij = _get_edge(ew, block[i], block[j], ops)
+            terms = [((), c0), ((i,), ci), ((j,), cj), ((i, j), cij)]
+            factors.append([x for x in terms if x[1] != zero])
+        else:
+            factors.append([((), one), ((i, j), t)])
+    return factors, k0
+
+def _blocks_width(d, blocks):
+    """
+    maximum over ``blocks`` of the number of active nodes of the
+    block, with the links ordered as in ``_block_factors``
+    """
+    from active_nodes import ordered_links, num_active_nodes
+    from decomposition import subgraph
+    width = 0
+    for block in blocks:
+        d1 = subgraph(d, block)
+        links = ordered_links(d1, 0, d1[0][0])
+        width = max(width, num_active_nodes(d1, links))
+    return width
+
+def _dup_matching_blocks(d, blocks, K, val=None, pr=None, vwt=None, ew=None):
+    """
+    matching generating polynomial of a connected graph from its blocks
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    blocks : list of the blocks of the graph
+    K, val, pr : see ``dup_matching_generating_poly``
+    vwt, ew : dicts of the vertex and edge factors of a reduced graph,
+              see ``reductions.matching_reduce``
+
+    Notes
+    =====
+
+    The blocks and the articulation points form the block-cut tree,
+    which is rooted at the first vertex of the first block.
+    For each vertex ``c`` of the tree let ``T_c`` be the graph formed by
+    the blocks under ``c``; ``U_c`` is the polynomial of ``T_c`` with
+    ``c`` removed, ``W_c`` is the polynomial of the matchings of ``T_c``
+    in which ``c`` is matched, so that ``U_c + W_c`` is the polynomial
+    of ``T_c``.
+    In a block the subgraph ``T_c`` hanging from the articulation point
+    ``c`` is represented by the factor ``U_c + W_c*eta_c``: if ``c`` is
+    matched by an edge of the block ``eta_c**2 = 0`` and only ``U_c``
+    contributes, otherwise the integration over ``eta_c`` gives
+    ``U_c + W_c``.
+    The element of the root ``r`` of a block is not integrated, so that
+    the coefficients of ``1`` and of ``eta_r`` give ``U`` and ``W``
+    for the block and the subgraphs under it.
+
+    The factors of a weighted vertex of the reduced graph are taken
+    as initial ``(U_c, W_c)`` for the articulation points and the root,
+    and are put in the block otherwise.
+
+    Each block is computed with its own ordering of the edges, so
+    the number of active nodes is the maximum over the blocks.
+    """
+    ops = _ring_ops(K, val, pr)
+    zero, one, t, add, mul = ops
+    vwt = vwt or {}
+    vblocks = {}
+    for i, block in enumerate(blocks):
+        for k in block:
+            vblocks.setdefault(k, []).append(i)
+    root = blocks[0][0]
+    # nodes of the block-cut tree in depth first order
+    order = []
+    stack = [(0, root, None)]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        typ, x, parent = node
+        if typ == 0:
+            for i in vblocks[x]:
+                if i != parent:
+                    stack.append((1, i, x))
+        else:
+            for k in blocks[x]:
+                if k != parent and len(vblocks[k]) > 1:
+                    stack.append((0, k, x))
+    vres = {}
+    bres = {}
+    for typ, x, parent in reversed(order):
+        if typ == 0:
+            # U_c is the product of the U of the blocks under c;
+            # W_c is the sum of the products with one U replaced by W
+            U, W = vwt.get(x, (one, zero))
+            for i in vblocks[x]:
+                if i == parent:
+                    continue
+                Ub, Wb = bres.pop(i)
+                W = add(mul(W, Ub), mul(U, Wb))
+                U = mul(U, Ub)
+            vres[x] = (U, W)
+        else:
+            block = blocks[x]
+            vw = {}
+            for k in block:
+                if k != parent and len(vblocks[k]) > 1:
+                    vw[k] = vres.pop(k)
+                elif k != parent and k in vwt:
+                    vw[k] = vwt[k]
+            factors, k0 = _block_factors(d, block, parent, vw, ops, ew)
+            p, hb = dup_gen_count_terms(factors, K, val, pr, keep=[k0])
+            bres[x] = (p.get(0, zero), p.get(1 << hb.dt[k0], zero))
+    U, W = vres[root]
+    return add(U, W)
+
+def dup_matching_generating_poly(d, val=None, pr=None, links=None, K=ZZ,
+                                 nprocs=None, vlist=None):
     """
     Return the matching polynomial for the graph defined by ``d``
 
@@ -743,6 +1703,9 @@ def dup_matching_generating_poly(d, val=None, pr=None, links=None, K=ZZ):
     val : evaluate the polynomial in ``val``
     pr : evaluate the polynomial modulo the prime ``pr``
     links : list of edges of the graph
+    nprocs : number of processes used for the connected components
+    vlist : list of the vertices; if ``links`` is not given, the links
+            are ordered by ``links_from_vlist(d, vlist)``
 
     Notes
     =====
@@ -750,14 +1713,24 @@ def dup_matching_generating_poly(d, val=None, pr=None, links=None, K=ZZ):
     The dictionary ``d`` associates to each vertex of the graph the list
     of its neighbours.
 
+    If ``links`` is not given, the polynomial of a disconnected graph is
+    computed as the product of the polynomials of its connected
+    components; isomorphic components are computed once.
+
     A simple greedy algorithm tries to find an efficient ordering of
     vertices to compute the independence polynomial.
 
-    For graphs which are not biconnected, in general this greedy
-    algorithm does not work.
+    If ``links`` is not given, the vertices with less than three
+    neighbours are eliminated first, see ``reductions.matching_reduce``,
+    so that forests are computed without the ``Hobj`` sweep; for a
+    biconnected graph the reduction is used only if it decreases the
+    number of active nodes, since the sweep of the reduced graph, with
+    weighted edges, is slower;
+    a connected graph which is not biconnected is split in its blocks,
+    which are computed separately, see ``_dup_matching_blocks``.
     For biconnected graphs, there is no guarantee that an efficient
-    ordering of the links is found.
-    In either case, one can provide explicitly the parameter `links`.
+    ordering of the links is found; one can provide explicitly the
+    parameter `links`, e.g. improved by ``active_nodes.optimize_links``.
 
     Examples
     ========
@@ -770,17 +1743,52 @@ def dup_matching_generating_poly(d, val=None, pr=None, links=None, K=ZZ):
     >>> links = [(0,4),(1,4),(3,4),(1,2),(2,3)]
     >>> dup_matching_generating_poly(d, links=links)
     [4, 5, 1]
+    >>> d = {0:[], 1:[2], 2:[1,3], 3:[2], 4:[5], 5:[4]}
+    >>> dup_matching_generating_poly(d)
+    [2, 3, 1]
 
     """
-    from active_nodes import ordered_links
+    from active_nodes import ordered_links, num_active_nodes
+    if vlist is not None and not links:
+        from active_nodes import links_from_vlist
+        links = links_from_vlist(d, vlist)
     if list(sorted(d.keys())) != list(range(len(d))):
         d, dt = d_relabel(d)
         if links:
             links = [[dt[k] for k in obj] for obj in links]
     if not links:
+        if val is None and pr:
+            raise NotImplementedError
+        if not d:
+            return [K.one] if val is None else K.one
+        from decomposition import connected_components
+        comps = connected_components(d)
+        if len(comps) > 1:
+            return _dup_components_poly('matching', d, comps, val, pr, K,
+                                        nprocs)
+        if not d[0]:
+            return [K.one] if val is None else K.one
+        from decomposition import biconnected_components
+        from reductions import matching_reduce
+        ops = _ring_ops(K, val, pr)
+        c, d1, vw, ew = matching_reduce(d, ops)
+        if not d1:
+            return c
+        blocks = biconnected_components(d)
         k0 = 0
         links = [k0, d[k0][0]]
-        ord_links = ordered_links(d, *links)
+        ord_links = ordered_links(d, *links) if len(blocks) == 1 else None
+        if len(d1) < len(d):
+            # the weighted factors of the reduced graph are not multiplied
+            # in place; for a biconnected graph reduce only if the number
+            # of active nodes decreases
+            blocks1 = biconnected_components(d1)
+            if ord_links is None or _blocks_width(d1, blocks1) < \
+                    num_active_nodes(d, ord_links):
+                p = _dup_matching_blocks(d1, blocks1, K, val, pr, vw, ew)
+                return ops[4](c, p)
+        if len(blocks) > 1:
+            return _dup_matching_blocks(d, blocks, K, val, pr)
     else:
         ord_links = links
     num_edges = sum([len(v) for v in d.values()]) // 2
@@ -790,7 +1798,309 @@ def dup_matching_generating_poly(d, val=None, pr=None, links=None, K=ZZ):
     return p
 
 
-def dup_independence_poly(d, val=None, pr=None, links=None, vlist=None, K=ZZ):
+def _dup_independence_chordal(d, peo, K, val=None, pr=None):
+    """
+    independence polynomial of a chordal graph
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    peo : perfect elimination ordering of ``d``
+    K, val, pr : see ``dup_independence_poly``
+
+    Notes
+    =====
+
+    Let ``N(v)`` be the neighbours of ``v`` following it in ``peo``;
+    they form a clique, and the cliques ``{v} + N(v)`` form a tree
+    decomposition of the graph, in which the parent of ``v`` is the first
+    vertex ``p(v)`` of ``N(v)``, and ``N(v) - p(v)`` is in ``N(p(v))``.
+    For the subtree ``T_v`` rooted in ``v`` and ``x`` in ``N(v)``, ``F_v[x]``
+    is the polynomial of the independent sets of ``T_v`` compatible
+    with ``x`` being in the independent set, that is not containing
+    ``v``; ``F_v[None]`` is the polynomial of all the independent
+    sets of ``T_v``. Since an independent set has at most one vertex in
+    a clique:
+
+    ``F_v[x] = prod_c F_c[x if x in N(c) else None]``
+    ``F_v[None] = prod_c F_c[None] + t*prod_c F_c[v]``
+
+    where ``c`` runs over the children of ``v``.
+    There are ``len(N(v)) + 1`` polynomials for each vertex, so the
+    number of polynomials computed is the number of vertices plus the
+    number of edges.
+    """
+    zero, one, t, add, mul = _ring_ops(K, val, pr)
+    pos = dict([(k, i) for i, k in enumerate(peo)])
+    hn = {}
+    children = dict([(k, []) for k in peo])
+    for v in peo:
+        hn[v] = a = [u for u in d[v] if pos[u] > pos[v]]
+        if a:
+            children[min(a, key=pos.get)].append(v)
+    F = {}
+    r = []
+    for v in peo:
+        fs = [F.pop(c) for c in children[v]]
+        Fv = {}
+        f0 = _dup_prod([f[None] for f in fs], K, val, pr)
+        for x in hn[v]:
+            if any([x in f for f in fs]):
+                Fv[x] = _dup_prod([f.get(x, f[None]) for f in fs], K, val, pr)
+            else:
+                Fv[x] = f0
+        f1 = _dup_prod([f[v] for f in fs], K, val, pr)
+        Fv[None] = add(f0, mul(t, f1))
+        if hn[v]:
+            F[v] = Fv
+        else:
+            r.append(Fv[None])
+    return _dup_prod(r, K, val, pr)
+
+def _dup_independence_modules(d, tree, K, val=None, pr=None):
+    """
+    independence polynomial from the modular decomposition ``tree`` of ``d``
+
+    Notes
+    =====
+
+    Let ``I_i`` be the polynomials of the children of a node.
+    For a parallel node the polynomial is ``prod_i I_i``;
+    for a series node at most one child has vertices in an independent
+    set, so the polynomial is ``1 + sum_i (I_i - 1)``.
+    For a prime node the independent sets are obtained from the
+    independent sets ``S`` of the quotient graph choosing a non-empty
+    independent set in the child of each vertex of ``S``; the
+    quotient is computed with ``Hobj`` with weights ``(1, I_i - 1)``,
+    see ``_dup_independence_weighted``.
+    """
+    from decomposition import _md_nodes, subgraph
+    zero, one, t, add, mul = _ring_ops(K, val, pr)
+    def minus_one(f):
+        if val is not None:
+            return (f - 1) % pr if pr else f - 1
+        f = f[:]
+        f[-1] -= K.one
+        return dup_strip(f)
+    res = {}
+    for node in reversed(_md_nodes(tree)):
+        kind, vertices, children = node
+        a = [res.pop(id(c)) for c in children]
+        if kind == 'leaf':
+            r = add(one, t)
+        elif kind == 'parallel':
+            r = _dup_prod(a, K, val, pr)
+        elif kind == 'series':
+            r = one
+            for x in a:
+                r = add(r, minus_one(x))
+        else:
+            reps = [c[1][0] for c in children]
+            q = subgraph(d, reps)
+            if all([c[0] == 'leaf' for c in children]):
+                r = dup_independence_poly(q, val, pr, K=K)
+            else:
+                vw = dict([(i, (one, minus_one(x))) for i, x in enumerate(a)])
+                r = _dup_independence_weighted(q, vw, K, val, pr)
+        res[id(node)] = r
+    return res[id(tree)]
+
+def _hafnian_graph(m):
+    """
+    graph and edge weights of a symmetric matrix or of a dict of weights
+
+    Returns ``(d, w)``, where ``d`` is the dict of the graph, with
+    vertices ``0,..,n-1``, and ``w`` the dict of the weights of the edges
+    ``(i, j)``, ``i < j``.
+    """
+    w = {}
+    if isinstance(m, dict):
+        vertices = set()
+        for (i, j), x in iteritems(m):
+            if i == j:
+                raise ValueError('loop (%s, %s)' % (i, j))
+            vertices.update((i, j))
+        try:
+            vertices = sorted(vertices)
+        except TypeError:
+            vertices = list(vertices)
+        dt = dict(zip(vertices, range(len(vertices))))
+        n = len(vertices)
+        seen = {}
+        for (i0, j0), x in iteritems(m):
+            i, j = dt[i0], dt[j0]
+            if i > j:
+                i, j = j, i
+            if (i, j) in seen and seen[(i, j)] != x:
+                raise ValueError('edge (%s, %s) with different weights'
+                                 % (i0, j0))
+            seen[(i, j)] = x
+            if x:
+                w[(i, j)] = x
+    else:
+        n = len(m)
+        for i in range(n):
+            if len(m[i]) != n:
+                raise ValueError('the matrix is not square')
+            for j in range(i + 1, n):
+                if m[i][j] != m[j][i]:
+                    raise ValueError('the matrix is not symmetric')
+                if m[i][j]:
+                    w[(i, j)] = m[i][j]
+    d = dict([(i, []) for i in range(n)])
+    for i, j in w:
+        d[i].append(j)
+        d[j].append(i)
+    return d, w
+
+def dup_hafnian_minor_poly(m, K, val=None, pr=None, links=None):
+    """
+    polynomial of the sums of the hafnians of the principal minors of ``m``
+
+    Let ``haf(i, m)`` be the sum of the hafnians of all the
+    ``2*i x 2*i`` principal minors of the symmetric matrix ``m``;
+    the polynomial is ``sum_i haf(i, m)*x**i``.
+
+    Parameters
+    ==========
+
+    m : symmetric matrix in list form, or dict associating to the edges
+        ``(i, j)`` of a graph their weights
+    K : domain of the coefficients
+    val : evaluate the polynomial in ``val``
+    pr : evaluate the polynomial modulo the prime ``pr``
+    links : ordered list of edges of the graph
+
+    Notes
+    =====
+
+    The diagonal of ``m`` is not used.
+    It is the matching generating polynomial of the graph with an edge
+    ``(i, j)`` of weight ``m[i][j]`` for each nonzero entry, that is
+    each edge is the object ``1 + t*m[i][j]*eta_i*eta_j``.
+
+    If ``links`` is given, the vertices of ``m`` must be labelled
+    ``0,..,n-1``; otherwise each connected component is reduced and
+    split in blocks as in ``dup_matching_generating_poly``.
+
+    Examples
+    ========
+
+    >>> from hobj import dup_hafnian_minor_poly
+    >>> from domains import ZZ
+    >>> m = [[0,1,2,3],[1,0,4,5],[2,4,0,6],[3,5,6,0]]
+    >>> dup_hafnian_minor_poly(m, ZZ)
+    [28, 21, 1]
+    >>> dup_hafnian_minor_poly({('a','b'):2, ('b','c'):3}, ZZ, 1)
+    6
+    """
+    if val is None and pr:
+        raise NotImplementedError
+    d, w = _hafnian_graph(m)
+    if links:
+        num_edges = len(w)
+        if num_edges != len(links):
+            raise ValueError('wrong number of links')
+        return _dup_weighted_hobj(links, w, K, val, pr)
+    from active_nodes import ordered_links
+    from decomposition import (connected_components, subgraph,
+        biconnected_components)
+    from reductions import matching_reduce
+    ops = _ring_ops(K, val, pr)
+    zero, one, t, add, mul = ops
+    a = []
+    for comp in connected_components(d):
+        if len(comp) == 1:
+            continue
+        d1 = subgraph(d, comp)
+        dt = dict(zip(comp, range(len(comp))))
+        w1 = {}
+        for (i, j), x in iteritems(w):
+            if i in dt:
+                i, j = dt[i], dt[j]
+                w1[(i, j) if i < j else (j, i)] = x
+        if val is None:
+            ew = dict([(e, (one, zero, zero, [K(x), K.zero]))
+                       for e, x in iteritems(w1)])
+        else:
+            ew = dict([(e, (one, zero, zero, mul(t, x)))
+                       for e, x in iteritems(w1)])
+        c, d2, vw, ew = matching_reduce(d1, ops, ew)
+        if not d2:
+            a.append(c)
+            continue
+        blocks = biconnected_components(d2)
+        if len(d2) < len(d1) or len(blocks) > 1:
+            p = _dup_matching_blocks(d2, blocks, K, val, pr, vw, ew)
+            a.append(mul(c, p))
+            continue
+        links = ordered_links(d1, 0, d1[0][0])
+        a.append(_dup_weighted_hobj(links, w1, K, val, pr))
+    return _dup_prod(a, K, val, pr)
+
+def _dup_weighted_hobj(links, w, K, val=None, pr=None):
+    """
+    matching generating polynomial with the edge ``(i, j)``, ``i < j``,
+    of weight ``w[(i, j)]``, using ``Hobj.iadd_object``
+    """
+    a = obj_free(links)
+    hb = Hobj(pr=pr)
+    if val is None:
+        p = {0: [K.one]}
+    else:
+        p = {0: K.one}
+    for obj, free in a:
+        i, j = obj
+        x = w[(i, j) if i < j else (j, i)]
+        if val is None:
+            p = hb.iadd_object(p, K(x), obj, free, K)
+        else:
+            x = x*val
+            if pr:
+                x = x % pr
+            p = hb.iadd_object_val(p, x, obj, free, K, pr)
+    assert len(p) == 1
+    return p[0]
+
+def _dup_independence_weighted(d, vw, K, val=None, pr=None):
+    """
+    independence polynomial of a connected graph with weighted vertices
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    vw : dict of the weights ``(a_v, b_v)``, see
+         ``reductions.independence_reduce``
+    K, val, pr : see ``dup_independence_poly``
+
+    Notes
+    =====
+
+    The vertex ``v`` is the factor ``a_v + b_v*eta_E``, where ``E``
+    are the edges of ``v``.
+    """
+    from decomposition import subgraph
+    zero, one, t, add, mul = _ring_ops(K, val, pr)
+    if not d:
+        return one
+    vertices = list(d)
+    if len(vertices) == 1:
+        a, b = vw.get(vertices[0], (one, t))
+        return add(a, b)
+    d1 = subgraph(d, vertices)
+    vlist = ip_ordered_vertices(d1)
+    objects = ip_list_objects_from_vlist(d1, vlist)
+    factors = []
+    for k, obj in zip(vlist, objects):
+        a, b = vw.get(vertices[k], (one, t))
+        factors.append([((), a), (obj, b)])
+    p, hb = dup_gen_count_terms(factors, K, val, pr)
+    return p[0]
+
+def dup_independence_poly(d, val=None, pr=None, links=None, vlist=None, K=ZZ,
+                          nprocs=None):
     """
     Return the independence polynomial for the graph defined by ``d``
 
@@ -802,6 +2112,7 @@ def dup_independence_poly(d, val=None, pr=None, links=None, vlist=None, K=ZZ):
     pr : evaluate the polynomial modulo the prime ``pr``
     links : list of vertices of the graph forming a path
     vlist : list of vertices of the graph
+    nprocs : number of processes used for the connected components
 
     Notes
     =====
@@ -809,6 +2120,23 @@ def dup_independence_poly(d, val=None, pr=None, links=None, vlist=None, K=ZZ):
     The dictionary ``d`` associates to each vertex of the graph the list
     of its neighbours.
 
+    If neither ``links`` nor ``vlist`` are given, the polynomial of a
+    disconnected graph is computed as the product of the polynomials of its
+    connected components; isomorphic components are computed once.
+    Chordal graphs, among which forests and interval graphs, are computed
+    on their tree of cliques, see ``_dup_independence_chordal``.
+    The independence polynomial of the line graph of a graph ``G`` is
+    the matching generating polynomial of ``G``; if a connected graph is
+    a line graph, the latter is computed on its root graph, see
+    ``decomposition.line_graph_root``.
+    A graph with twins, which are non-trivial modules, is computed from
+    its modular decomposition, see ``_dup_independence_modules``;
+    the decomposition is not computed for graphs without twins, since
+    most of them, e.g. the lattices, are prime; the other modules are
+    found by ``planner.plan_independence`` with ``modules=True``.
+    Otherwise pendant vertices and twins are eliminated,
+    see ``reductions.independence_reduce``.
+
     A simple greedy algorithm tries to find an efficient ordering of
     vertices to compute the independence polynomial.
 
@@ -840,10 +2168,53 @@ def dup_independence_poly(d, val=None, pr=None, links=None, vlist=None, K=ZZ):
     >>> d = {0:[1,3], 1:[0,2], 2:[1,3], 3:[0,2]}
     >>> dup_independence_poly(d)
     [2, 4, 1]
+    >>> dup_independence_poly({0:[], 1:[2], 2:[1]})
+    [2, 3, 1]
     """
-    bd = True
     if list(sorted(d.keys())) != list(range(len(d))):
         d, dt = d_relabel(d)
+        if vlist:
+            vlist = [dt[k] for k in vlist]
+        if links:
+            links = [dt[k] for k in links]
+    if not vlist and not links:
+        if val is None and pr:
+            raise NotImplementedError
+        if not d:
+            return [K.one] if val is None else K.one
+        from decomposition import connected_components
+        comps = connected_components(d)
+        if len(comps) > 1:
+            return _dup_components_poly('independence', d, comps, val, pr, K,
+                                        nprocs)
+        if len(d) <= 2:
+            # a vertex or an edge; in the latter case the two objects
+            # would be equal
+            n = len(d)
+            if val is None:
+                return [K(n), K.one]
+            r = K.one + n*val
+            return r % pr if pr else r
+        from decomposition import (is_claw_free, line_graph_root,
+            perfect_elimination_ordering)
+        peo = perfect_elimination_ordering(d)
+        if peo is not None:
+            return _dup_independence_chordal(d, peo, K, val, pr)
+        if is_claw_free(d):
+            r = line_graph_root(d)
+            if r is not None:
+                return dup_matching_generating_poly(r[0], val, pr, K=K)
+        from decomposition import modular_decomposition, has_twins
+        if has_twins(d):
+            tree = modular_decomposition(d)
+            if tree[0] != 'prime' or any([c[0] != 'leaf' for c in tree[2]]):
+                return _dup_independence_modules(d, tree, K, val, pr)
+        from reductions import independence_reduce
+        ops = _ring_ops(K, val, pr)
+        c, d1, vw = independence_reduce(d, ops)
+        if len(d1) < len(d):
+            p = _dup_independence_weighted(d1, vw, K, val, pr)
+            return ops[4](c, p)
     if not vlist:
         if not links:
             k0 = 0
@@ -852,19 +2223,228 @@ def dup_independence_poly(d, val=None, pr=None, links=None, vlist=None, K=ZZ):
     if len(d) != len(vlist):
         raise ValueError('vlist has not all the vertices of the graph')
     objects = ip_list_objects_from_vlist(d, vlist)
-    p = dup_gen_count_hobj(objects, K, val, pr)
+    # the objects of the two vertices of an isolated edge are equal,
+    # as those of isolated vertices
+    p = dup_gen_count_hobj(objects, K, val, pr, distinct=False)
     return p
 
-def independent_sets_gen(d):
+def _hobj_walk(objects, kmin=0, kmax=None, start=None):
     """
-    Generator for the independent sets
+    backtracking generator of the hard object configurations
 
+    Parameters
+    ==========
+
+    objects : list of tuple of object element indices
+    kmin, kmax : bounds on the number of objects in a configuration
+    start : pair ``(i0, chosen)``; only the configurations
+            having ``chosen`` as the objects chosen among the first ``i0``
+            objects are generated
+
+    Notes
+    =====
+
+    The objects are considered in their order; the object ``i`` is blocked
+    if one of its elements is used by a chosen object.
+    ``nfree`` is the number of objects not yet considered and not blocked,
+    so that a branch is pruned as soon as it cannot reach ``kmin`` objects.
+    Only the current configuration is stored, so that the memory used
+    is linear in the number of objects.
+
+    The configurations are yielded as lists of object indices; the list
+    is reused, so it must be copied by the caller.
     """
-    vlist = ip_ordered_vertices(d)
+    n = len(objects)
+    used = {}
+    # objects containing an element, after the position of each object
+    elem_objs = {}
+    for i in range(n - 1, -1, -1):
+        for j in objects[i]:
+            used[j] = 0
+            elem_objs.setdefault(j, []).append(i)
+    for j in elem_objs:
+        elem_objs[j].reverse()
+    blocked = [0]*n
+    chosen = []
+    i0 = 0
+    if start:
+        i0, chosen0 = start
+        for i in chosen0:
+            for j in objects[i]:
+                if used[j]:
+                    return
+                used[j] = 1
+                for k in elem_objs[j]:
+                    blocked[k] += 1
+            chosen.append(i)
+    nfree = len([i for i in range(i0, n) if not blocked[i]])
+
+    stack = [(i0, 0)]
+    while stack:
+        i, phase = stack.pop()
+        if phase == 0:
+            if len(chosen) + nfree < kmin:
+                continue
+            if i == n:
+                yield chosen
+                continue
+            if blocked[i]:
+                stack.append((i + 1, 0))
+                continue
+            nfree -= 1
+            stack.append((i, 3))
+            stack.append((i + 1, 0))
+            if kmax is None or len(chosen) < kmax:
+                stack.append((i, 2))
+                stack.append((i + 1, 0))
+                stack.append((i, 1))
+        elif phase == 1:
+            # choose the object ``i``
+            chosen.append(i)
+            for j in objects[i]:
+                used[j] = 1
+                for k in elem_objs[j]:
+                    if k > i:
+                        if not blocked[k]:
+                            nfree -= 1
+                        blocked[k] += 1
+        elif phase == 2:
+            # undo the choice of the object ``i``
+            chosen.pop()
+            for j in objects[i]:
+                used[j] = 0
+                for k in elem_objs[j]:
+                    if k > i:
+                        blocked[k] -= 1
+                        if not blocked[k]:
+                            nfree += 1
+        else:
+            nfree += 1
+
+def _hobj_subtrees(objects, depth):
+    """
+    list of the starting points ``(depth, chosen)`` of ``_hobj_walk``
+    partitioning the configurations of ``objects``
+    """
+    depth = min(depth, len(objects))
+    return [(depth, tuple(a)) for a in _hobj_walk(objects[:depth])]
+
+def _ip_vlist_objects(d, vlist):
+    if not vlist:
+        vlist = ip_ordered_vertices(d)
+    if len(d) != len(vlist):
+        raise ValueError('vlist has not all the vertices of the graph')
     objects = ip_list_objects_from_vlist(d, vlist)
-    p = gen_hobj(objects, vlist)
-    for expv, _ in iteritems(p):
-        yield _monom(expv)
+    return vlist, objects
+
+def independent_sets_gen(d, kmin=0, kmax=None, vlist=None, start=None):
+    """
+    Generator for the independent sets
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    kmin, kmax : generate only the sets with a number of vertices
+                 between ``kmin`` and ``kmax``
+    vlist : list of vertices of the graph
+    start : subtree of the enumeration, as returned by
+            ``independent_sets_subtrees``
+
+    Notes
+    =====
+
+    The independent sets are generated by a backtracking walk on the
+    vertices in the order ``vlist``, by default the one given by
+    ``ip_ordered_vertices``; they are not stored, so that the memory
+    used is linear in the number of vertices.
+
+    Examples
+    ========
+
+    >>> from hobj import independent_sets_gen
+    >>> d = {0:[1,3], 1:[0,2], 2:[1,3], 3:[0,2]}
+    >>> list(independent_sets_gen(d))
+    [[0, 2], [0], [1, 3], [1], [2], [3], []]
+    >>> list(independent_sets_gen(d, kmin=2))
+    [[0, 2], [1, 3]]
+    """
+    vlist, objects = _ip_vlist_objects(d, vlist)
+    for a in _hobj_walk(objects, kmin, kmax, start):
+        yield sorted([vlist[i] for i in a])
+
+def independent_sets_subtrees(d, depth, vlist=None):
+    """
+    split the enumeration of the independent sets in subtrees
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    depth : number of vertices of ``vlist`` fixed in each subtree
+    vlist : list of vertices of the graph
+
+    Notes
+    =====
+
+    The independent sets generated by ``independent_sets_gen`` with
+    ``start`` in the returned list, and the same ``vlist``, form a
+    partition of the independent sets; the subtrees can be
+    consumed independently, for instance by different processes.
+
+    Examples
+    ========
+
+    >>> from hobj import independent_sets_gen, independent_sets_subtrees
+    >>> d = {0:[1,3], 1:[0,2], 2:[1,3], 3:[0,2]}
+    >>> a = independent_sets_subtrees(d, 2)
+    >>> [len(list(independent_sets_gen(d, start=t))) for t in a]
+    [2, 2, 3]
+    """
+    vlist, objects = _ip_vlist_objects(d, vlist)
+    return _hobj_subtrees(objects, depth)
+
+def matchings_gen(d, kmin=0, kmax=None, links=None, start=None):
+    """
+    Generator for the matchings
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    kmin, kmax : generate only the matchings with a number of edges
+                 between ``kmin`` and ``kmax``
+    links : list of edges of the graph
+    start : subtree of the enumeration, as returned by
+            ``matchings_subtrees``
+
+    Notes
+    =====
+
+    The matchings are generated as lists of edges by a backtracking
+    walk on the edges in the order ``links``, by default the one given
+    by ``_sweep_links``.
+
+    Examples
+    ========
+
+    >>> from hobj import matchings_gen
+    >>> d = {0:[1,3], 1:[0,2], 2:[1,3], 3:[0,2]}
+    >>> list(matchings_gen(d, kmin=2))
+    [[(0, 1), (2, 3)], [(0, 3), (1, 2)]]
+    """
+    links, labels = _sweep_links(d, links)
+    for a in _hobj_walk(links, kmin, kmax, start):
+        yield sorted([labels[i] for i in a])
+
+def matchings_subtrees(d, depth, links=None):
+    """
+    split the enumeration of the matchings in subtrees
+
+    See the Notes in ``independent_sets_subtrees``.
+    """
+    links, labels = _sweep_links(d, links)
+    return _hobj_subtrees(links, depth)
 
 def independence_sets(d):
     """
@@ -876,6 +2456,9 @@ def independence_sets(d):
     The dictionary ``d`` associates to each vertex of the graph the list
     of its neighbours.
 
+    For a large number of independent sets use
+    ``bitsets.independence_sets_export``, which writes them as bitsets.
+
     Examples
     ========
 
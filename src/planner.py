@@ -0,0 +1,386 @@
+""" Choice of the engine for matching and independence polynomials
+
+  The planner examines a graph and estimates the cost of the engines
+  which can compute its polynomial; the cost of a sweep over objects,
+  with ``nu_s`` active ``eta`` elements after the ``s``-th object,
+  is taken to be
+
+  ``sum_s 2**nu_s * ncoeffs * words``
+
+  where ``ncoeffs`` is the number of coefficients of the polynomials
+  (``1`` if the polynomial is evaluated) and ``words`` the estimated size
+  of the coefficients in machine words; engines multiplying polynomials
+  by polynomials have a factor ``ncoeffs**2``.
+
+  The chosen engine, with its ordering, and the costs of all the
+  engines considered are stored in a ``Plan``.
+
+"""
+from domains import ZZ
+from hobj import (d_relabel, dup_matching_generating_poly,
+    dup_independence_poly, dup_permanental_minor_poly, _ring_ops,
+    _dup_prod, _dup_independence_chordal, _dup_independence_modules)
+from active_nodes import (ordered_links, active_profile, ip_active_profile,
+    profile_states, ip_ordered_vertices, ip_list_objects_from_vlist,
+    perm_ordered_rows)
+from decomposition import (connected_components, subgraph,
+    biconnected_components, perfect_elimination_ordering,
+    modular_decomposition, _md_nodes, is_claw_free, line_graph_root,
+    has_twins)
+from reductions import matching_reduce, independence_reduce
+
+# the reductions are computed modulo a prime to find the reduced graph
+_STRUCT_OPS = _ring_ops(ZZ, 1, 2147483647)
+
+
+class Plan(object):
+    """
+    engine chosen to compute the polynomial of a graph
+
+    Attributes
+    ==========
+
+    kind : ``'matching'`` or ``'independence'``
+    d : dict for the graph, with vertices ``0,..,n-1``
+    engine : name of the chosen engine
+    width : number of active elements of the chosen engine
+    cost : estimated cost of the chosen engine
+    data : ordering or other data used by the engine
+    candidates : list of ``(cost, engine, width)`` for the engines
+                 considered, the cheapest first
+
+    Notes
+    =====
+
+    The engines are:
+
+    ``'default'``: graph with at most two vertices
+    ``'components'``: product over the connected components;
+    ``data`` is the list of pairs ``(vertices, plan)``
+    ``'hobj'``: ``Hobj`` sweep on the edges (matching) or on the vertices
+    (independence); ``data`` is the ordering
+    ``'reduced'``: reductions, and for matchings the blocks,
+    before the ``Hobj`` sweep
+    ``'permanental'``: permanental minors of the biadjacency matrix
+    of a bipartite graph; ``data`` is the matrix
+    ``'chordal'``: clique tree of a chordal graph; ``data`` is the
+    perfect elimination ordering
+    ``'line_graph'``: matching polynomial of the root graph;
+    ``data`` is the plan for the root graph
+    ``'modules'``: modular decomposition; ``data`` is the tree
+    """
+    def __init__(self, kind, d, candidates, K=ZZ, val=None, pr=None):
+        self.kind = kind
+        self.d = d
+        self.K = K
+        self.val = val
+        self.pr = pr
+        candidates.sort(key=lambda x: x[0])
+        self.candidates = [(c, engine, width)
+                           for c, engine, width, data in candidates]
+        self.cost, self.engine, self.width, self.data = candidates[0]
+
+    def __repr__(self):
+        return 'Plan(%r, %r, width=%d, cost=%d)' % (self.kind, self.engine,
+            self.width, self.cost)
+
+    def execute(self):
+        """
+        compute the polynomial with the chosen engine
+        """
+        d = self.d
+        K = self.K
+        val = self.val
+        pr = self.pr
+        engine = self.engine
+        data = self.data
+        if engine == 'components':
+            a = [plan.execute() for vertices, plan in data]
+            return _dup_prod(a, K, val, pr)
+        if self.kind == 'matching':
+            if engine == 'hobj':
+                return dup_matching_generating_poly(d, val, pr, links=data, K=K)
+            if engine == 'permanental':
+                return dup_permanental_minor_poly(data, K, val)
+            return dup_matching_generating_poly(d, val, pr, K=K)
+        if engine == 'hobj':
+            return dup_independence_poly(d, val, pr, vlist=data, K=K)
+        if engine == 'chordal':
+            return _dup_independence_chordal(d, data, K, val, pr)
+        if engine == 'line_graph':
+            return data.execute()
+        if engine == 'modules':
+            return _dup_independence_modules(d, data, K, val, pr)
+        if engine == 'reduced':
+            from hobj import _dup_independence_weighted
+            ops = _ring_ops(K, val, pr)
+            c, d1, vw = independence_reduce(d, ops)
+            return ops[4](c, _dup_independence_weighted(d1, vw, K, val, pr))
+        return dup_independence_poly(d, val, pr, K=K)
+
+
+def _num_edges(d):
+    return sum([len(v) for v in d.values()]) // 2
+
+def _coeff_size(kind, d, val, pr):
+    """
+    ``(ncoeffs, words)`` for the polynomial of ``d``
+
+    The coefficients are bounded by the number of subsets of edges
+    (matching) or of vertices (independence).
+    """
+    n = _num_edges(d) if kind == 'matching' else len(d)
+    if pr:
+        return 1, 1
+    if val is None:
+        ncoeffs = len(d)//2 + 1 if kind == 'matching' else len(d) + 1
+        return ncoeffs, n // 64 + 1
+    try:
+        bits = n*int(abs(val) + 1).bit_length()
+    except (TypeError, ValueError, AttributeError):
+        bits = n
+    return 1, bits // 64 + 1
+
+def _ip_states(d):
+    """
+    bound on the number of states and width of the vertex ordering
+    of a connected graph
+    """
+    if len(d) < 2:
+        return len(d), 0
+    vlist = ip_ordered_vertices(d)
+    profile = ip_active_profile(ip_list_objects_from_vlist(d, vlist))
+    return sum(profile_states(profile)), max(profile)
+
+def _bipartite_sides(d):
+    """
+    the two sides of a connected bipartite graph, in breadth-first
+    order, or None
+    """
+    color = {0: 0}
+    sides = [[0], []]
+    i = 0
+    order = [0]
+    while i < len(order):
+        u = order[i]
+        i += 1
+        for w in d[u]:
+            if w not in color:
+                color[w] = 1 - color[u]
+                sides[color[w]].append(w)
+                order.append(w)
+            elif color[w] == color[u]:
+                return None
+    return sides
+
+def _perm_width(d, rows, cols):
+    """
+    biadjacency matrix with rows ``rows`` and columns ``cols``, the
+    maximum number of active columns of ``dup_permanental_minor_poly``
+    and the bound on its work, ``2**nactive*(nonzeros + 1)`` for each row
+    """
+    ct = dict([(k, j) for j, k in enumerate(cols)])
+    m = []
+    last = {}
+    for i, k in enumerate(rows):
+        a = [0]*len(cols)
+        for k1 in d[k]:
+            a[ct[k1]] = 1
+            last[k1] = i
+        m.append(a)
+    active = set()
+    width = 0
+    states = 0
+    for i, k in enumerate(rows):
+        active.update(d[k])
+        if len(active) > width:
+            width = len(active)
+        states += (1 << len(active))*(len(d[k]) + 1)
+        for k1 in d[k]:
+            if last[k1] == i:
+                active.discard(k1)
+    return m, width, states
+
+def _matching_candidates(d, K, val, pr):
+    n = len(d)
+    ncoeffs, words = _coeff_size('matching', d, val, pr)
+    a = []
+    links = ordered_links(d, 0, d[0][0])
+    # ordered_links can miss edges of graphs with bridges
+    if len(links) == _num_edges(d):
+        profile = active_profile(d, links)
+        cost = sum(profile_states(profile))*ncoeffs*words
+        a.append((cost, 'hobj', max(profile), links))
+    # reductions and blocks
+    c, d1, vw, ew = matching_reduce(d, _STRUCT_OPS)
+    if len(d1) < n or len(biconnected_components(d)) > 1:
+        cost = n*ncoeffs**2*words
+        wmax = 0
+        if d1:
+            for block in biconnected_components(d1):
+                d2 = subgraph(d1, block)
+                links1 = ordered_links(d2, 0, d2[0][0])
+                profile = active_profile(d2, links1)
+                wmax = max([wmax] + profile)
+                cost += 2*sum(profile_states(profile))*ncoeffs**2*words
+        a.append((cost, 'reduced', wmax, None))
+    # bipartite graphs
+    sides = _bipartite_sides(d)
+    if sides is not None and not pr:
+        best = None
+        for rows, cols in (sides, sides[::-1]):
+            m, w, states = _perm_width(d, rows, cols)
+            rows1 = perm_ordered_rows(m)[0]
+            m, w, states = _perm_width(d, [rows[i] for i in rows1], cols)
+            if best is None or states < best[2]:
+                best = m, w, states
+        m, w, states = best
+        a.append((states*ncoeffs*words, 'permanental', w, m))
+    if not a:
+        a.append((n*ncoeffs**2*words, 'default', 0, None))
+    return a
+
+def _independence_candidates(d, K, val, pr, modules=None):
+    n = len(d)
+    ncoeffs, words = _coeff_size('independence', d, val, pr)
+    a = []
+    vlist = ip_ordered_vertices(d)
+    profile = ip_active_profile(ip_list_objects_from_vlist(d, vlist))
+    cost = sum(profile_states(profile))*ncoeffs*words
+    a.append((cost, 'hobj', max(profile), vlist))
+    peo = perfect_elimination_ordering(d)
+    if peo is not None:
+        cost = (n + _num_edges(d))*ncoeffs**2*words
+        a.append((cost, 'chordal', 0, peo))
+    if is_claw_free(d):
+        r = line_graph_root(d)
+        if r is not None:
+            plan = plan_matching(r[0], K, val, pr)
+            a.append((plan.cost, 'line_graph', plan.width, plan))
+    if modules is None:
+        modules = has_twins(d)
+    tree = modular_decomposition(d) if modules else None
+    if tree is not None and (tree[0] != 'prime' or
+                             any([c[0] != 'leaf' for c in tree[2]])):
+        cost = n*ncoeffs**2*words
+        wmax = 0
+        for kind, vertices, children in _md_nodes(tree):
+            if kind != 'prime':
+                continue
+            q = subgraph(d, [c[1][0] for c in children])
+            sq, wq = _ip_states(q)
+            wmax = max(wmax, wq)
+            cost += sq*ncoeffs**2*words
+        a.append((cost, 'modules', wmax, tree))
+    c, d1, vw = independence_reduce(d, _STRUCT_OPS)
+    if len(d1) < n:
+        s1, w1 = _ip_states(subgraph(d1, list(d1)))
+        cost = (n + s1)*ncoeffs**2*words
+        a.append((cost, 'reduced', w1, None))
+    return a
+
+def _plan(kind, d, K, val, pr, modules=None):
+    if val is None and pr:
+        raise NotImplementedError
+    if list(sorted(d.keys())) != list(range(len(d))):
+        d, dt = d_relabel(d)
+    comps = connected_components(d)
+    if len(comps) > 1:
+        data = []
+        cost = 0
+        width = 0
+        for comp in comps:
+            plan = _plan(kind, subgraph(d, comp), K, val, pr, modules)
+            data.append((comp, plan))
+            cost += plan.cost
+            width = max(width, plan.width)
+        return Plan(kind, d, [(cost, 'components', width, data)], K, val, pr)
+    if len(d) <= 2:
+        return Plan(kind, d, [(1, 'default', 0, None)], K, val, pr)
+    if kind == 'matching':
+        a = _matching_candidates(d, K, val, pr)
+    else:
+        a = _independence_candidates(d, K, val, pr, modules)
+    return Plan(kind, d, a, K, val, pr)
+
+def plan_matching(d, K=ZZ, val=None, pr=None):
+    """
+    plan for the matching generating polynomial of the graph ``d``
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    K, val, pr : see ``dup_matching_generating_poly``
+
+    Notes
+    =====
+
+    The engines considered are the ``Hobj`` sweep on the edges ordered
+    by ``ordered_links``, the reductions with the block decomposition and,
+    for bipartite graphs, the permanental minors of the biadjacency
+    matrix, whose rows are the vertices of the side giving less work.
+
+    Examples
+    ========
+
+    >>> from planner import plan_matching
+    >>> d = dict((i, list(range(3, 13))) for i in range(3))
+    >>> d.update(dict((i, [0, 1, 2]) for i in range(3, 13)))
+    >>> plan = plan_matching(d)
+    >>> plan
+    Plan('matching', 'permanental', width=3, cost=2240)
+    >>> plan.candidates
+    [(2240, 'permanental', 3), (79191, 'hobj', 10)]
+    >>> plan.execute()
+    [720, 270, 30, 1]
+    """
+    return _plan('matching', d, K, val, pr)
+
+def plan_independence(d, K=ZZ, val=None, pr=None, modules=None):
+    """
+    plan for the independence polynomial of the graph ``d``
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    K, val, pr : see ``dup_independence_poly``
+    modules : if True the modular decomposition is computed; if None,
+              only if the graph has twins, see ``decomposition.has_twins``
+
+    Notes
+    =====
+
+    The engines considered are the ``Hobj`` sweep on the vertices ordered
+    by ``ip_ordered_vertices``, the clique tree for chordal graphs,
+    the matching polynomial of the root for line graphs,
+    the modular decomposition and the reductions.
+
+    The modular decomposition takes a time roughly quadratic in the
+    number of vertices, and most lattices have no non-trivial modules,
+    so by default it is computed only if there are twins.
+
+    Examples
+    ========
+
+    >>> from planner import plan_independence
+    >>> from graphs_gen import dict_fuller, line_graph
+    >>> plan = plan_independence(line_graph(dict_fuller(20)))
+    >>> plan.engine
+    'line_graph'
+    >>> [x[1] for x in plan.candidates]
+    ['line_graph', 'hobj']
+    >>> plan.execute()[:3]
+    [36, 1400, 10260]
+    """
+    return _plan('independence', d, K, val, pr, modules)
+
+
+if __name__ == "__main__":
+    import doctest
+    import sys
+    if sys.version_info < (2, 6):
+        print('doctests require Fraction, available from Python2.6')
+        sys.exit()
+    doctest.testmod()
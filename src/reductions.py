@@ -0,0 +1,252 @@
+""" Reductions of graphs preserving matching and independence polynomials
+
+  Vertices of low degree and twins are eliminated exactly, giving
+  a smaller graph with weighted vertices and edges.
+
+  The weights are polynomials or numbers; the arithmetic is given by
+  the tuple ``ops = (zero, one, t, add, mul)`` returned by
+  ``hobj._ring_ops``.
+
+  Matchings
+  =========
+
+  Each vertex ``v`` has the factor ``U_v + W_v*eta_v``, each edge
+  ``(a, b)`` the factor ``c0 + ca*eta_a + cb*eta_b + cab*eta_a*eta_b``;
+  for the original graph ``U_v = 1, W_v = 0`` and ``c0 = 1, ca = cb = 0,
+  cab = t``.
+  Eliminating a vertex ``v`` means multiplying its factor and the factors
+  of the edges containing it, and integrating over ``eta_v``;
+  for a vertex with one or two neighbours the result is a factor
+  of the same form on a vertex or on an edge.
+
+  Independent sets
+  ================
+
+  Each vertex ``v`` has the weights ``(a_v, b_v)``, for ``v`` not in the
+  independent set and in the independent set respectively;
+  for the original graph ``a_v = 1, b_v = t``.
+  Pendant vertices are eliminated in their neighbour; true twins
+  (adjacent vertices with the same neighbours) and false twins
+  (non-adjacent vertices with the same neighbours) are merged in a
+  single vertex.
+
+"""
+from collections import deque
+from compatibility import iteritems
+
+
+def _edge_key(a, b):
+    return (a, b) if a < b else (b, a)
+
+def _get_edge(ew, a, b, ops):
+    """
+    factor ``(c0, ca, cb, cab)`` of the edge ``(a, b)``
+    """
+    zero, one, t = ops[:3]
+    if a < b:
+        return ew.get((a, b), (one, zero, zero, t))
+    c0, cb, ca, cab = ew.get((b, a), (one, zero, zero, t))
+    return c0, ca, cb, cab
+
+def _set_edge(ew, a, b, f):
+    if a < b:
+        ew[(a, b)] = f
+    else:
+        c0, ca, cb, cab = f
+        ew[(b, a)] = (c0, cb, ca, cab)
+
+def matching_reduce(d, ops, ew=None):
+    """
+    eliminate the vertices with less than three neighbours
+
+    Parameters
+    ==========
+
+    d : dict for the graph, with comparable vertices
+    ops : see the module docstring
+    ew : dict of the edge factors ``(c0, ca, cb, cab)``, with keys
+         ``(a, b)``, ``a < b``; the missing edges have the default factor
+
+    Notes
+    =====
+
+    Returns ``(c, d1, vw, ew)``, where ``c`` is a constant factor,
+    ``d1`` the dict of the reduced graph, ``vw`` the dict of the vertex
+    factors ``(U_v, W_v)`` of the reduced graph, ``ew`` the dict of the
+    edge factors of the reduced graph; the vertices and edges not in
+    the dicts have the default factors.
+    The matching generating polynomial of ``d`` is ``c`` times the integral
+    of the product of the factors of the reduced graph.
+
+    A pendant vertex ``v`` attached to ``u`` is absorbed in the factor
+    of ``u``; a vertex ``v`` with neighbours ``a, b`` is replaced by the
+    edge ``(a, b)``, which is multiplied by the factor of the edge
+    ``(a, b)`` if it is already present; so degree-2 chains are
+    contracted to an edge.
+
+    Examples
+    ========
+
+    >>> from hobj import _ring_ops
+    >>> from domains import ZZ
+    >>> from reductions import matching_reduce
+    >>> ops = _ring_ops(ZZ, None, None)
+    >>> d = {0:[1,4], 1:[0,2], 2:[1,3], 3:[2,4], 4:[0,3]}
+    >>> c, d1, vw, ew = matching_reduce(d, ops)
+    >>> c, d1
+    ([5, 5, 1], {})
+    """
+    zero, one, t, add, mul = ops
+    adj = dict([(k, set(v)) for k, v in iteritems(d)])
+    ew = dict(ew) if ew else {}
+    vw = {}
+    c = one
+    work = deque([k for k in d if len(adj[k]) < 3])
+    while work:
+        v = work.popleft()
+        if v not in adj or len(adj[v]) > 2:
+            continue
+        U, W = vw.pop(v, (one, zero))
+        A = add(U, W)
+        nb = list(adj.pop(v))
+        for k in nb:
+            adj[k].discard(v)
+        if not nb:
+            c = mul(c, A)
+        elif len(nb) == 1:
+            u = nb[0]
+            c0, cu, cv, cuv = _get_edge(ew, u, v, ops)
+            ew.pop(_edge_key(u, v), None)
+            # (c0 + cu*eta_u)*(U + W) + (cv + cuv*eta_u)*U
+            g0 = add(mul(c0, A), mul(cv, U))
+            gu = add(mul(cu, A), mul(cuv, U))
+            Uu, Wu = vw.get(u, (one, zero))
+            vw[u] = (mul(Uu, g0), add(mul(Uu, gu), mul(Wu, g0)))
+            work.append(u)
+        else:
+            a, b = nb
+            a0, aa, av, aav = _get_edge(ew, a, v, ops)
+            b0, bv, bb, bvb = _get_edge(ew, v, b, ops)
+            ew.pop(_edge_key(a, v), None)
+            ew.pop(_edge_key(v, b), None)
+            # (a0 + aa*eta_a)*(b0 + bb*eta_b)*(U + W) +
+            # U*((av + aav*eta_a)*(b0 + bb*eta_b) +
+            #    (a0 + aa*eta_a)*(bv + bvb*eta_b))
+            h0 = add(mul(mul(a0, b0), A), mul(U, add(mul(av, b0), mul(a0, bv))))
+            ha = add(mul(mul(aa, b0), A), mul(U, add(mul(aav, b0), mul(aa, bv))))
+            hb = add(mul(mul(a0, bb), A), mul(U, add(mul(av, bb), mul(a0, bvb))))
+            hab = add(mul(mul(aa, bb), A), mul(U, add(mul(aav, bb), mul(aa, bvb))))
+            if b in adj[a]:
+                e0, ea, eb, eab = _get_edge(ew, a, b, ops)
+                h = (mul(h0, e0), add(mul(h0, ea), mul(ha, e0)),
+                     add(mul(h0, eb), mul(hb, e0)),
+                     add(add(mul(h0, eab), mul(hab, e0)),
+                         add(mul(ha, eb), mul(hb, ea))))
+            else:
+                adj[a].add(b)
+                adj[b].add(a)
+                h = (h0, ha, hb, hab)
+            _set_edge(ew, a, b, h)
+            work.append(a)
+            work.append(b)
+    d1 = {}
+    for k in d:
+        if k in adj:
+            d1[k] = [k1 for k1 in d[k] if k1 in adj[k]] + \
+                    [k1 for k1 in adj[k] if k1 not in d[k]]
+    return c, d1, vw, ew
+
+def independence_reduce(d, ops):
+    """
+    eliminate pendant vertices and twins
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    ops : see the module docstring
+
+    Notes
+    =====
+
+    Returns ``(c, d1, vw)``, where ``c`` is a constant factor,
+    ``d1`` the dict of the reduced graph and ``vw`` the dict of the
+    weights ``(a_v, b_v)`` of the vertices of the reduced graph;
+    the vertices not in ``vw`` have the default weights.
+    The independence polynomial of ``d`` is ``c`` times the sum
+    over the independent sets ``S`` of the reduced graph of
+    ``prod_{v in S} b_v prod_{v not in S} a_v``.
+
+    Examples
+    ========
+
+    >>> from hobj import _ring_ops
+    >>> from domains import ZZ
+    >>> from reductions import independence_reduce
+    >>> ops = _ring_ops(ZZ, None, None)
+    >>> d = {0:[1,2,3], 1:[0,2,3], 2:[0,1], 3:[0,1]}
+    >>> independence_reduce(d, ops)
+    ([1, 4, 1], {}, {})
+    """
+    zero, one, t, add, mul = ops
+    adj = dict([(k, set(v)) for k, v in iteritems(d)])
+    vw = {}
+    c = one
+
+    def remove(v):
+        for k in adj.pop(v):
+            adj[k].discard(v)
+
+    hit = True
+    while hit:
+        hit = False
+        work = deque([k for k in adj if len(adj[k]) < 2])
+        while work:
+            v = work.popleft()
+            if v not in adj or len(adj[v]) > 1:
+                continue
+            a, b = vw.pop(v, (one, t))
+            if not adj[v]:
+                c = mul(c, add(a, b))
+                del adj[v]
+                continue
+            u = list(adj[v])[0]
+            remove(v)
+            au, bu = vw.get(u, (one, t))
+            vw[u] = (mul(au, add(a, b)), mul(bu, a))
+            work.append(u)
+            hit = True
+        for closed in (False, True):
+            groups = {}
+            for k, v in iteritems(adj):
+                key = frozenset(v | set([k])) if closed else frozenset(v)
+                groups.setdefault(key, []).append(k)
+            for a1 in groups.values():
+                if len(a1) < 2:
+                    continue
+                u = a1[0]
+                au, bu = vw.get(u, (one, t))
+                for v in a1[1:]:
+                    av, bv = vw.pop(v, (one, t))
+                    remove(v)
+                    if closed:
+                        bu = add(mul(bu, av), mul(au, bv))
+                    else:
+                        bu = add(add(mul(bu, av), mul(au, bv)), mul(bu, bv))
+                    au = mul(au, av)
+                vw[u] = (au, bu)
+                hit = True
+    d1 = {}
+    for k in d:
+        if k in adj:
+            d1[k] = [k1 for k1 in d[k] if k1 in adj[k]]
+    return c, d1, vw
+
+
+if __name__ == "__main__":
+    import doctest
+    import sys
+    if sys.version_info < (2, 6):
+        print('doctests require Fraction, available from Python2.6')
+        sys.exit()
+    doctest.testmod()
@@ -0,0 +1,328 @@
+""" Zero-suppressed decision diagrams for hard object configurations
+
+  The configurations enumerated by ``gen_hobj`` are stored here in a
+  zero-suppressed decision diagram (ZDD) built over the same ordering
+  of objects.
+  The diagram is constructed by a sweep on the objects, keeping as state
+  the set of active ``eta`` elements already used; configurations with
+  the same state are shared, so that the number of nodes at each level
+  is bounded by ``2**nu``, where ``nu`` is the number of active elements,
+  instead of growing with the number of configurations.
+
+"""
+from hobj import obj_free, _sweep_links
+from active_nodes import ip_ordered_vertices, ip_list_objects_from_vlist
+
+
+class ZDD(object):
+    """
+    zero-suppressed decision diagram of sets of objects
+
+    Nodes are integers; ``0`` is the empty family, ``1`` is the family
+    containing only the empty set; for a node ``i > 1``,
+    ``var[i]`` is the index of the object, ``lo[i]`` the node of the
+    configurations without the object, ``hi[i]`` the node of the
+    configurations with the object.
+
+    Parameters
+    ==========
+
+    var, lo, hi : lists describing the nodes
+    root : root node
+    labels : list of labels of the objects
+    """
+    def __init__(self, var, lo, hi, root, labels):
+        self.var = var
+        self.lo = lo
+        self.hi = hi
+        self.root = root
+        self.labels = labels
+        self._sizes = None
+
+    def num_nodes(self):
+        """
+        number of non-terminal nodes
+        """
+        return len(self.var) - 2
+
+    def _get_sizes(self):
+        """
+        list of bitmasks of the sizes of the sets below each node
+        """
+        if self._sizes is None:
+            lo = self.lo
+            hi = self.hi
+            sizes = [0, 1]
+            for i in range(2, len(self.var)):
+                sizes.append(sizes[lo[i]] | (sizes[hi[i]] << 1))
+            self._sizes = sizes
+        return self._sizes
+
+    def count(self, k=None):
+        """
+        number of sets; if ``k`` is given, number of sets with ``k`` objects
+
+        Examples
+        ========
+
+        >>> from zdd import independent_sets_zdd
+        >>> z = independent_sets_zdd({0:[1,4], 1:[0,2], 2:[1,3], 3:[2,4], 4:[0,3]})
+        >>> z.count(), z.count(2)
+        (11, 5)
+        """
+        if k is not None:
+            p = self.count_poly()
+            n = len(p) - 1
+            if k < 0 or k > n:
+                return 0
+            return p[n - k]
+        lo = self.lo
+        hi = self.hi
+        c = [0, 1]
+        for i in range(2, len(self.var)):
+            c.append(c[lo[i]] + c[hi[i]])
+        return c[self.root]
+
+    def count_poly(self):
+        """
+        polynomial counting the sets according to their size
+
+        Notes
+        =====
+
+        The polynomial is in the dense representation used in ``densearith``,
+        with the leading coefficient first; it is the same polynomial
+        computed by ``dup_gen_count_hobj`` on the same objects.
+        """
+        lo = self.lo
+        hi = self.hi
+        c = [[], [1]]
+        for i in range(2, len(self.var)):
+            a = c[lo[i]]
+            b = [0] + c[hi[i]]
+            if len(a) < len(b):
+                a, b = b, a
+            r = a[:]
+            for j in range(len(b)):
+                r[j] += b[j]
+            c.append(r)
+        r = c[self.root]
+        r.reverse()
+        return r
+
+    def iter_sets(self, k=None):
+        """
+        generator of the sets, as lists of object labels
+
+        Parameters
+        ==========
+
+        k : if given, only the sets with ``k`` objects are generated
+
+        Examples
+        ========
+
+        >>> from zdd import independent_sets_zdd
+        >>> z = independent_sets_zdd({0:[1,4], 1:[0,2], 2:[1,3], 3:[2,4], 4:[0,3]})
+        >>> sorted(z.iter_sets(2))
+        [[0, 2], [0, 3], [1, 3], [1, 4], [2, 4]]
+        """
+        var = self.var
+        lo = self.lo
+        hi = self.hi
+        labels = self.labels
+        sizes = self._get_sizes() if k is not None else None
+        if self.root == 0:
+            return
+        if k is not None and not (sizes[self.root] >> k) & 1:
+            return
+        chosen = []
+        # each entry is (node, length of chosen, remaining size)
+        stack = [(self.root, 0, k)]
+        while stack:
+            node, nc, kx = stack.pop()
+            del chosen[nc:]
+            while node > 1:
+                h = hi[node]
+                if kx is None:
+                    stack.append((lo[node], len(chosen), None))
+                    chosen.append(var[node])
+                    node = h
+                    continue
+                if (sizes[lo[node]] >> kx) & 1:
+                    stack.append((lo[node], len(chosen), kx))
+                if kx and (sizes[h] >> (kx - 1)) & 1:
+                    chosen.append(var[node])
+                    node = h
+                    kx -= 1
+                else:
+                    node = 0
+            if node == 1 and not kx:
+                yield sorted([labels[i] for i in chosen])
+
+
+def zdd_from_objects(objects, labels=None):
+    """
+    ZDD of the hard object configurations of ``objects``
+
+    Parameters
+    ==========
+
+    objects : list of tuple of object element indices
+    labels : list of labels of the objects; by default ``range(len(objects))``
+
+    Notes
+    =====
+
+    The state of the sweep after the object ``i`` is the set of
+    the elements used by the chosen objects and still active, that is
+    appearing in some object after ``i``; elements are given a bit
+    in the state when they become active, and the bit is reused when
+    they are freed, as in ``Hobj.iadd_object``.
+
+    Examples
+    ========
+
+    >>> from zdd import zdd_from_objects
+    >>> z = zdd_from_objects([(0,1),(1,2),(2,3),(3,4),(0,4)])
+    >>> z.count()
+    11
+    >>> z.count_poly()
+    [5, 5, 1]
+    """
+    n = len(objects)
+    if labels is None:
+        labels = list(range(n))
+    elif len(labels) != n:
+        raise ValueError('labels and objects have different lengths')
+    a = obj_free(objects)
+    dt = {}
+    freedt = list(range(1000, -1, -1))
+    levels = []
+    states = {0: 0}
+    for obj, free in a:
+        exp2 = 0
+        for i in obj:
+            if i in dt:
+                j = dt[i]
+            else:
+                j = freedt.pop()
+                dt[i] = j
+            exp2 |= 1 << j
+        mask_free = 0
+        for i in free:
+            j = dt.pop(i)
+            mask_free |= 1 << j
+            freedt.append(j)
+        nstates = {}
+        level = []
+        for exp1 in states:
+            exp = exp1 & ~mask_free
+            if exp not in nstates:
+                nstates[exp] = len(nstates)
+            lo = nstates[exp]
+            if exp1 & exp2:
+                hi = -1
+            else:
+                exp = (exp1 | exp2) & ~mask_free
+                if exp not in nstates:
+                    nstates[exp] = len(nstates)
+                hi = nstates[exp]
+            level.append((lo, hi))
+        levels.append(level)
+        states = nstates
+
+    # bottom-up reduction; at the end all the elements are freed
+    assert list(states) == [0]
+    var = [-1, -1]
+    los = [0, 0]
+    his = [0, 0]
+    unique = {}
+    ids = [1]
+    for i in range(n - 1, -1, -1):
+        nids = []
+        for lo, hi in levels[i]:
+            lo = ids[lo]
+            hi = ids[hi] if hi >= 0 else 0
+            if hi == 0:
+                nids.append(lo)
+                continue
+            t = (i, lo, hi)
+            r = unique.get(t)
+            if r is None:
+                r = len(var)
+                var.append(i)
+                los.append(lo)
+                his.append(hi)
+                unique[t] = r
+            nids.append(r)
+        ids = nids
+        levels[i] = None
+    return ZDD(var, los, his, ids[0], labels)
+
+
+def independent_sets_zdd(d, vlist=None):
+    """
+    ZDD of the independent sets of the graph with dict ``d``
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    vlist : list of vertices of the graph; by default it is found
+            using ``ip_ordered_vertices``
+
+    Examples
+    ========
+
+    >>> from zdd import independent_sets_zdd
+    >>> from graphs_gen import dict_fuller
+    >>> z = independent_sets_zdd(dict_fuller(20))
+    >>> z.count_poly()
+    [5, 320, 1240, 1912, 1510, 660, 160, 20, 1]
+    """
+    if not vlist:
+        vlist = ip_ordered_vertices(d)
+    if len(d) != len(vlist):
+        raise ValueError('vlist has not all the vertices of the graph')
+    objects = ip_list_objects_from_vlist(d, vlist)
+    return zdd_from_objects(objects, vlist)
+
+
+def matchings_zdd(d, links=None):
+    """
+    ZDD of the matchings of the graph with dict ``d``
+
+    Parameters
+    ==========
+
+    d : dict for the graph
+    links : ordered list of edges of the graph; by default it is found
+            using ``ordered_links``
+
+    Notes
+    =====
+
+    The sets generated by ``iter_sets`` are lists of edges.
+
+    Examples
+    ========
+
+    >>> from zdd import matchings_zdd
+    >>> z = matchings_zdd({0:[1,4], 1:[0,2], 2:[1,3], 3:[2,4], 4:[0,3]})
+    >>> z.count_poly()
+    [5, 5, 1]
+    >>> sorted(z.iter_sets(2))[:2]
+    [[(0, 1), (2, 3)], [(0, 1), (3, 4)]]
+    """
+    links, labels = _sweep_links(d, links)
+    return zdd_from_objects(links, labels)
+
+
+if __name__ == "__main__":
+    import doctest
+    import sys
+    if sys.version_info < (2, 6):
+        print('doctests require Fraction, available from Python2.6')
+        sys.exit()
+    doctest.testmod()
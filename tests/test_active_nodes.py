@@ -1,10 +1,16 @@
 import sys
+import random
 sys.path.insert(0,'../src')
 from active_nodes import (ordered_links, num_active_nodes, ip_ordered_vertices,
-    ip_list_objects_from_vlist, ip_get_dn, ip_num_active_elements)
+    ip_list_objects_from_vlist, ip_get_dn, ip_num_active_elements,
+    optimize_links, ip_optimize_vertices, active_profile, ip_active_profile,
+    profile_states, ordered_links_all, ip_ordered_vertices_all,
+    perm_active_profile, perm_ordered_rows, perm_order)
+from hobj import (dup_matching_generating_poly, dup_independence_poly,
+    dup_permanental_minor_poly)
 
 from domains import ZZ
-from graphs_gen import dict_fuller
+from graphs_gen import dict_fuller, sq_d_np, sq_mat
 
 def test_ordered_links():
     d = dict_fuller(60)
@@ -30,10 +36,99 @@ def test_ip_num_active_elements2():
     objects = ip_list_objects_from_vlist(d, vlist)
     nu = ip_num_active_elements(objects)
     assert nu == 8
+def test_ordered_large_grid():
+    d = sq_d_np(30, 30)
+    links = ordered_links(d, 0, d[0][0])
+    assert len(links) == 1740
+    assert num_active_nodes(d, links) == 30
+    vlist = ip_ordered_vertices(d)
+    assert sorted(vlist) == list(range(900))
+    objects = ip_list_objects_from_vlist(d, vlist)
+    assert ip_num_active_elements(objects) == 33
+
+def test_profiles():
+    d = dict_fuller(60)
+    links = ordered_links(d, 0, 1)
+    profile = active_profile(d, links)
+    assert len(profile) == len(links) == 90
+    assert max(profile) == num_active_nodes(d, links) == 10
+    # the vertices of the links occur in three links
+    assert ip_active_profile(links) == profile
+    assert profile[-1] == 0
+    states = profile_states(profile)
+    assert max(states) == 2**10 and sum(states) == 47689
+    vlist = ip_ordered_vertices(d)
+    profile = ip_active_profile(ip_list_objects_from_vlist(d, vlist))
+    assert len(profile) == 60 and max(profile) == 11 and profile[-1] == 0
+
+def test_ordered_all():
+    d = dict_fuller(36)
+    r = ordered_links_all(d)
+    assert r[3] == num_active_nodes(d, r[2]) == 8
+    assert r[2] == ordered_links(d, r[0], r[1])
+    assert ordered_links_all(d, nprocs=2) == r
+    r = ip_ordered_vertices_all(d)
+    assert r[2] == ip_ordered_vertices(d, r[0], r[1])
+    assert ip_num_active_elements(ip_list_objects_from_vlist(d, r[2])) == r[3]
+    assert ip_ordered_vertices_all(d, nprocs=2) == r
+
+def test_optimize_links():
+    d = dict_fuller(36)
+    links0 = ordered_links(d, 0, d[0][0])
+    links = optimize_links(d, niter=20000, seed=1)
+    assert sorted(links) == sorted(links0)
+    assert num_active_nodes(d, links) < num_active_nodes(d, links0)
+    assert optimize_links(d, niter=20000, seed=1) == links
+    assert dup_matching_generating_poly(d, links=links) == \
+        dup_matching_generating_poly(d)
+
+def test_ip_optimize_vertices():
+    d = dict_fuller(36)
+    vlist = ip_ordered_vertices(d)
+    nu = ip_num_active_elements(ip_list_objects_from_vlist(d, vlist))
+    vlist1 = ip_optimize_vertices(d, vlist, niter=2000)
+    assert sorted(vlist1) == sorted(vlist)
+    assert ip_num_active_elements(ip_list_objects_from_vlist(d, vlist1)) <= nu
+    assert dup_independence_poly(d, vlist=vlist1) == dup_independence_poly(d)
+    # equal objects: a K2 component and isolated vertices
+    for d in [{0:[1], 1:[0], 2:[3], 3:[2,4], 4:[3]},
+              {0:[1], 1:[0,2], 2:[1], 3:[], 4:[]}]:
+        vlist1 = ip_optimize_vertices(d, [4, 2, 0, 3, 1], niter=200)
+        assert sorted(vlist1) == list(range(5))
+        assert dup_independence_poly(d, vlist=vlist1) == \
+            dup_independence_poly(d)
+
+def test_perm_order():
+    # rows of the 4 x 12 open grid, shuffled
+    m, d1, d2 = sq_mat(4, 12, 'np')
+    rnd = random.Random(1)
+    a = list(range(len(m)))
+    rnd.shuffle(a)
+    m = [m[i] for i in a]
+    assert max(perm_active_profile(m)) > 10
+    rows, width = perm_ordered_rows(m)
+    assert sorted(rows) == list(range(len(m)))
+    assert width == max(perm_active_profile(m, rows)) == 5
+    p = dup_permanental_minor_poly(m, ZZ)
+    assert dup_permanental_minor_poly(m, ZZ, rows='auto') == p
+    assert dup_permanental_minor_poly(m, ZZ, val=2, rows='auto') == \
+        dup_permanental_minor_poly(m, ZZ, val=2)
+    # the transpose has fewer active columns
+    m = [[(i + j) % 3 for j in range(10)] for i in range(3)]
+    transpose, rows, width = perm_order(m)
+    assert transpose and width == 3
+    assert dup_permanental_minor_poly(m, ZZ, rows='auto') == \
+        dup_permanental_minor_poly(m, ZZ)
 
 
 if __name__ == '__main__':
     test_ordered_links()
     test_ip_num_active_elements1()
     test_ip_num_active_elements2()
+    test_ordered_large_grid()
+    test_profiles()
+    test_ordered_all()
+    test_optimize_links()
+    test_ip_optimize_vertices()
+    test_perm_order()
     print('test_active_nodes ok')
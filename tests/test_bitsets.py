@@ -0,0 +1,66 @@
+import sys
+import os
+import tempfile
+sys.path.insert(0,'../src')
+from bitsets import (write_bitsets, iter_bitsets, hobj_export,
+    independence_sets_export)
+from hobj import independence_sets, gen_hobj, hobj_list, count_bits_set
+from active_nodes import ip_ordered_vertices, ip_list_objects_from_vlist
+from graphs_gen import dict_fuller
+
+def _sets(a):
+    return sorted([[i for i in range(a.bit_length()) if a >> i & 1] for a in a])
+
+def test_independence_sets_export():
+    d = dict_fuller(20)
+    b = independence_sets(d)
+    nrec, buf = independence_sets_export(d)
+    assert nrec == len(b)
+    assert _sets(iter_bitsets(buf, 20)) == sorted(b)
+    path = os.path.join(tempfile.mkdtemp(), 'ip20.bin')
+    nrec, buf = independence_sets_export(d, path, by_size=True)
+    assert os.path.getsize(path) == 3*nrec
+    a = list(iter_bitsets(buf, 20))
+    assert [count_bits_set(x) for x in a] == [len(x) for x in b]
+    assert _sets(a) == sorted(b)
+    del buf
+    os.remove(path)
+
+def test_hobj_export():
+    d = dict_fuller(20)
+    vlist = ip_ordered_vertices(d)
+    objects = ip_list_objects_from_vlist(d, vlist)
+    p = gen_hobj(objects, vlist)
+    nrec, buf = hobj_export(p, 20, by_size=True)
+    a = list(iter_bitsets(buf, 20))
+    assert [count_bits_set(x) for x in a] == [len(x) for x in hobj_list(p)]
+
+def test_write_bitsets():
+    a = [3, 1 << 70, 0, (1 << 71) - 1, 6]
+    nrec, buf = write_bitsets(iter(a), 71, chunk_size=2)
+    assert list(iter_bitsets(buf, 71)) == a
+    nrec, buf = write_bitsets(iter(a), 71, chunk_size=2, by_size=True)
+    assert list(iter_bitsets(buf, 71)) == [0, 1 << 70, 3, 6, (1 << 71) - 1]
+    try:
+        write_bitsets([1 << 71], 71)
+        assert 0
+    except ValueError:
+        pass
+    # the temporary file is removed if the configurations raise
+    path = os.path.join(tempfile.mkdtemp(), 'a.bin')
+    try:
+        write_bitsets([1, 2, 1 << 71], 71, path=path, by_size=True)
+        assert 0
+    except ValueError:
+        pass
+    assert not os.path.exists(path + '.tmp')
+    nrec, buf = write_bitsets(iter(a), 71, path=path, by_size=True)
+    assert list(iter_bitsets(buf, 71)) == [0, 1 << 70, 3, 6, (1 << 71) - 1]
+    assert not os.path.exists(path + '.tmp')
+
+
+if __name__ == '__main__':
+    test_independence_sets_export()
+    test_hobj_export()
+    test_write_bitsets()
+    print('test_bitsets ok')
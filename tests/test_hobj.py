@@ -2,13 +2,20 @@ import sys
 sys.path.insert(0,'../src')
 from active_nodes import (ordered_links, ip_list_objects_from_vlist,
      ip_ordered_vertices)
-from hobj import (dup_permanental_minor_poly, gen_hobj,
-    dup_matching_generating_poly, dup_independence_poly, hobj_str)
+from hobj import (dup_permanental_minor_poly, dup_hafnian_minor_poly, gen_hobj,
+    dup_gen_count_hobj,
+    dup_matching_generating_poly, dup_independence_poly, hobj_str,
+    independent_sets_gen, independent_sets_subtrees, independence_sets,
+    matchings_gen, matchings_subtrees, obj_free, compile_plan)
 
-from densearith import dup_valuate
-from domains import ZZ
+from densearith import dup_valuate, dup_mul, dup_add, dup_lshift
+from domains import ZZ, QQ
 
-from graphs_gen import sq_mat, dict_fuller, line_graph
+from graphs_gen import (sq_mat, dict_fuller, line_graph, ring_perms, sq_d_np,
+    kings_sq_mat_np)
+from decomposition import (is_claw_free, line_graph_root,
+    perfect_elimination_ordering, modular_decomposition, has_twins)
+from planner import plan_matching, plan_independence
 
 SLOW_TEST = 0
 
@@ -39,6 +46,102 @@ def test_dup_permanental_minor_poly():
     r = dup_permanental_minor_poly(m, ZZ)
     assert r == [44862720, 12227040, 915600, 25550, 280, 1]
 
+def perm_minors_brute(m):
+    from itertools import combinations, permutations
+    n, ny = len(m), len(m[0])
+    p = []
+    for k in range(min(n, ny) + 1):
+        c = 0
+        for rows in combinations(range(n), k):
+            for cols in permutations(range(ny), k):
+                x = 1
+                for i, j in zip(rows, cols):
+                    x *= m[i][j]
+                c += x
+        p.append(c)
+    p.reverse()
+    return p
+
+def test_permanental_signed():
+    # signed entries, with cancellations in the coefficients
+    for n, ny in [(4, 6), (6, 4), (5, 5)]:
+        m = [[((i*ny + j)*7 % 5) - 2 for j in range(ny)] for i in range(n)]
+        p = perm_minors_brute(m)
+        while p and not p[0]:
+            p = p[1:]
+        assert dup_permanental_minor_poly(m, ZZ) == p
+        assert dup_permanental_minor_poly(m, ZZ, val=-2) == dup_valuate(p, -2)
+
+def test_permanental_repeated_rows():
+    # rows repeated, also not consecutively
+    a = [[1, 2, 0, 0, 1], [0, 1, 1, 3, 0], [2, 0, 0, 1, 1]]
+    m = [a[i] for i in (0, 1, 0, 0, 2, 1, 0)]
+    p = perm_minors_brute(m)
+    assert dup_permanental_minor_poly(m, ZZ) == p
+    assert dup_permanental_minor_poly(m, ZZ, val=3) == dup_valuate(p, 3)
+    m = [[QQ(x, 3) for x in r] for r in m]
+    assert dup_permanental_minor_poly(m, QQ) == perm_minors_brute(m)
+
+def test_permanental_qq():
+    # rows with different denominators
+    m = [[QQ(i + j, i + 2) for j in range(5)] for i in range(4)]
+    p = perm_minors_brute(m)
+    assert dup_permanental_minor_poly(m, QQ) == p
+    assert dup_permanental_minor_poly(m, QQ, val=QQ(2, 3)) == \
+        dup_valuate(p, QQ(2, 3))
+    m = [[QQ(x, 2) for x in a] for a in band_mat1(6, 3)]
+    p = dup_permanental_minor_poly(band_mat1(6, 3), ZZ)
+    n = len(p) - 1
+    assert dup_permanental_minor_poly(m, QQ) == \
+        [QQ(c, 2**(n - i)) for i, c in enumerate(p)]
+
+def test_permanental_batch():
+    try:
+        import numpy
+    except ImportError:
+        return
+    m, d1, d2 = sq_mat(4, 4, 'pp')
+    w = numpy.array([[[(b*i + j) % 4 + 1 for j in range(len(m[0]))]
+                      for i in range(len(m))] for b in range(5)])
+    stack = w*numpy.array(m)
+    a = [dup_permanental_minor_poly(stack[b].tolist(), ZZ) for b in range(5)]
+    assert dup_permanental_minor_poly(stack, ZZ) == a
+    assert dup_permanental_minor_poly(stack, ZZ, rows='auto') == a
+    # rows given as a NumPy array
+    rows = numpy.argsort([3, 1, 0, 2] + list(range(4, len(m))))
+    assert dup_permanental_minor_poly(stack, ZZ, rows=rows) == a
+    assert dup_permanental_minor_poly(stack[0], ZZ, rows=rows) == a[0]
+    assert list(dup_permanental_minor_poly(stack, ZZ, val=2)) == \
+        [dup_valuate(p, 2) for p in a]
+    r = dup_permanental_minor_poly(stack/2.0, ZZ, val=0.5)
+    assert numpy.allclose(r, [dup_valuate(p, 0.25) for p in a])
+
+def test_sparse_input():
+    m, d1, d2 = sq_mat(4, 6, 'pp')
+    p = dup_permanental_minor_poly(m, ZZ)
+    rows = dict([(i, dict([(j, x) for j, x in enumerate(a) if x]))
+                 for i, a in enumerate(m)])
+    assert dup_permanental_minor_poly(rows, ZZ) == p
+    indptr, indices, data = [0], [], []
+    for a in m:
+        for j, x in enumerate(a):
+            if x:
+                indices.append(j)
+                data.append(x)
+        indptr.append(len(indices))
+    assert dup_permanental_minor_poly((indptr, indices, data), ZZ) == p
+    assert dup_permanental_minor_poly((indptr, indices, data), ZZ, val=3) == \
+        dup_valuate(p, 3)
+    # single row
+    assert dup_permanental_minor_poly([[1, 2]], ZZ, val=1) == 4
+    try:
+        import numpy
+    except ImportError:
+        return
+    a = numpy.array(m, dtype=numpy.int64)
+    assert dup_permanental_minor_poly(a, ZZ) == p
+    assert dup_permanental_minor_poly(a, ZZ, rows='auto') == p
+
 def test_matching_poly_bipartite():
     m, d1, d2 = sq_mat(6, 6, 'pp')
     p = dup_permanental_minor_poly(m, ZZ)
@@ -115,6 +218,313 @@ def test_line_graph():
     p = dup_matching_generating_poly(d)
     p1 = dup_independence_poly(d1)
     assert p == p1
+    # the independence polynomial is computed on the root graph
+    d = dict_fuller(60)
+    d1 = line_graph(d)
+    d2, ends = line_graph_root(d1)
+    assert len(d2) == 60
+    for k, v in d1.items():
+        for k1 in v:
+            assert len(set(ends[k]) & set(ends[k1])) == 1
+    p = dup_matching_generating_poly(d, val=1)
+    assert dup_independence_poly(d1, val=1) == p
+    assert not is_claw_free(d)
+    assert line_graph_root(d) is None
+
+def _disjoint_union(ds):
+    d = {}
+    c = 0
+    for d1 in ds:
+        for k, v in d1.items():
+            d[k + c] = [k1 + c for k1 in v]
+        c += len(d1)
+    return d
+
+def test_components():
+    ds = [dict_fuller(20), {0:[1], 1:[0]}, dict_fuller(24), {0:[]},
+          dict_fuller(20)]
+    d = _disjoint_union(ds)
+    for f in [dup_matching_generating_poly, dup_independence_poly]:
+        p = [1]
+        for d1 in ds:
+            p = dup_mul(p, f(d1), ZZ)
+        assert f(d) == p
+        assert f(d, nprocs=2) == p
+        assert f(d, val=3) == dup_valuate(p, 3)
+        assert f(d, val=3, pr=101) == dup_valuate(p, 3) % 101
+        # empty graph
+        assert f({}) == [1] and f({}, val=3) == 1 and f({}, 3, 101) == 1
+
+def test_matching_blocks():
+    # two C20 joined by a bridge (0, 20)
+    d = _disjoint_union([dict_fuller(20), dict_fuller(20)])
+    d[0].append(20)
+    d[20].append(0)
+    d1 = dict_fuller(20)
+    p1 = dup_matching_generating_poly(d1)
+    d2 = dict((k - 1, [k1 - 1 for k1 in v if k1]) for k, v in d1.items() if k)
+    p2 = dup_matching_generating_poly(d2)
+    p = dup_add(dup_mul(p1, p1, ZZ), dup_lshift(dup_mul(p2, p2, ZZ), 1, ZZ), ZZ)
+    assert dup_matching_generating_poly(d) == p
+    assert dup_matching_generating_poly(d, val=2, pr=73) == dup_valuate(p, 2) % 73
+    # a path with 1000 vertices
+    n = 1000
+    d = dict((i, [j for j in (i - 1, i + 1) if 0 <= j < n]) for i in range(n))
+    assert dup_matching_generating_poly(d, val=1) == fibonacci(n + 1)
+
+def test_reductions():
+    # cube with four subdivided edges and four pendant vertices;
+    # the polynomials computed with given links or vlist are not reduced
+    d = {0:[1,3,4], 1:[0,2,5], 2:[1,3,6], 3:[0,2,7], 4:[0,5,7], 5:[1,4,6],
+         6:[2,5,7], 7:[3,4,6]}
+    n = 8
+    for k in range(0, 8, 2):
+        k1 = d[k][0]
+        d[k].remove(k1)
+        d[k1].remove(k)
+        d[k].append(n)
+        d[k1].append(n)
+        d[n] = [k, k1]
+        d[k].append(n + 1)
+        d[n + 1] = [k]
+        n += 2
+    links = ordered_links(d, 0, d[0][0])
+    p = dup_matching_generating_poly(d, links=links)
+    assert dup_matching_generating_poly(d) == p
+    assert dup_matching_generating_poly(d, val=3, pr=97) == dup_valuate(p, 3) % 97
+    vlist = ip_ordered_vertices(d)
+    p = dup_independence_poly(d, vlist=vlist)
+    assert dup_independence_poly(d) == p
+    # complete bipartite graph K_{4,5}: two sets of false twins
+    d = dict((i, list(range(4, 9))) for i in range(4))
+    d.update(dict((i, list(range(4))) for i in range(4, 9)))
+    p = [1, 5, 10, 10, 5, 1]
+    p = dup_add(dup_add(p, [1, 4, 6, 4, 1], ZZ), [-1], ZZ)
+    assert dup_independence_poly(d) == p
+    # complete graph K_6: true twins
+    d = dict((i, [j for j in range(6) if j != i]) for i in range(6))
+    assert dup_independence_poly(d) == [6, 1]
+    assert dup_matching_generating_poly(d) == [15, 45, 15, 1]
+
+def test_reductions_grid():
+    # the corners of an open grid can be reduced, but the active nodes
+    # do not decrease, so the reduced graph is not used
+    from hobj import _blocks_width, _ring_ops
+    from reductions import matching_reduce
+    from decomposition import biconnected_components
+    from active_nodes import num_active_nodes
+    d = sq_d_np(40, 10)
+    links = ordered_links(d, 0, d[0][0])
+    c, d1, vw, ew = matching_reduce(d, _ring_ops(ZZ, None, None))
+    assert 0 < len(d1) < len(d)
+    assert _blocks_width(d1, biconnected_components(d1)) >= \
+        num_active_nodes(d, links)
+    pr = 1000003
+    r = dup_matching_generating_poly(d, val=1, pr=pr, links=links)
+    assert dup_matching_generating_poly(d, val=1, pr=pr) == r
+
+def test_hafnian_minor_poly():
+    # with unit weights it is the matching generating polynomial
+    d = dict_fuller(20)
+    m = [[0]*20 for i in range(20)]
+    for k, v in d.items():
+        for k1 in v:
+            m[k][k1] = 1
+    assert dup_hafnian_minor_poly(m, ZZ) == dup_matching_generating_poly(d)
+    # hafnians of the principal minors of a weighted K_4
+    m = [[0,1,2,3],[1,0,4,5],[2,4,0,6],[3,5,6,0]]
+    p = [1*6 + 2*5 + 3*4, 1 + 2 + 3 + 4 + 5 + 6, 1]
+    assert dup_hafnian_minor_poly(m, ZZ) == p
+    links = [(0, 1), (0, 2), (1, 2), (0, 3), (1, 3), (2, 3)]
+    assert dup_hafnian_minor_poly(m, ZZ, links=links) == p
+    assert dup_hafnian_minor_poly(m, ZZ, val=2, pr=7) == dup_valuate(p, 2) % 7
+    # weighted path 0-1-2 with a pendant weighted edge at 1
+    w = {(0, 1): 2, (1, 2): 3, (1, 3): 5}
+    assert dup_hafnian_minor_poly(w, ZZ) == [10, 1]
+    # conflicting weights, also if one of them is zero
+    for w in [{(0, 1): 0, (1, 0): 5}, {('a', 'b'): 2, ('b', 'a'): 3}]:
+        try:
+            dup_hafnian_minor_poly(w, ZZ)
+            assert 0
+        except ValueError as e:
+            assert 'b' in str(e) or '(1, 0)' in str(e)
+
+def test_chordal():
+    # interval graph of the intervals [i, i + k]: independent sets
+    # have vertices at distance greater than k
+    n, k = 200, 3
+    d = dict((i, [j for j in range(i - k, i + k + 1) if j != i and 0 <= j < n])
+             for i in range(n))
+    assert perfect_elimination_ordering(d) is not None
+    a = [i + 1 for i in range(k + 1)] + [0]*(n - k)
+    for i in range(k + 1, n + 1):
+        a[i] = a[i - 1] + a[i - k - 1]
+    assert dup_independence_poly(d, val=1) == a[n]
+    # star with 30 leaves
+    d = {0: list(range(1, 31))}
+    d.update(dict((i, [0]) for i in range(1, 31)))
+    p = [1]
+    for i in range(30):
+        p = dup_mul(p, [1, 1], ZZ)
+    p = dup_add(p, [1, 0], ZZ)
+    assert dup_independence_poly(d) == p
+    assert dup_matching_generating_poly(d) == [30, 1]
+    assert perfect_elimination_ordering(dict_fuller(20)) is None
+
+def test_modules():
+    # complete multipartite graph K_{3,4,5}, a cograph
+    parts = [list(range(0, 3)), list(range(3, 7)), list(range(7, 12))]
+    d = {}
+    for a in parts:
+        for k in a:
+            d[k] = [k1 for k1 in range(12) if k1 not in a]
+    tree = modular_decomposition(d)
+    assert tree[0] == 'series'
+    assert sorted([c[0] for c in tree[2]]) == ['parallel']*3
+    p = [-2]
+    for a in parts:
+        q = [1]
+        for k in a:
+            q = dup_mul(q, [1, 1], ZZ)
+        p = dup_add(p, q, ZZ)
+    assert dup_independence_poly(d) == p
+    # C_5 with each vertex replaced by two non-adjacent vertices
+    d = {}
+    for i in range(10):
+        c = i // 2
+        d[i] = [k for k in range(10) if (k // 2 - c) % 5 in (1, 4)]
+    tree = modular_decomposition(d)
+    assert tree[0] == 'prime' and len(tree[2]) == 5
+    assert has_twins(d) and not has_twins(sq_d_np(10, 10))
+    b = [1, 2, 0]
+    p = dup_add(dup_add([1], dup_mul([5], b, ZZ), ZZ),
+                dup_mul([5], dup_mul(b, b, ZZ), ZZ), ZZ)
+    assert dup_independence_poly(d) == p
+    assert dup_independence_poly(d, val=3, pr=101) == dup_valuate(p, 3) % 101
+
+def test_planner():
+    # grid graph, bipartite
+    d = {}
+    for i in range(4):
+        for j in range(8):
+            k = 8*i + j
+            d[k] = [k1 for k1 in (k - 8, k + 8) if 0 <= k1 < 32] + \
+                   [k1 for k1 in (k - 1, k + 1) if k1 // 8 == i]
+    plan = plan_matching(d)
+    assert plan.engine == 'permanental'
+    assert plan.execute() == dup_matching_generating_poly(d)
+    assert plan_matching(d, val=3, pr=101).execute() == \
+        dup_matching_generating_poly(d, val=3, pr=101)
+    d1 = line_graph(dict_fuller(20))
+    plan = plan_independence(d1)
+    assert plan.engine == 'line_graph'
+    assert plan.execute() == dup_matching_generating_poly(dict_fuller(20))
+    # cograph plus a disjoint triangle, with shifted labels
+    d = {}
+    for i in range(6):
+        d[i + 10] = [k + 10 for k in range(6) if (k - i) % 2]
+    d.update({20: [21, 22], 21: [20, 22], 22: [20, 21]})
+    plan = plan_independence(d)
+    assert plan.engine == 'components'
+    assert plan.execute() == dup_independence_poly(d)
+    assert plan_independence(d, val=2).execute() == \
+        dup_independence_poly(d, val=2)
+    # C_5 with a vertex replaced by the path 5-6-7-8: a module without
+    # twins, found only if the modular decomposition is requested
+    d = {1:[2], 2:[1,3], 3:[2,4], 4:[3]}
+    for k in (5, 6, 7, 8):
+        d[k] = [1, 4]
+        d[1].append(k)
+        d[4].append(k)
+    for k in (5, 6, 7):
+        d[k].append(k + 1)
+        d[k + 1].append(k)
+    assert not has_twins(d)
+    assert 'modules' not in [x[1] for x in plan_independence(d).candidates]
+    plan = plan_independence(d, modules=True)
+    assert plan.engine == 'modules'
+    assert plan.execute() == dup_independence_poly(d) == [6, 14, 8, 1]
+
+def test_symmetry():
+    # torus C_6 x C_5, swept by rings of 6 vertices
+    ny, nx = 6, 5
+    objects = []
+    for c in range(nx):
+        b = c*ny
+        if c:
+            objects += [(b - ny + k, b + k) for k in range(ny)]
+        objects += [(b + k, b + (k + 1) % ny) for k in range(ny)]
+    objects += [(b + k, k) for k in range(ny)]
+    rings = [list(range(c*ny, c*ny + ny)) for c in range(nx)]
+    p = dup_gen_count_hobj(objects, ZZ)
+    assert dup_gen_count_hobj(objects, ZZ, perms=ring_perms(rings)) == p
+    assert dup_gen_count_hobj(objects, ZZ,
+        perms=ring_perms(rings, reflections=False)) == p
+    assert dup_gen_count_hobj(objects, ZZ, val=3, pr=10007,
+        perms=ring_perms(rings)) == dup_valuate(p, 3) % 10007
+    d = {}
+    for i, j in objects:
+        d.setdefault(i, []).append(j)
+        d.setdefault(j, []).append(i)
+    assert dup_matching_generating_poly(d) == p
+
+def test_geometry():
+    # sweeps along the long side of a 3 x 8 rectangle
+    d, coords, vlist = sq_d_np(3, 8, geometry=True)
+    assert dup_independence_poly(d, vlist=vlist) == dup_independence_poly(d)
+    assert dup_matching_generating_poly(d, vlist=vlist) == \
+        dup_matching_generating_poly(d)
+    for typ in ('pp', 'np', 'px'):
+        m, d1, d2, rows = sq_mat(4, 8, typ, geometry=True)
+        assert sorted(rows) == list(range(len(m)))
+        assert dup_permanental_minor_poly(m, ZZ, rows=rows) == \
+            dup_permanental_minor_poly(m, ZZ)
+    m, d, a, objects = kings_sq_mat_np(3, 6, geometry=True)
+    assert sorted(objects) == sorted(a)
+    assert dup_gen_count_hobj(objects, ZZ) == dup_gen_count_hobj(a, ZZ)
+
+def test_obj_free():
+    # 30 x 30 grid, 1740 links
+    d = sq_d_np(30, 30)
+    links = ordered_links(d, 0, d[0][0])
+    a = obj_free(links)
+    assert [obj for obj, free in a] == links
+    last = {}
+    for i, obj in enumerate(links):
+        for j in obj:
+            last[j] = i
+    freed = [j for obj, free in a for j in free]
+    assert sorted(freed) == list(range(len(d)))
+    assert all([last[j] == i for i, (obj, free) in enumerate(a) for j in free])
+
+def test_compile_plan():
+    import pickle
+    # Fuller graph plus a star and an isolated vertex, with labels
+    # not in 0,...,n-1
+    d = dict_fuller(36)
+    d = dict([(k + 10, [i + 10 for i in v]) for k, v in d.items()])
+    d.update({0: [1, 2, 3], 1: [0], 2: [0], 3: [0], 5: []})
+    plan = pickle.loads(pickle.dumps(compile_plan(d)))
+    assert len(plan) == 57 and plan.width <= 12
+    assert dup_gen_count_hobj(plan, ZZ) == dup_matching_generating_poly(d)
+    for pr in (7, 101, 1000003):
+        assert dup_gen_count_hobj(plan, ZZ, 3, pr) == \
+            dup_matching_generating_poly(d, 3, pr)
+    d = sq_d_np(6, 6)
+    links = ordered_links(d, 0, d[0][0])[::-1]
+    plan = compile_plan(d, links=links)
+    assert plan.links == [tuple(sorted(t)) for t in links]
+    assert dup_gen_count_hobj(plan, ZZ, 2) == \
+        dup_gen_count_hobj(links, ZZ, 2)
+    vlist = list(range(36))
+    assert dup_gen_count_hobj(compile_plan(d, vlist=vlist), ZZ) == \
+        dup_matching_generating_poly(d, vlist=vlist)
+
+def fibonacci(n):
+    a, b = 0, 1
+    for i in range(n):
+        a, b = b, a + b
+    return a
 
 def is_independent_set(d, a):
     """
@@ -186,14 +596,69 @@ def test_gen_hobj_C34():
     p = gen_hobj(objects, vlist)
     assert is_independent_sets(p, d, n)
 
+def test_independent_sets_gen():
+    d = dict_fuller(20)
+    ip = dup_independence_poly(d)
+    a = list(independent_sets_gen(d))
+    assert sorted(a) == sorted(independence_sets(d))
+    a = list(independent_sets_gen(d, kmin=6, kmax=7))
+    assert len(a) == ip[1] + ip[2]
+    assert all([is_independent_set(d, x) for x in a])
+    c = 0
+    for t in independent_sets_subtrees(d, 8):
+        c += len(list(independent_sets_gen(d, kmin=7, start=t)))
+    assert c == ip[0] + ip[1]
+
+def test_matchings_gen():
+    d = dict_fuller(20)
+    p = dup_matching_generating_poly(d)
+    assert len(list(matchings_gen(d))) == sum(p)
+    c = 0
+    for t in matchings_subtrees(d, 10):
+        for a in matchings_gen(d, kmin=10, kmax=10, start=t):
+            vs = [k for edge in a for k in edge]
+            assert len(set(vs)) == 20
+            c += 1
+    assert c == p[0]
+    # a star, two disjoint edges, an isolated vertex 0, labels not
+    # in 0,...,n-1
+    for d in [{0:[1,2,3], 1:[0], 2:[0], 3:[0]}, {0:[1], 1:[0], 2:[3], 3:[2]},
+              {0:[], 1:[2], 2:[1,3], 3:[2]}, {5:[7], 7:[5,9], 9:[7]}]:
+        p = dup_matching_generating_poly(d)
+        a = list(matchings_gen(d))
+        assert len(a) == sum(p)
+        edges = set([(i, j) for i in d for j in d[i]])
+        assert all([e in edges for x in a for e in x])
+        b = [x for t in matchings_subtrees(d, 1) for x in matchings_gen(d, start=t)]
+        assert sorted(b) == sorted(a)
+
 
 if __name__ == '__main__':
     test_dup_permanental_minor_poly()
+    test_permanental_signed()
+    test_permanental_repeated_rows()
+    test_permanental_qq()
+    test_sparse_input()
+    test_permanental_batch()
     test_matching_poly_bipartite()
     test_matching_generating_poly()
     test_dup_independence_poly()
     test_line_graph()
+    test_components()
+    test_matching_blocks()
+    test_reductions()
+    test_reductions_grid()
+    test_hafnian_minor_poly()
+    test_chordal()
+    test_modules()
+    test_planner()
+    test_symmetry()
+    test_geometry()
+    test_obj_free()
+    test_compile_plan()
     test_gen_hobj()
+    test_independent_sets_gen()
+    test_matchings_gen()
 
     if SLOW_TEST:
         test_gen_hobj_C34()
@@ -0,0 +1,55 @@
+import sys
+sys.path.insert(0,'../src')
+from zdd import independent_sets_zdd, matchings_zdd, zdd_from_objects
+from hobj import (dup_independence_poly, dup_matching_generating_poly,
+    independence_sets)
+from graphs_gen import dict_fuller, sq_d_np
+
+def test_independent_sets_zdd():
+    d = dict_fuller(60)
+    z = independent_sets_zdd(d)
+    assert z.count() == 217727997152
+    assert z.count_poly() == dup_independence_poly(d)
+    d = dict_fuller(20)
+    z = independent_sets_zdd(d)
+    a = independence_sets(d)
+    assert sorted(z.iter_sets()) == sorted(a)
+    for k in range(9):
+        b = [x for x in a if len(x) == k]
+        assert z.count(k) == len(b)
+        assert sorted(z.iter_sets(k)) == sorted(b)
+
+def test_matchings_zdd():
+    d = dict_fuller(60)
+    z = matchings_zdd(d)
+    assert z.count_poly() == dup_matching_generating_poly(d)
+    d = sq_d_np(3, 4)
+    z = matchings_zdd(d)
+    for a in z.iter_sets():
+        vs = [k for edge in a for k in edge]
+        assert len(vs) == len(set(vs))
+    assert z.count() == sum(dup_matching_generating_poly(d))
+    # a star, two disjoint edges, an isolated vertex 0, labels not
+    # in 0,...,n-1
+    for d in [{0:[1,2,3], 1:[0], 2:[0], 3:[0]}, {0:[1], 1:[0], 2:[3], 3:[2]},
+              {0:[], 1:[2], 2:[1,3], 3:[2]}, {5:[7], 7:[5,9], 9:[7]}]:
+        z = matchings_zdd(d)
+        assert z.count_poly() == dup_matching_generating_poly(d)
+        edges = set([(i, j) for i in d for j in d[i]])
+        assert all([e in edges for a in z.iter_sets() for e in a])
+
+def test_zdd_sharing():
+    # a path with 40 vertices has about 1.6e8 independent sets,
+    # but the ZDD has a number of nodes linear in the number of vertices
+    n = 40
+    objects = [(0,)] + [(i - 1, i) for i in range(1, n - 1)] + [(n - 2,)]
+    z = zdd_from_objects(objects)
+    assert z.count() == 267914296
+    assert z.num_nodes() <= 2*n
+
+
+if __name__ == '__main__':
+    test_independent_sets_zdd()
+    test_matchings_zdd()
+    test_zdd_sharing()
+    print('test_zdd ok')